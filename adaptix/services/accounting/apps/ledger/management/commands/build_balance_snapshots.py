@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+from apps.ledger.models import JournalEntry
+from apps.ledger.snapshots import build_snapshots, default_through
+
+
+class Command(BaseCommand):
+    help = 'Build or extend daily account balance snapshots used by as-of-date reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=str, help='Only process this company UUID')
+        parser.add_argument('--through', type=str, help='Last day to snapshot (YYYY-MM-DD). Defaults to yesterday.')
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Recompute snapshots after the last closed accounting period instead of extending them'
+        )
+
+    def handle(self, *args, **options):
+        through = parse_date(options['through']) if options.get('through') else default_through()
+
+        if options.get('company'):
+            company_uuids = [options['company']]
+        else:
+            company_uuids = JournalEntry.objects.values_list('company_uuid', flat=True).distinct()
+
+        for company_uuid in company_uuids:
+            written = build_snapshots(company_uuid, through, rebuild=options['rebuild'])
+            self.stdout.write(f"{company_uuid}: {written} snapshot row(s) through {through}")
+
+        self.stdout.write(self.style.SUCCESS("Balance snapshots up to date."))
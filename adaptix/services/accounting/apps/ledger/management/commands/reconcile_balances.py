@@ -0,0 +1,44 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from apps.ledger.models import ChartOfAccount, JournalItem, balance_change
+
+
+class Command(BaseCommand):
+    help = 'Verify incrementally maintained account balances against a full JournalItem aggregate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=str, help='Only reconcile this company UUID')
+        parser.add_argument('--fix', action='store_true', help='Overwrite drifted balances with the aggregated value')
+
+    def handle(self, *args, **options):
+        accounts = ChartOfAccount.objects.select_related('group')
+        items = JournalItem.objects.all()
+        if options.get('company'):
+            accounts = accounts.filter(company_uuid=options['company'])
+            items = items.filter(account__company_uuid=options['company'])
+
+        # One grouped aggregate for every account instead of one per account
+        totals = {
+            row['account_id']: (row['total_debit'] or Decimal('0'), row['total_credit'] or Decimal('0'))
+            for row in items.values('account_id').annotate(total_debit=Sum('debit'), total_credit=Sum('credit'))
+        }
+
+        drifted = []
+        for account in accounts.iterator():
+            debits, credits = totals.get(account.id, (Decimal('0'), Decimal('0')))
+            expected = account.opening_balance + balance_change(account.group.group_type, debits, credits)
+            if expected != account.current_balance:
+                drifted.append(account)
+                self.stdout.write(self.style.WARNING(
+                    f"{account.company_uuid} {account.code} {account.name}: stored {account.current_balance}, expected {expected}"
+                ))
+                account.current_balance = expected
+
+        if drifted and options.get('fix'):
+            ChartOfAccount.objects.bulk_update(drifted, ['current_balance'], batch_size=500)
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(drifted)} account balance(s)."))
+        elif drifted:
+            self.stdout.write(self.style.ERROR(f"{len(drifted)} account balance(s) drifted. Re-run with --fix to repair."))
+        else:
+            self.stdout.write(self.style.SUCCESS("All account balances reconcile."))
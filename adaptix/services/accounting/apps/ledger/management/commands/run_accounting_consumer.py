@@ -5,19 +5,40 @@ import pika
 from decimal import Decimal
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from apps.ledger.models import ChartOfAccount, JournalEntry, JournalItem, AccountGroup
+from apps.ledger.utils import invalidate_tenant_unit_ids
 
 logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
     help = 'Runs the accounting event consumer'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prefetch', type=int,
+            default=int(os.environ.get('ACCOUNTING_CONSUMER_PREFETCH', 100)),
+            help='Unacked messages the broker may push at once; also the max sales posted per batch'
+        )
+        parser.add_argument(
+            '--batch-wait', type=float,
+            default=float(os.environ.get('ACCOUNTING_CONSUMER_BATCH_WAIT', 0.5)),
+            help='Seconds to wait for more sales before posting a partial batch'
+        )
+
     def handle(self, *args, **options):
+        prefetch = max(1, options['prefetch'])
+        batch_wait = options['batch_wait']
+
         # Retry connection logic could be added here
         params = pika.URLParameters(settings.CELERY_BROKER_URL)
         connection = pika.BlockingConnection(params)
         channel = connection.channel()
+        channel.basic_qos(prefetch_count=prefetch)
+        
+        # pos.sale.closed messages waiting to be posted together: [(delivery_tag, data)]
+        pending_sales = []
 
         channel.exchange_declare(exchange='events', exchange_type='topic', durable=True)
         
@@ -45,70 +66,146 @@ class Command(BaseCommand):
                 
                 logger.info(f"Received Event: {event}")
 
+                if event == 'pos.sale.closed':
+                    # Acked together once the batch is posted
+                    pending_sales.append((method.delivery_tag, data))
+                    if len(pending_sales) >= prefetch:
+                        self.flush_sales(ch, pending_sales)
+                    return
+                
                 if event == 'payroll_finalized':
                     self.process_payroll(data)
-                elif event == 'pos.sale.closed':
-                    self.process_sale(data)
+                elif event == 'payroll_run_finalized':
+                    self.process_payroll_run(data)
                 elif event == 'pos.return.created':
                     self.process_pos_return(data)
                 elif event == 'purchase.order.received':
                     self.process_purchase_receipt(data)
                 elif event == 'purchase.payment.recorded':
                     self.process_purchase_payment(data)
+                elif event == 'company.tenant.changed':
+                    invalidate_tenant_unit_ids([
+                        data.get('company_id'),
+                        data.get('auth_company_uuid'),
+                        data.get('previous_auth_company_uuid'),
+                    ])
 
                 ch.basic_ack(delivery_tag=method.delivery_tag)
             except Exception as e:
                 logger.error(f"Error processing message: {e}")
-                # ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False) 
+                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
 
         logger.info(' [*] Waiting for Accounting events...')
+        # Tenant membership changes (cache invalidation for get_tenant_unit_ids)
+        queue_tenants = 'accounting_tenant_queue'
+        channel.queue_declare(queue=queue_tenants, durable=True)
+        channel.queue_bind(exchange='events', queue=queue_tenants, routing_key='company.tenant.changed')
+
         channel.basic_consume(queue=queue_name, on_message_callback=callback)
         channel.basic_consume(queue=queue_sales, on_message_callback=callback)
         channel.basic_consume(queue=queue_purchase, on_message_callback=callback)
-        channel.start_consuming()
-
-    def process_sale(self, data):
-        company_uuid = data['company_uuid']
-        grand_total = Decimal(str(data['grand_total']))
-        order_number = data['order_number']
+        channel.basic_consume(queue=queue_tenants, on_message_callback=callback)
         
-        logger.info(f"Processing Sale Journal: {order_number} for {grand_total}")
+        # Drain in bursts: post whatever sales arrived within batch_wait as one batch
+        while True:
+            connection.process_data_events(time_limit=batch_wait)
+            if pending_sales:
+                self.flush_sales(channel, pending_sales)
+
+    def flush_sales(self, channel, pending_sales):
+        """
+        Post every buffered sale in one transaction and ack them together.
+        If the batch fails, fall back to one transaction per sale so a single
+        bad message is nacked without blocking the rest.
+        """
+        batch = list(pending_sales)
+        pending_sales.clear()
         
-        # 1. Accounts
-        sales_account = self.get_or_create_account(company_uuid, "Sales Revenue", "income", "4001")
-        cash_account = self.get_or_create_account(company_uuid, "Cash on Hand", "asset", "1001") # Assuming Cash for MVP
+        try:
+            self.post_sales([data for _, data in batch])
+            channel.basic_ack(delivery_tag=batch[-1][0], multiple=True)
+            return
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} sales failed, retrying individually: {e}")
         
-        # 2. Journal Entry
-        entry = JournalEntry.objects.create(
-            company_uuid=company_uuid,
-            wing_uuid=data.get('wing_uuid'),
-            voucher_type='receipt',
-            date=timezone.now().date(),
-            reference=f"INV-{order_number}",
-            description=f"POS Sale: {order_number}",
-            total_debit=grand_total,
-            total_credit=grand_total,
-            is_posted=True
-        )
+        for delivery_tag, data in batch:
+            try:
+                self.post_sales([data])
+                channel.basic_ack(delivery_tag=delivery_tag)
+            except Exception as e:
+                logger.error(f"Error processing sale {data.get('order_number')}: {e}")
+                channel.basic_nack(delivery_tag=delivery_tag, requeue=False)
 
-        # 3. Items
-        # Debit Cash (Asset increases)
-        JournalItem.objects.create(
-            entry=entry,
-            account=cash_account,
-            debit=grand_total,
-            credit=0,
-            description="Cash Received"
-        )
-        # Credit Revenue (Income increases)
-        JournalItem.objects.create(
-            entry=entry,
-            account=sales_account,
-            debit=0,
-            credit=grand_total,
-            description="Sales Revenue"
+    def process_sale(self, data):
+        self.post_sales([data])
+
+    @transaction.atomic
+    def post_sales(self, sales):
+        """
+        Post pos.sale.closed events: one bulk insert of JournalEntries, one of
+        JournalItems, and one balance update per account. Sales whose
+        reference is already posted (redelivery) are skipped.
+        """
+        references = {}
+        for data in sales:
+            key = (str(data['company_uuid']), f"INV-{data['order_number']}")
+            references.setdefault(key, data)  # also de-duplicates within the batch
+
+        existing = set(
+            (str(c), r) for c, r in JournalEntry.objects.filter(
+                source='pos',
+                company_uuid__in={c for c, _ in references},
+                reference__in={r for _, r in references}
+            ).values_list('company_uuid', 'reference')
         )
-        logger.info(f"✅ Sales Journal Created: {entry.reference}")
+
+        accounts = {}
+        entries = []
+        items = []
+        today = timezone.now().date()
+        for (company_uuid, reference), data in references.items():
+            if (company_uuid, reference) in existing:
+                logger.info(f"Skipping already posted sale: {reference}")
+                continue
+            
+            grand_total = Decimal(str(data['grand_total']))
+            order_number = data['order_number']
+            
+            # 1. Accounts (resolved once per company per batch)
+            if company_uuid not in accounts:
+                accounts[company_uuid] = (
+                    self.get_or_create_account(company_uuid, "Sales Revenue", "income", "4001"),
+                    self.get_or_create_account(company_uuid, "Cash on Hand", "asset", "1001") # Assuming Cash for MVP
+                )
+            sales_account, cash_account = accounts[company_uuid]
+            
+            # 2. Journal Entry
+            entry = JournalEntry(
+                company_uuid=company_uuid,
+                wing_uuid=data.get('wing_uuid'),
+                voucher_type='receipt',
+                source='pos',
+                date=today,
+                reference=reference,
+                description=f"POS Sale: {order_number}",
+                total_debit=grand_total,
+                total_credit=grand_total,
+                is_posted=True
+            )
+            entries.append(entry)
+            
+            # 3. Items
+            # Debit Cash (Asset increases), Credit Revenue (Income increases)
+            items.append(JournalItem(entry=entry, account=cash_account, debit=grand_total, credit=0, description="Cash Received"))
+            items.append(JournalItem(entry=entry, account=sales_account, debit=0, credit=grand_total, description="Sales Revenue"))
+        
+        if not entries:
+            return []
+        
+        JournalEntry.objects.bulk_create(entries)
+        JournalItem.bulk_post(items)
+        logger.info(f"✅ Posted {len(entries)} sales journal(s)")
+        return entries
 
     def process_payroll(self, data):
         company_uuid = data['company_uuid']
@@ -151,6 +248,35 @@ class Command(BaseCommand):
         )
         logger.info(f"✅ Journal Entry Created: {entry.reference}")
 
+    def process_payroll_run(self, data):
+        """A whole payroll run is posted as one journal for its total net pay."""
+        company_uuid = data['company_uuid']
+        net_pay = Decimal(str(data['net_pay']))
+        run_id = data['run_id']
+        period = f"{data['period_start']} to {data['period_end']}"
+
+        logger.info(f"Processing Payroll Run Journal for: {net_pay} ({len(data.get('payslips', []))} payslips)")
+
+        expense_account = self.get_or_create_account(company_uuid, "Salaries Expense", "expense", "5001")
+        liability_account = self.get_or_create_account(company_uuid, "Salaries Payable", "liability", "2001")
+
+        with transaction.atomic():
+            entry = JournalEntry.objects.create(
+                company_uuid=company_uuid,
+                voucher_type='payment',
+                date=timezone.now().date(),
+                reference=f"PAYRUN-{run_id[:8]}",
+                description=f"Payroll Automation: {period}",
+                total_debit=net_pay,
+                total_credit=net_pay,
+                is_posted=True
+            )
+            JournalItem.bulk_post([
+                JournalItem(entry=entry, account=expense_account, debit=net_pay, credit=0, description="Salary Expense"),
+                JournalItem(entry=entry, account=liability_account, debit=0, credit=net_pay, description="Net Pay Payable"),
+            ])
+        logger.info(f"✅ Journal Entry Created: {entry.reference}")
+
     def get_or_create_account(self, company_uuid, name, group_type, code):
         # Super simplified: Find by code or create
         account = ChartOfAccount.objects.filter(company_uuid=company_uuid, code=code).first()
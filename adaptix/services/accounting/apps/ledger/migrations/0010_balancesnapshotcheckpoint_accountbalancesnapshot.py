@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0009_accountingperiod_journalentry_source'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshotCheckpoint',
+            fields=[
+                ('company_uuid', models.UUIDField(primary_key=True, serialize=False)),
+                ('snapshot_through', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AccountBalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('company_uuid', models.UUIDField(db_index=True)),
+                ('wing_uuid', models.UUIDField(blank=True, null=True)),
+                ('date', models.DateField()),
+                ('cumulative_debit', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('cumulative_credit', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='ledger.chartofaccount')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company_uuid', 'date'], name='ledger_acco_company_fe17b0_idx')],
+                'unique_together': {('company_uuid', 'account', 'wing_uuid', 'date')},
+            },
+        ),
+    ]
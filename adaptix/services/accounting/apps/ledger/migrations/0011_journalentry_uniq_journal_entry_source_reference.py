@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0010_balancesnapshotcheckpoint_accountbalancesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='journalentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('source', 'pos'), models.Q(('reference', ''), _negated=True)), fields=('company_uuid', 'source', 'reference'), name='uniq_journal_entry_source_reference'),
+        ),
+    ]
@@ -1,7 +1,10 @@
 import uuid
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
 from decimal import Decimal
-from django.db import models
-from django.db.models import Sum
+from django.db import models, transaction
+from django.db.models import F, Q, Sum
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
@@ -77,6 +80,35 @@ class AccountingPeriod(models.Model):
     def __str__(self):
         return self.name
 
+class AccountBalanceSnapshot(models.Model):
+    """
+    Cumulative debit/credit of an account (per wing) at the end of a day on
+    which it had activity. As-of reports read the latest snapshot at or
+    before the company's snapshot checkpoint and only aggregate the journal
+    items posted after it.
+    """
+    id = models.BigAutoField(primary_key=True)
+    company_uuid = models.UUIDField(db_index=True)
+    account = models.ForeignKey(ChartOfAccount, on_delete=models.CASCADE, related_name='balance_snapshots')
+    wing_uuid = models.UUIDField(null=True, blank=True)
+    date = models.DateField()
+    cumulative_debit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    cumulative_credit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('company_uuid', 'account', 'wing_uuid', 'date')
+        indexes = [
+            models.Index(fields=['company_uuid', 'date']),
+        ]
+
+class BalanceSnapshotCheckpoint(models.Model):
+    """
+    Snapshots of a company are complete up to and including snapshot_through.
+    """
+    company_uuid = models.UUIDField(primary_key=True)
+    snapshot_through = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
 class JournalEntry(models.Model):
     """
     Head of a transaction. e.g. "Invoice #123"
@@ -113,6 +145,16 @@ class JournalEntry(models.Model):
     created_by = models.UUIDField(null=True, blank=True)
     updated_by = models.UUIDField(null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            # Automated postings are idempotent per source document (event redelivery)
+            models.UniqueConstraint(
+                fields=['company_uuid', 'source', 'reference'],
+                condition=Q(source='pos') & ~Q(reference=''),
+                name='uniq_journal_entry_source_reference',
+            ),
+        ]
+
 class JournalItem(models.Model):
     """
     Line item: Debit Cash $100, Credit Sales $100.
@@ -125,9 +167,125 @@ class JournalItem(models.Model):
     
     description = models.CharField(max_length=255, blank=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was last persisted so updates can post a delta
+        instance._posted = (instance.__dict__.get('account_id'), instance.__dict__.get('debit'), instance.__dict__.get('credit'))
+        return instance
+
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
 
+    @classmethod
+    def bulk_post(cls, items, batch_size=500):
+        """
+        Insert many JournalItems with one bulk_create and apply one balance
+        update per affected account (bulk_create fires no per-item signals).
+        """
+        items = list(items)
+        with transaction.atomic():
+            created = cls.objects.bulk_create(items, batch_size=batch_size)
+            deltas = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+            snapshot_deltas = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+            for item in created:
+                debit = Decimal(str(item.debit or 0))
+                credit = Decimal(str(item.credit or 0))
+                deltas[item.account_id][0] += debit
+                deltas[item.account_id][1] += credit
+                snapshot_deltas[(item.entry_id, item.account_id)][0] += debit
+                snapshot_deltas[(item.entry_id, item.account_id)][1] += credit
+            _apply_posting(deltas, snapshot_deltas)
+        return created
+
+
+# Balance maintenance
+# -------------------
+# current_balance is kept up to date incrementally: each JournalItem change
+# posts its (debit, credit) delta to the account with an F() update inside the
+# caller's transaction. recalculate_account_balance() is the full re-aggregation
+# used on account edits and by the reconcile_balances command. The same deltas
+# keep AccountBalanceSnapshot rows exact for back-dated postings.
+
+_balance_state = threading.local()
+
+DEBIT_NORMAL_GROUPS = ('asset', 'expense')
+
+
+def balance_change(group_type, debit, credit):
+    if group_type.lower() in DEBIT_NORMAL_GROUPS:
+        return debit - credit
+    # Liability, Equity, Income
+    return credit - debit
+
+
+def apply_balance_deltas(deltas):
+    """
+    deltas: {account_id: (debit_delta, credit_delta)}.
+    Issues one UPDATE per account using F() so concurrent postings never
+    overwrite each other. Accounts are updated in primary key order so
+    postings that touch the same accounts take their row locks in the same
+    order and can't deadlock.
+    """
+    deltas = {k: v for k, v in deltas.items() if k is not None and (v[0] or v[1])}
+    if not deltas:
+        return
+
+    group_types = dict(
+        ChartOfAccount.objects.filter(pk__in=deltas.keys()).values_list('pk', 'group__group_type')
+    )
+    for account_id in sorted(deltas):
+        debit, credit = deltas[account_id]
+        group_type = group_types.get(account_id)
+        if group_type is None:
+            continue
+        change = balance_change(group_type, Decimal(str(debit)), Decimal(str(credit)))
+        if change:
+            ChartOfAccount.objects.filter(pk=account_id).update(current_balance=F('current_balance') + change)
+
+
+def _apply_posting(deltas, snapshot_deltas):
+    from .snapshots import apply_snapshot_deltas
+
+    apply_balance_deltas(deltas)
+    apply_snapshot_deltas(snapshot_deltas)
+
+
+def _post_delta(entry_id, account_id, debit, credit):
+    pending = getattr(_balance_state, 'pending', None)
+    if pending is not None:
+        accounts, snapshots = pending
+        accounts[account_id][0] += debit
+        accounts[account_id][1] += credit
+        snapshots[(entry_id, account_id)][0] += debit
+        snapshots[(entry_id, account_id)][1] += credit
+    else:
+        _apply_posting({account_id: (debit, credit)}, {(entry_id, account_id): (debit, credit)})
+
+
+@contextmanager
+def deferred_balance_updates():
+    """
+    Collect the balance deltas of every JournalItem saved/deleted inside the
+    block and apply them as one update per account on exit.
+    """
+    if getattr(_balance_state, 'pending', None) is not None:
+        # Nested: the outermost block applies everything
+        yield
+        return
+
+    _balance_state.pending = (
+        defaultdict(lambda: [Decimal('0'), Decimal('0')]),
+        defaultdict(lambda: [Decimal('0'), Decimal('0')]),
+    )
+    try:
+        yield
+        pending = _balance_state.pending
+    finally:
+        _balance_state.pending = None
+    _apply_posting(*pending)
+
+
 def recalculate_account_balance(account):
     totals = JournalItem.objects.filter(account=account).aggregate(
         total_debit=Sum('debit'),
@@ -138,20 +296,28 @@ def recalculate_account_balance(account):
     credits = totals.get('total_credit') or Decimal('0')
     
     # Logic based on Accounting Equation
-    group_type = account.group.group_type.lower()
-    
-    if group_type in ['asset', 'expense']:
-        account.current_balance = account.opening_balance + (debits - credits)
-    else:
-        # Liability, Equity, Income
-        account.current_balance = account.opening_balance + (credits - debits)
+    account.current_balance = account.opening_balance + balance_change(account.group.group_type, debits, credits)
     
     account.save(update_fields=['current_balance'])
 
 @receiver(post_save, sender=JournalItem)
+def on_journal_item_save(sender, instance, created, **kwargs):
+    debit = Decimal(str(instance.debit or 0))
+    credit = Decimal(str(instance.credit or 0))
+    previous = getattr(instance, '_posted', None)
+
+    if not created and previous and previous[0] is not None:
+        old_account_id, old_debit, old_credit = previous
+        _post_delta(instance.entry_id, old_account_id, -Decimal(str(old_debit or 0)), -Decimal(str(old_credit or 0)))
+
+    _post_delta(instance.entry_id, instance.account_id, debit, credit)
+    instance._posted = (instance.account_id, debit, credit)
+
 @receiver(post_delete, sender=JournalItem)
-def on_journal_item_change(sender, instance, **kwargs):
-    recalculate_account_balance(instance.account)
+def on_journal_item_delete(sender, instance, **kwargs):
+    previous = getattr(instance, '_posted', None) or (instance.account_id, instance.debit, instance.credit)
+    account_id, debit, credit = previous
+    _post_delta(instance.entry_id, account_id, -Decimal(str(debit or 0)), -Decimal(str(credit or 0)))
 
 @receiver(post_save, sender=ChartOfAccount)
 def on_account_save(sender, instance, created, **kwargs):
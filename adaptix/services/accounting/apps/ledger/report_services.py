@@ -1,47 +1,89 @@
+from collections import defaultdict
+from datetime import timedelta
 from decimal import Decimal
-from django.db.models import Sum, Q
-from .models import ChartOfAccount, JournalItem
+from django.utils.dateparse import parse_date
+from .models import AccountGroup, ChartOfAccount
+from .snapshots import cumulative_totals, get_snapshot_cutoff
 from .utils import get_tenant_unit_ids
 
+
+class AccountTree:
+    """
+    The company's AccountGroup hierarchy and accounts, loaded with two queries
+    so reports can roll balances up in memory instead of walking
+    group.accounts / group.subgroups one query at a time.
+    """
+
+    def __init__(self, company_ids=None):
+        group_qs = AccountGroup.objects.all()
+        account_qs = ChartOfAccount.objects.select_related('group')
+        if company_ids is not None:
+            group_qs = group_qs.filter(company_uuid__in=company_ids)
+            account_qs = account_qs.filter(company_uuid__in=company_ids)
+
+        self.groups = {g.id: g for g in group_qs}
+        self.accounts = list(account_qs)
+        self.subgroups = defaultdict(list)
+        self.group_accounts = defaultdict(list)
+
+        for group in self.groups.values():
+            if group.parent_id:
+                self.subgroups[group.parent_id].append(group)
+        for acc in self.accounts:
+            self.group_accounts[acc.group_id].append(acc)
+
+    def roots(self, group_type=None):
+        roots = [g for g in self.groups.values() if g.parent_id is None]
+        if group_type:
+            roots = [g for g in roots if g.group_type.lower() == group_type]
+        return roots
+
+    def group_type_of(self, account):
+        return account.group.group_type.lower()
+
+    def rollup(self, group, account_value):
+        """
+        Sum account_value(account, group) over the group's accounts and all
+        of its descendants.
+        """
+        total = Decimal('0')
+        stack = [group]
+        while stack:
+            current = stack.pop()
+            for acc in self.group_accounts.get(current.id, []):
+                total += account_value(acc, current)
+            stack.extend(self.subgroups.get(current.id, []))
+        return total
+
 class ReportService:
     @staticmethod
-    def get_all_account_balances(company_uuid, wing_uuid=None, as_of_date=None, start_date=None):
+    def get_all_account_balances(company_uuid, wing_uuid=None, as_of_date=None, start_date=None, include_periodic=True):
         """
         Fetches balances for all accounts of a company in bulk to avoid N+1 queries.
         Returns a dictionary mapping account UUID to its calculated balance.
+
+        Cumulative figures come from the latest daily balance snapshots plus
+        the journal items posted after the snapshot checkpoint; periodic
+        activity is the difference of two cumulative positions.
         """
-        # 1. Base filter for Journal Items
-        item_filter = Q()
-        if company_uuid:
-            company_ids = get_tenant_unit_ids(company_uuid)
-            item_filter &= Q(entry__company_uuid__in=company_ids)
-            
-        if wing_uuid:
-            item_filter &= Q(entry__wing_uuid=wing_uuid)
-        
-        # 2. Add time filters
-        as_of_filter = Q(item_filter)
-        if as_of_date:
-            as_of_filter &= Q(entry__date__lte=as_of_date)
-            
-        periodic_filter = Q(item_filter)
-        if start_date:
-            periodic_filter &= Q(entry__date__gte=start_date)
-        if as_of_date:
-            periodic_filter &= Q(entry__date__lte=as_of_date)
-
-        # 3. Aggregate everything in one or two queries
-        # Query 1: Cumulative balances (for Balance Sheet and Trial Balance)
-        cumulative_totals = JournalItem.objects.filter(as_of_filter).values('account_id').annotate(
-            total_debit=Sum('debit'),
-            total_credit=Sum('credit')
-        )
-        
-        # Query 2: Periodic activity (for Profit & Loss)
-        periodic_totals = JournalItem.objects.filter(periodic_filter).values('account_id').annotate(
-            total_debit=Sum('debit'),
-            total_credit=Sum('credit')
-        )
+        company_ids = get_tenant_unit_ids(company_uuid) if company_uuid else None
+        cutoff = get_snapshot_cutoff(company_ids) if company_ids else None
+
+        as_of_date = parse_date(str(as_of_date)) if as_of_date else None
+        start_date = parse_date(str(start_date)) if start_date else None
+
+        cumulative = cumulative_totals(company_ids, wing_uuid, as_of_date, cutoff)
+
+        periodic = {}
+        if include_periodic:
+            if start_date:
+                before = cumulative_totals(company_ids, wing_uuid, start_date - timedelta(days=1), cutoff)
+                for acc_id in set(cumulative) | set(before):
+                    end = cumulative.get(acc_id, (Decimal('0'), Decimal('0')))
+                    begin = before.get(acc_id, (Decimal('0'), Decimal('0')))
+                    periodic[acc_id] = (end[0] - begin[0], end[1] - begin[1])
+            else:
+                periodic = cumulative
 
         balances = {}
         
@@ -54,16 +96,14 @@ class ReportService:
                 'periodic_credit': Decimal('0')
             }
 
-        for row in cumulative_totals:
-            acc_id = row['account_id']
+        for acc_id, (debit, credit) in cumulative.items():
             if acc_id not in balances: balances[acc_id] = get_blank()
-            balances[acc_id]['cumulative_debit'] = row['total_debit'] or Decimal('0')
-            balances[acc_id]['cumulative_credit'] = row['total_credit'] or Decimal('0')
+            balances[acc_id]['cumulative_debit'] = debit
+            balances[acc_id]['cumulative_credit'] = credit
 
-        for row in periodic_totals:
-            acc_id = row['account_id']
+        for acc_id, (debit, credit) in periodic.items():
             if acc_id not in balances: balances[acc_id] = get_blank()
-            balances[acc_id]['periodic_debit'] = row['total_debit'] or Decimal('0')
-            balances[acc_id]['periodic_credit'] = row['total_credit'] or Decimal('0')
+            balances[acc_id]['periodic_debit'] = debit
+            balances[acc_id]['periodic_credit'] = credit
             
         return balances
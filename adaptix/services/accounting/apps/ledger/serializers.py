@@ -1,7 +1,9 @@
 from rest_framework import serializers, viewsets
 from django.db import transaction
 from decimal import Decimal
-from .models import AccountGroup, ChartOfAccount, JournalEntry, JournalItem, SystemAccount, AccountingPeriod
+from django.db.models import Sum
+from .models import AccountGroup, ChartOfAccount, JournalEntry, JournalItem, SystemAccount, AccountingPeriod, deferred_balance_updates
+from .snapshots import move_entry_snapshots
 
 class AccountGroupSerializer(serializers.ModelSerializer):
     class Meta:
@@ -62,10 +64,11 @@ class JournalEntrySerializer(serializers.ModelSerializer):
         total_debit = Decimal('0')
         total_credit = Decimal('0')
         
-        for item_data in items_data:
-            JournalItem.objects.create(entry=entry, **item_data)
-            total_debit += Decimal(str(item_data.get('debit', 0)))
-            total_credit += Decimal(str(item_data.get('credit', 0)))
+        with deferred_balance_updates():
+            for item_data in items_data:
+                JournalItem.objects.create(entry=entry, **item_data)
+                total_debit += Decimal(str(item_data.get('debit', 0)))
+                total_credit += Decimal(str(item_data.get('credit', 0)))
             
         entry.total_debit = total_debit
         entry.total_credit = total_credit
@@ -89,26 +92,44 @@ class JournalEntrySerializer(serializers.ModelSerializer):
         if 'wing_uuid' in validated_data and validated_data['wing_uuid'] == "":
             validated_data['wing_uuid'] = None
         
+        old_date, old_wing_uuid = instance.date, instance.wing_uuid
+
         # Update Header
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
+
+        moved = instance.date != old_date or instance.wing_uuid != old_wing_uuid
+        if moved:
+            # Totals as posted under the old header, to re-home their snapshots
+            posted = {
+                row['account_id']: (row['total_debit'] or Decimal('0'), row['total_credit'] or Decimal('0'))
+                for row in instance.items.values('account_id').annotate(
+                    total_debit=Sum('debit'), total_credit=Sum('credit')
+                )
+            }
+
+        # Save the header first so item deltas below resolve against the new date and wing
+        instance.save()
         
         # Update Items (Sync strategy: Delete and recreate for simplicity)
         if items_data is not None:
-            instance.items.all().delete()
-            
             total_debit = Decimal('0')
             total_credit = Decimal('0')
             
-            for item_data in items_data:
-                JournalItem.objects.create(entry=instance, **item_data)
-                total_debit += Decimal(str(item_data.get('debit', 0)))
-                total_credit += Decimal(str(item_data.get('credit', 0)))
+            with deferred_balance_updates():
+                instance.items.all().delete()
+                for item_data in items_data:
+                    JournalItem.objects.create(entry=instance, **item_data)
+                    total_debit += Decimal(str(item_data.get('debit', 0)))
+                    total_credit += Decimal(str(item_data.get('credit', 0)))
             
             instance.total_debit = total_debit
             instance.total_credit = total_credit
-            
-        instance.save()
+            instance.save(update_fields=['total_debit', 'total_credit'])
+
+        if moved:
+            # Item deltas above landed in the new scope; move the old totals across too
+            move_entry_snapshots(instance, old_date, old_wing_uuid, posted)
         
         return instance
 
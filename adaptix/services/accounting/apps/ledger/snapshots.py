@@ -0,0 +1,254 @@
+from collections import defaultdict
+from datetime import date as date_cls, timedelta
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils.dateparse import parse_date
+from .models import AccountBalanceSnapshot, AccountingPeriod, BalanceSnapshotCheckpoint, JournalEntry, JournalItem
+
+ZERO = Decimal('0')
+
+
+def _as_date(value):
+    if value is None or isinstance(value, date_cls):
+        return value
+    return parse_date(str(value))
+
+
+def get_snapshot_cutoff(company_ids):
+    """
+    Date through which snapshots are complete for every company in company_ids,
+    or None if any of them has no snapshots yet.
+    """
+    company_ids = [str(c) for c in company_ids]
+    if not company_ids:
+        return None
+    checkpoints = list(
+        BalanceSnapshotCheckpoint.objects.filter(company_uuid__in=company_ids).values_list('snapshot_through', flat=True)
+    )
+    if len(checkpoints) < len(set(company_ids)):
+        return None
+    return min(checkpoints)
+
+
+def snapshot_totals(company_ids, wing_uuid, as_of):
+    """
+    {account_id: [debit, credit]} from the latest snapshot on or before as_of
+    for each (company, account, wing).
+    """
+    qs = AccountBalanceSnapshot.objects.filter(company_uuid__in=company_ids, date__lte=as_of)
+    if wing_uuid:
+        qs = qs.filter(wing_uuid=wing_uuid)
+    latest = qs.order_by('company_uuid', 'account_id', 'wing_uuid', '-date').distinct(
+        'company_uuid', 'account_id', 'wing_uuid'
+    ).values_list('account_id', 'cumulative_debit', 'cumulative_credit')
+
+    totals = defaultdict(lambda: [ZERO, ZERO])
+    for account_id, debit, credit in latest:
+        totals[account_id][0] += debit
+        totals[account_id][1] += credit
+    return totals
+
+
+def cumulative_totals(company_ids, wing_uuid=None, as_of=None, cutoff=None):
+    """
+    Cumulative {account_id: [debit, credit]} as of a date, combining the
+    latest snapshots with the journal items posted after the cutoff.
+    """
+    as_of = _as_date(as_of)
+    items = JournalItem.objects.all()
+    if company_ids is not None:
+        items = items.filter(entry__company_uuid__in=company_ids)
+    if wing_uuid:
+        items = items.filter(entry__wing_uuid=wing_uuid)
+
+    if cutoff is None:
+        totals = defaultdict(lambda: [ZERO, ZERO])
+    else:
+        totals = snapshot_totals(company_ids, wing_uuid, min(as_of, cutoff) if as_of else cutoff)
+        if as_of and as_of <= cutoff:
+            return totals
+        items = items.filter(entry__date__gt=cutoff)
+
+    if as_of:
+        items = items.filter(entry__date__lte=as_of)
+    for row in items.values('account_id').annotate(total_debit=Sum('debit'), total_credit=Sum('credit')):
+        totals[row['account_id']][0] += row['total_debit'] or ZERO
+        totals[row['account_id']][1] += row['total_credit'] or ZERO
+    return totals
+
+
+def _lock_checkpoints(company_uuids):
+    """
+    {company_uuid: snapshot_through} read FOR SHARE. Postings still run side
+    by side, but wait for a build_snapshots holding the row FOR UPDATE, so an
+    item dated inside the range being built is never left to the live read
+    of a checkpoint that is about to move past it.
+    """
+    company_uuids = sorted({str(c) for c in company_uuids if c})
+    if not company_uuids:
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT company_uuid, snapshot_through FROM {BalanceSnapshotCheckpoint._meta.db_table} "
+            "WHERE company_uuid = ANY(%s::uuid[]) ORDER BY company_uuid FOR SHARE",
+            [company_uuids],
+        )
+        return {str(company_uuid): through for company_uuid, through in cursor.fetchall()}
+
+
+@transaction.atomic
+def apply_snapshot_deltas(deltas):
+    """
+    Keep snapshots exact when a journal item is posted on or before the
+    company's checkpoint (back-dated entries). Items after the checkpoint are
+    read live by reports, so the common case costs two small lookups.
+
+    deltas: {(entry_id, account_id): [debit, credit]}
+    """
+    deltas = {k: v for k, v in deltas.items() if k[0] is not None and (v[0] or v[1])}
+    if not deltas:
+        return
+
+    entries = {
+        entry_id: (company_uuid, wing_uuid, entry_date)
+        for entry_id, company_uuid, wing_uuid, entry_date in
+        JournalEntry.objects.filter(pk__in={k[0] for k in deltas}).values_list('id', 'company_uuid', 'wing_uuid', 'date')
+    }
+    checkpoints = _lock_checkpoints(e[0] for e in entries.values())
+    if not checkpoints:
+        return
+
+    # Merge lines of different entries that land in the same snapshot row
+    merged = defaultdict(lambda: [ZERO, ZERO])
+    for (entry_id, account_id), (debit, credit) in deltas.items():
+        if entry_id not in entries:
+            continue
+        company_uuid, wing_uuid, entry_date = entries[entry_id]
+        through = checkpoints.get(str(company_uuid))
+        if through is None or entry_date > through:
+            continue
+        merged[(company_uuid, account_id, wing_uuid, entry_date)][0] += debit
+        merged[(company_uuid, account_id, wing_uuid, entry_date)][1] += credit
+
+    _apply_merged(merged)
+
+
+@transaction.atomic
+def move_entry_snapshots(entry, old_date, old_wing_uuid, totals):
+    """
+    Re-home an entry's posted totals after its date or wing changed: reverse
+    them in the old (date, wing) snapshots and add them to the new ones.
+    Only dates on or before the company's checkpoint are snapshotted.
+
+    totals: {account_id: (debit, credit)} of the items posted under the old header.
+    """
+    through = _lock_checkpoints([entry.company_uuid]).get(str(entry.company_uuid))
+    if through is None:
+        return
+
+    old_date, new_date = _as_date(old_date), _as_date(entry.date)
+    merged = defaultdict(lambda: [ZERO, ZERO])
+    for account_id, (debit, credit) in totals.items():
+        if old_date <= through:
+            merged[(entry.company_uuid, account_id, old_wing_uuid, old_date)][0] -= debit
+            merged[(entry.company_uuid, account_id, old_wing_uuid, old_date)][1] -= credit
+        if new_date <= through:
+            merged[(entry.company_uuid, account_id, entry.wing_uuid, new_date)][0] += debit
+            merged[(entry.company_uuid, account_id, entry.wing_uuid, new_date)][1] += credit
+    _apply_merged({k: v for k, v in merged.items() if v[0] or v[1]})
+
+
+def _apply_merged(merged):
+    """merged: {(company_uuid, account_id, wing_uuid, date): [debit, credit]}"""
+    for (company_uuid, account_id, wing_uuid, entry_date), (debit, credit) in merged.items():
+        scope = AccountBalanceSnapshot.objects.filter(company_uuid=company_uuid, account_id=account_id, wing_uuid=wing_uuid)
+        if not scope.filter(date=entry_date).exists():
+            previous = scope.filter(date__lt=entry_date).order_by('-date').first()
+            AccountBalanceSnapshot.objects.create(
+                company_uuid=company_uuid,
+                account_id=account_id,
+                wing_uuid=wing_uuid,
+                date=entry_date,
+                cumulative_debit=previous.cumulative_debit if previous else ZERO,
+                cumulative_credit=previous.cumulative_credit if previous else ZERO,
+            )
+        scope.filter(date__gte=entry_date).update(
+            cumulative_debit=F('cumulative_debit') + debit,
+            cumulative_credit=F('cumulative_credit') + credit,
+        )
+
+
+def frozen_through(company_uuid):
+    """End date of the latest closed accounting period (its snapshots are final)."""
+    period = AccountingPeriod.objects.filter(company_uuid=company_uuid, is_closed=True).order_by('-end_date').first()
+    return period.end_date if period else None
+
+
+@transaction.atomic
+def build_snapshots(company_uuid, through, rebuild=False):
+    """
+    Extend the company's snapshots up to `through` (inclusive). With rebuild,
+    everything after the last closed period is recomputed from journal items.
+    Returns the number of snapshot rows written.
+    """
+    through = _as_date(through)
+    checkpoint = BalanceSnapshotCheckpoint.objects.select_for_update().filter(company_uuid=company_uuid).first()
+    start_after = checkpoint.snapshot_through if checkpoint else None
+
+    if rebuild:
+        frozen = frozen_through(company_uuid)
+        start_after = frozen if (frozen and start_after and frozen <= start_after) else None
+        stale = AccountBalanceSnapshot.objects.filter(company_uuid=company_uuid)
+        if start_after:
+            stale = stale.filter(date__gt=start_after)
+        stale.delete()
+
+    if start_after and start_after >= through:
+        return 0
+
+    # Running totals seeded from the latest snapshot of each (account, wing)
+    running = defaultdict(lambda: [ZERO, ZERO])
+    if start_after:
+        for (account_id, wing_uuid), values in _latest_per_scope(company_uuid, start_after).items():
+            running[(account_id, wing_uuid)] = values
+
+    daily = JournalItem.objects.filter(entry__company_uuid=company_uuid, entry__date__lte=through)
+    if start_after:
+        daily = daily.filter(entry__date__gt=start_after)
+    daily = daily.values('account_id', 'entry__wing_uuid', 'entry__date').annotate(
+        total_debit=Sum('debit'), total_credit=Sum('credit')
+    ).order_by('entry__date')
+
+    rows = []
+    for row in daily.iterator():
+        scope = (row['account_id'], row['entry__wing_uuid'])
+        running[scope][0] += row['total_debit'] or ZERO
+        running[scope][1] += row['total_credit'] or ZERO
+        rows.append(AccountBalanceSnapshot(
+            company_uuid=company_uuid,
+            account_id=row['account_id'],
+            wing_uuid=row['entry__wing_uuid'],
+            date=row['entry__date'],
+            cumulative_debit=running[scope][0],
+            cumulative_credit=running[scope][1],
+        ))
+    AccountBalanceSnapshot.objects.bulk_create(rows, batch_size=1000)
+
+    BalanceSnapshotCheckpoint.objects.update_or_create(
+        company_uuid=company_uuid, defaults={'snapshot_through': through}
+    )
+    return len(rows)
+
+
+def _latest_per_scope(company_uuid, on_or_before):
+    latest = AccountBalanceSnapshot.objects.filter(company_uuid=company_uuid, date__lte=on_or_before).order_by(
+        'account_id', 'wing_uuid', '-date'
+    ).distinct('account_id', 'wing_uuid').values_list('account_id', 'wing_uuid', 'cumulative_debit', 'cumulative_credit')
+    return {(a, w): [d, c] for a, w, d, c in latest}
+
+
+def default_through():
+    """Snapshots cover closed days; today is always read live."""
+    from django.utils import timezone
+    return timezone.now().date() - timedelta(days=1)
@@ -1,22 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
 from django.db import connection
 
+# Resolution is cached at three levels:
+#   1. request memo   - a request never resolves the same company twice
+#   2. process LRU    - short TTL, since other processes cannot invalidate it
+#   3. Django cache   - shared, invalidated by company.tenant.changed events
+_request_memo = threading.local()
+_local_units = OrderedDict()
+_local_lock = threading.Lock()
+
+CACHE_KEY_PREFIX = 'ledger:tenant_units:'
+
+
+def _local_ttl():
+    return getattr(settings, 'TENANT_UNIT_LOCAL_TTL', 60)
+
+
+def _local_get(key):
+    with _local_lock:
+        entry = _local_units.get(key)
+        if entry is None:
+            return None
+        expires_at, ids = entry
+        if expires_at < time.monotonic():
+            del _local_units[key]
+            return None
+        _local_units.move_to_end(key)
+        return ids
+
+
+def _local_set(key, ids):
+    with _local_lock:
+        _local_units[key] = (time.monotonic() + _local_ttl(), ids)
+        _local_units.move_to_end(key)
+        while len(_local_units) > getattr(settings, 'TENANT_UNIT_LOCAL_SIZE', 1024):
+            _local_units.popitem(last=False)
+
+
+@contextmanager
+def tenant_unit_memo():
+    """Scope a per-request memo of tenant resolutions (see TenantUnitMemoMiddleware)."""
+    previous = getattr(_request_memo, 'units', None)
+    _request_memo.units = {}
+    try:
+        yield
+    finally:
+        _request_memo.units = previous
+
+
 def get_tenant_unit_ids(company_uuid):
     """
     Given a company_uuid (which might be a Tenant ID or a Unit ID),
     returns a list of all related Unit IDs (Company PKs) in that tenant.
-    
+
     This works across schemas in Single DB mode.
     """
     if not company_uuid:
         return []
-        
+
+    key = str(company_uuid)
+    memo = getattr(_request_memo, 'units', None)
+    if memo is not None and key in memo:
+        return list(memo[key])
+
+    ids = _local_get(key)
+    if ids is None:
+        ids = cache.get(CACHE_KEY_PREFIX + key)
+        if ids is None:
+            ids, resolved = _resolve_tenant_unit_ids(key)
+            if resolved:
+                cache.set(CACHE_KEY_PREFIX + key, ids, getattr(settings, 'TENANT_UNIT_CACHE_TTL', 3600))
+        else:
+            resolved = True
+        if resolved:
+            _local_set(key, ids)
+
+    if memo is not None:
+        memo[key] = ids
+    return list(ids)
+
+
+def invalidate_tenant_unit_ids(company_uuids):
+    """
+    Drop cached resolutions for the given ids and for every unit currently in
+    their tenant, so both old and new members re-resolve.
+    """
+    keys = {str(c) for c in company_uuids if c}
+    for key in list(keys):
+        ids, resolved = _resolve_tenant_unit_ids(key)
+        if resolved:
+            keys.update(ids)
+
+    cache.delete_many([CACHE_KEY_PREFIX + key for key in keys])
+    with _local_lock:
+        for key in keys:
+            _local_units.pop(key, None)
+    return keys
+
+
+def _resolve_tenant_unit_ids(company_uuid):
+    """Returns (ids, resolved); resolved is False when the lookup itself failed."""
     try:
         with connection.cursor() as cursor:
             # Query the company schema's tenants_company table
             # We want all IDs that share the same auth_company_uuid as the provided ID,
             # or where the ID itself is the auth_company_uuid.
             query = """
-                SELECT id, auth_company_uuid FROM company.tenants_company 
+                SELECT id, auth_company_uuid FROM company.tenants_company
                 WHERE auth_company_uuid = (
                     SELECT auth_company_uuid FROM company.tenants_company WHERE id = %s OR auth_company_uuid = %s LIMIT 1
                 )
@@ -28,16 +123,17 @@ def get_tenant_unit_ids(company_uuid):
             ids = set()
             for row in rows:
                 ids.add(str(row[0])) # unit id
-                ids.add(str(row[1])) # tenant id
-            
+                if row[1]:
+                    ids.add(str(row[1])) # tenant id
+
             ids = list(ids)
-            
+
             # If no matches found in company table (maybe it's a test ID not in DB),
             # at least return the ID itself.
             if not ids:
-                return [str(company_uuid)]
-            return ids
+                return [str(company_uuid)], True
+            return ids, True
     except Exception as e:
         # Fallback if company schema doesn't exist or other error
         print(f"Error resolving tenant units: {e}")
-        return [str(company_uuid)]
+        return [str(company_uuid)], False
@@ -7,7 +7,7 @@ from .serializers import (
     AccountGroupSerializer, ChartOfAccountSerializer, 
     JournalEntrySerializer, SystemAccountSerializer
 )
-from .report_services import ReportService
+from .report_services import AccountTree, ReportService
 from .utils import get_tenant_unit_ids
 
 from django.db.models import Sum, Q, DecimalField, F
@@ -142,9 +142,9 @@ class BalanceSheetView(APIView):
             as_of_date=as_of_date
         )
 
-        # Consolidated report logic
+        # Consolidated report logic: group tree loaded once, rolled up in memory
         company_ids = get_tenant_unit_ids(company_uuid)
-        groups = AccountGroup.objects.filter(parent=None, company_uuid__in=company_ids)
+        tree = AccountTree(company_ids)
 
         data = {
             "asset": {"groups": [], "total": Decimal('0')},
@@ -152,8 +152,8 @@ class BalanceSheetView(APIView):
             "equity": {"groups": [], "total": Decimal('0')},
         }
         
-        for group in groups:
-            group_total = self.calculate_group_total(group, wing_uuid, balance_map)
+        for group in tree.roots():
+            group_total = self.calculate_group_total(tree, group, wing_uuid, balance_map)
             group_data = {
                 "name": group.name,
                 "total": str(group_total),
@@ -171,26 +171,19 @@ class BalanceSheetView(APIView):
 
         return Response(data)
 
-    def calculate_group_total(self, group, wing_uuid, balance_map):
-        total = Decimal('0')
-        # 1. Direct accounts
-        for acc in group.accounts.all():
+    def calculate_group_total(self, tree, group, wing_uuid, balance_map):
+        def account_value(acc, owner):
             b = balance_map.get(acc.id, {})
             debits = b.get('cumulative_debit', Decimal('0'))
             credits = b.get('cumulative_credit', Decimal('0'))
             
             acc_opening = acc.opening_balance if not wing_uuid else Decimal('0')
             
-            if group.group_type.lower() in ['asset', 'expense']:
-                total += (acc_opening + debits - credits)
-            else:
-                total += (acc_opening + credits - debits)
-        
-        # 2. Subgroups recursion
-        for sub in group.subgroups.all():
-            total += self.calculate_group_total(sub, wing_uuid, balance_map)
-            
-        return total
+            if owner.group_type.lower() in ['asset', 'expense']:
+                return acc_opening + debits - credits
+            return acc_opening + credits - debits
+
+        return tree.rollup(group, account_value)
 
 class ProfitLossView(APIView):
     def get(self, request):
@@ -210,12 +203,9 @@ class ProfitLossView(APIView):
             start_date=start_date
         )
 
-        # Consolidated report logic
+        # Consolidated report logic: group tree loaded once, rolled up in memory
         company_ids = get_tenant_unit_ids(company_uuid)
-        groups = AccountGroup.objects.filter(
-            parent=None, 
-            company_uuid__in=company_ids
-        ).filter(Q(group_type__iexact="income") | Q(group_type__iexact="expense"))
+        tree = AccountTree(company_ids)
 
         data = {
             "income": {"groups": [], "total": Decimal('0')},
@@ -223,12 +213,12 @@ class ProfitLossView(APIView):
             "net_profit": Decimal('0')
         }
         
-        for group in groups:
+        for group in tree.roots():
             g_type = group.group_type.lower()
             if g_type not in ["income", "expense"]:
                 continue
                 
-            group_total = self.calculate_periodic_total(group, balance_map)
+            group_total = self.calculate_periodic_total(tree, group, balance_map)
             group_data = {
                 "name": group.name,
                 "total": str(group_total),
@@ -246,23 +236,18 @@ class ProfitLossView(APIView):
 
         return Response(data)
 
-    def calculate_periodic_total(self, group, balance_map):
-        total = Decimal('0')
-        for acc in group.accounts.all():
+    def calculate_periodic_total(self, tree, group, balance_map):
+        def account_value(acc, owner):
             b = balance_map.get(acc.id, {})
             debits = b.get('periodic_debit', Decimal('0'))
             credits = b.get('periodic_credit', Decimal('0'))
             
             # For P&L, we don't use opening balances. We only track activity in the period.
-            if group.group_type.lower() == 'expense':
-                total += (debits - credits)
-            else: # Income
-                total += (credits - debits)
-        
-        for sub in group.subgroups.all():
-            total += self.calculate_periodic_total(sub, balance_map)
-            
-        return total
+            if owner.group_type.lower() == 'expense':
+                return debits - credits
+            return credits - debits # Income
+
+        return tree.rollup(group, account_value)
 
 class TrialBalanceView(APIView):
     def get(self, request):
@@ -270,31 +255,28 @@ class TrialBalanceView(APIView):
         wing_uuid = request.query_params.get('wing_uuid')
         as_of_date = request.query_params.get('date')
 
-        # Consolidated report logic
-        acc_filter = Q()
-        if company_uuid:
-            company_ids = get_tenant_unit_ids(company_uuid)
-            acc_filter &= Q(company_uuid__in=company_ids)
-            
-        accounts = ChartOfAccount.objects.filter(acc_filter)
+        # One grouped aggregate for every account, accounts + groups loaded once
+        company_ids = get_tenant_unit_ids(company_uuid) if company_uuid else None
+        balance_map = ReportService.get_all_account_balances(
+            company_uuid=company_uuid,
+            wing_uuid=wing_uuid,
+            as_of_date=as_of_date,
+            include_periodic=False
+        )
+        tree = AccountTree(company_ids)
         
         results = []
         total_debit = Decimal('0')
         total_credit = Decimal('0')
 
-        for acc in accounts:
-            items_qs = JournalItem.objects.filter(account=acc)
-            if wing_uuid:
-                items_qs = items_qs.filter(entry__wing_uuid=wing_uuid)
-            if as_of_date:
-                items_qs = items_qs.filter(entry__date__lte=as_of_date)
-            
-            debits = items_qs.aggregate(Sum('debit'))['debit__sum'] or Decimal('0')
-            credits = items_qs.aggregate(Sum('credit'))['credit__sum'] or Decimal('0')
+        for acc in tree.accounts:
+            b = balance_map.get(acc.id, {})
+            debits = b.get('cumulative_debit', Decimal('0'))
+            credits = b.get('cumulative_credit', Decimal('0'))
             
             # Opening balance integration
             acc_opening = acc.opening_balance if not wing_uuid else Decimal('0')
-            group_type = acc.group.group_type.lower()
+            group_type = tree.group_type_of(acc)
             
             balance = Decimal('0')
             if group_type in ['asset', 'expense']:
@@ -342,26 +324,15 @@ class AccountingDashboardView(APIView):
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
         
+        company_ids = get_tenant_unit_ids(company_uuid) if company_uuid else None
+
         # Filter for Journal items
         item_filter = Q()
         if company_uuid:
-            company_ids = get_tenant_unit_ids(company_uuid)
             item_filter &= Q(entry__company_uuid__in=company_ids)
         if wing_uuid:
             item_filter &= Q(entry__wing_uuid=wing_uuid)
 
-        # Base filter for date-specific queries (Trends, Expenses)
-        date_filter = Q()
-        if start_date:
-            date_filter &= Q(entry__date__gte=start_date)
-        if end_date:
-            date_filter &= Q(entry__date__lte=end_date)
-        
-        # Base filter for cumulative queries (Balance Sheet components like Assets, Cash)
-        cumulative_filter = Q()
-        if end_date:
-            cumulative_filter &= Q(entry__date__lte=end_date)
-
         # 1. Income vs Expense Trend (Last 6 months)
         if not start_date:
             start_date = timezone.now().date().replace(day=1) - timezone.timedelta(days=150)
@@ -376,36 +347,44 @@ class AccountingDashboardView(APIView):
         if end_date:
             monthly_qs = monthly_qs.filter(entry__date__lte=end_date)
             
+        # Aggregate per (month, group type) in the database instead of per item
         monthly_qs = monthly_qs.annotate(
             month=TruncMonth('entry__date')
+        ).values('month', 'account__group__group_type').annotate(
+            total_debit=Sum('debit'),
+            total_credit=Sum('credit')
         )
         
-        for item in monthly_qs:
-            m_str = item.month.strftime('%b %Y')
+        for row in monthly_qs:
+            m_str = row['month'].strftime('%b %Y')
             if m_str not in trend_data:
                 trend_data[m_str] = {"month": m_str, "income": Decimal('0'), "expense": Decimal('0')}
             
-            g_type = item.account.group.group_type.lower()
+            debit = row['total_debit'] or Decimal('0')
+            credit = row['total_credit'] or Decimal('0')
+            g_type = row['account__group__group_type'].lower()
             if g_type == 'income':
                 # Income: Credit - Debit
-                trend_data[m_str]["income"] += (item.credit - item.debit)
+                trend_data[m_str]["income"] += (credit - debit)
             elif g_type == 'expense':
                 # Expense: Debit - Credit
-                trend_data[m_str]["expense"] += (item.debit - item.credit)
+                trend_data[m_str]["expense"] += (debit - credit)
 
         trends = sorted(trend_data.values(), key=lambda x: timezone.datetime.strptime(x['month'], '%b %Y'))
 
+        # Cumulative balances for every account (one grouped aggregate) + group tree
+        balance_map = ReportService.get_all_account_balances(
+            company_uuid=company_uuid,
+            wing_uuid=wing_uuid,
+            as_of_date=end_date,
+            include_periodic=False
+        )
+        tree = AccountTree(company_ids)
+
         # 2. Asset Distribution
-        # Use company_uuid filter for groups
-        group_base = Q(parent=None, group_type__iexact='asset')
-        if company_uuid:
-            company_ids = get_tenant_unit_ids(company_uuid)
-            group_base &= Q(company_uuid__in=company_ids)
-        
-        asset_groups = AccountGroup.objects.filter(group_base)
         assets_dist = []
-        for g in asset_groups:
-            bal = self.get_group_balance(g, wing_uuid, end_date)
+        for g in tree.roots('asset'):
+            bal = self.get_group_balance(tree, g, wing_uuid, balance_map)
             if bal > 0:
                 assets_dist.append({"name": g.name, "value": float(bal)})
 
@@ -413,7 +392,6 @@ class AccountingDashboardView(APIView):
         # Aggregate per account
         acc_base = Q(group__group_type__iexact='expense')
         if company_uuid:
-            company_ids = get_tenant_unit_ids(company_uuid)
             acc_base &= Q(company_uuid__in=company_ids)
             
         # We need a separate filter for the annotation
@@ -435,17 +413,13 @@ class AccountingDashboardView(APIView):
         top_expenses = [{"name": acc.name, "value": float(acc.total_exp)} for acc in expense_accounts if acc.total_exp > 0]
 
         # 4. Cash Balance
-        cash_base = Q(name__icontains='cash')
-        if company_uuid:
-            company_ids = get_tenant_unit_ids(company_uuid)
-            cash_base &= Q(company_uuid__in=company_ids)
-            
-        cash_accounts = ChartOfAccount.objects.filter(cash_base)
         total_cash = Decimal('0')
-        for acc in cash_accounts:
-            items = JournalItem.objects.filter(item_filter, cumulative_filter, account=acc)
-            debits = items.aggregate(Sum('debit'))['debit__sum'] or Decimal('0')
-            credits = items.aggregate(Sum('credit'))['credit__sum'] or Decimal('0')
+        for acc in tree.accounts:
+            if 'cash' not in acc.name.lower():
+                continue
+            b = balance_map.get(acc.id, {})
+            debits = b.get('cumulative_debit', Decimal('0'))
+            credits = b.get('cumulative_credit', Decimal('0'))
             # Only add opening balance if viewing unit-level (no wing filter)
             opening = acc.opening_balance if not wing_uuid else Decimal('0')
             total_cash += (opening + debits - credits)
@@ -457,21 +431,15 @@ class AccountingDashboardView(APIView):
             "cash_balance": str(total_cash)
         })
 
-    def get_group_balance(self, group, wing_uuid, end_date=None):
-        total = Decimal('0')
-        for acc in group.accounts.all():
-            items_qs = JournalItem.objects.filter(account=acc)
-            if wing_uuid:
-                items_qs = items_qs.filter(entry__wing_uuid=wing_uuid)
-            if end_date:
-                items_qs = items_qs.filter(entry__date__lte=end_date)
-            debits = items_qs.aggregate(Sum('debit'))['debit__sum'] or Decimal('0')
-            credits = items_qs.aggregate(Sum('credit'))['credit__sum'] or Decimal('0')
+    def get_group_balance(self, tree, group, wing_uuid, balance_map):
+        def account_value(acc, owner):
+            b = balance_map.get(acc.id, {})
+            debits = b.get('cumulative_debit', Decimal('0'))
+            credits = b.get('cumulative_credit', Decimal('0'))
             acc_opening = acc.opening_balance if not wing_uuid else Decimal('0')
-            total += (acc_opening + debits - credits)
-        for sub in group.subgroups.all():
-            total += self.get_group_balance(sub, wing_uuid, end_date)
-        return total
+            return acc_opening + debits - credits
+
+        return tree.rollup(group, account_value)
 
 class SystemAccountViewSet(viewsets.ModelViewSet):
     queryset = SystemAccount.objects.all()
@@ -25,3 +25,11 @@ class TaxCalculationRequestSerializer(serializers.Serializer):
     amount = serializers.DecimalField(max_digits=12, decimal_places=2)
     zone_code = serializers.CharField(max_length=50)
     product_category_uuid = serializers.UUIDField(required=False, allow_null=True)
+
+class TaxBatchLineSerializer(serializers.Serializer):
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    product_category_uuid = serializers.UUIDField(required=False, allow_null=True)
+
+class TaxBatchCalculationRequestSerializer(serializers.Serializer):
+    zone_code = serializers.CharField(max_length=50)
+    lines = TaxBatchLineSerializer(many=True)
@@ -58,3 +58,70 @@ class TaxEngine:
             'total_tax': float(total_tax_amount),
             'taxes': applied_taxes
         }
+
+    @staticmethod
+    def get_rule_set(company_uuid, zone_code=None):
+        """
+        Returns every active rule of the company (optionally one zone) as plain
+        dicts, so callers can cache the set and evaluate it without touching the DB.
+        """
+        rules = TaxRule.objects.filter(
+            company_uuid=company_uuid,
+            is_active=True,
+            tax_zone__is_active=True,
+        ).select_related('tax', 'tax_zone')
+        if zone_code:
+            rules = rules.filter(tax_zone__code=zone_code)
+
+        return [
+            {
+                'zone_code': rule.tax_zone.code,
+                'product_category_uuid': str(rule.product_category_uuid) if rule.product_category_uuid else None,
+                'priority': rule.priority,
+                'tax_id': str(rule.tax.id),
+                'name': rule.tax.name,
+                'rate': str(rule.tax.rate),
+            }
+            for rule in rules
+        ]
+
+    @staticmethod
+    def calculate_tax_batch(company_uuid, zone_code, lines):
+        """
+        Calculates tax for many (amount, category) lines with a single rule query.
+        Each line is a dict with 'amount' and optional 'product_category_uuid'.
+        """
+        rules = TaxEngine.get_rule_set(company_uuid, zone_code)
+        results = []
+        grand_total = Decimal('0.00')
+
+        for line in lines:
+            amount = Decimal(str(line.get('amount', 0)))
+            category_uuid = line.get('product_category_uuid')
+            category_uuid = str(category_uuid) if category_uuid else None
+
+            total_tax_amount = Decimal('0.00')
+            applied_taxes = []
+            for rule in rules:
+                # Same matching as get_applicable_taxes: category rules + global rules
+                if rule['product_category_uuid'] not in (None, category_uuid):
+                    continue
+                tax_amount = (amount * Decimal(rule['rate'])) / Decimal('100.00')
+                total_tax_amount += tax_amount
+                applied_taxes.append({
+                    'tax_id': rule['tax_id'],
+                    'name': rule['name'],
+                    'rate': float(rule['rate']),
+                    'amount': float(tax_amount)
+                })
+
+            grand_total += total_tax_amount
+            results.append({
+                'total_tax': float(total_tax_amount),
+                'taxes': applied_taxes
+            })
+
+        return {
+            'total_tax': float(grand_total),
+            'lines': results
+        }
@@ -6,7 +6,8 @@ from .serializers import (
     TaxSerializer, 
     TaxZoneSerializer, 
     TaxRuleSerializer,
-    TaxCalculationRequestSerializer
+    TaxCalculationRequestSerializer,
+    TaxBatchCalculationRequestSerializer
 )
 from .services import TaxEngine
 
@@ -69,3 +70,31 @@ class TaxEngineViewSet(viewsets.ViewSet):
             )
             return Response(result)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post'])
+    def calculate_batch(self, request):
+        """Tax for every line of an order in one call (one rule query)."""
+        serializer = TaxBatchCalculationRequestSerializer(data=request.data)
+        if serializer.is_valid():
+            company_uuid = request.headers.get('X-Company-Id')
+            if not company_uuid:
+                return Response({"error": "Missing X-Company-Id header"}, status=status.HTTP_400_BAD_REQUEST)
+
+            result = TaxEngine.calculate_tax_batch(
+                company_uuid=company_uuid,
+                zone_code=serializer.validated_data['zone_code'],
+                lines=serializer.validated_data['lines']
+            )
+            return Response(result)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['get'])
+    def rules(self, request):
+        """Compiled rule set for the company, cached by POS to compute tax in-process."""
+        company_uuid = request.headers.get('X-Company-Id')
+        if not company_uuid:
+            return Response({"error": "Missing X-Company-Id header"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "rules": TaxEngine.get_rule_set(company_uuid, request.query_params.get('zone_code'))
+        })
@@ -1 +1,16 @@
 from adaptix_core.middleware import JWTCompanyMiddleware
+from apps.ledger.utils import tenant_unit_memo
+
+
+class TenantUnitMemoMiddleware:
+    """
+    Memoize get_tenant_unit_ids for the duration of one request so views,
+    report services and viewsets never resolve the same tenant twice.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with tenant_unit_memo():
+            return self.get_response(request)
@@ -101,3 +101,237 @@ class TestAccountingLogic:
         
         assert cash_acct.current_balance == amount
         assert sales_acct.current_balance == amount
+
+    def test_incremental_balances(self, company_uuid):
+        """JournalItem changes post deltas; bulk_post applies one update per account."""
+        from django.core.management import call_command
+
+        asset_group = AccountGroup.objects.create(company_uuid=company_uuid, name="Assets", group_type="asset")
+        income_group = AccountGroup.objects.create(company_uuid=company_uuid, name="Income", group_type="income")
+        cash = ChartOfAccount.objects.create(company_uuid=company_uuid, group=asset_group, name="Cash", code="1000", opening_balance=Decimal("50.00"))
+        sales = ChartOfAccount.objects.create(company_uuid=company_uuid, group=income_group, name="Sales", code="4000")
+        entry = JournalEntry.objects.create(company_uuid=company_uuid, date=date.today(), reference="S-1")
+
+        item = JournalItem.objects.create(entry=entry, account=cash, debit=Decimal("30.00"))
+        JournalItem.objects.create(entry=entry, account=sales, credit=Decimal("30.00"))
+        cash.refresh_from_db()
+        assert cash.current_balance == Decimal("80.00")
+
+        item.debit = Decimal("20.00")
+        item.save()
+        cash.refresh_from_db()
+        assert cash.current_balance == Decimal("70.00")
+
+        JournalItem.bulk_post([
+            JournalItem(entry=entry, account=cash, debit=Decimal("5.00")),
+            JournalItem(entry=entry, account=cash, debit=Decimal("5.00")),
+            JournalItem(entry=entry, account=sales, credit=Decimal("10.00")),
+        ])
+        cash.refresh_from_db()
+        sales.refresh_from_db()
+        assert cash.current_balance == Decimal("80.00")
+        assert sales.current_balance == Decimal("40.00")
+
+        item.delete()
+        cash.refresh_from_db()
+        assert cash.current_balance == Decimal("60.00")
+
+        ChartOfAccount.objects.filter(pk=cash.pk).update(current_balance=Decimal("0"))
+        call_command("reconcile_balances", company=company_uuid, fix=True)
+        cash.refresh_from_db()
+        assert cash.current_balance == Decimal("60.00")
+
+
+@pytest.mark.django_db
+class TestReportQueryCounts:
+    def _build_ledger(self, company_uuid, account_count):
+        assets = AccountGroup.objects.create(company_uuid=company_uuid, name="Assets", group_type="asset")
+        current = AccountGroup.objects.create(company_uuid=company_uuid, name="Current Assets", group_type="asset", parent=assets)
+        income = AccountGroup.objects.create(company_uuid=company_uuid, name="Income", group_type="income")
+        sales = ChartOfAccount.objects.create(company_uuid=company_uuid, group=income, name="Sales", code="4000")
+        entry = JournalEntry.objects.create(company_uuid=company_uuid, date=date.today(), reference="S-1")
+        items = []
+        for i in range(account_count):
+            acc = ChartOfAccount.objects.create(
+                company_uuid=company_uuid, group=current if i % 2 else assets, name=f"Cash {i}", code=f"1{i:03d}"
+            )
+            items.append(JournalItem(entry=entry, account=acc, debit=Decimal("10.00")))
+            items.append(JournalItem(entry=entry, account=sales, credit=Decimal("10.00")))
+        JournalItem.bulk_post(items)
+
+    @pytest.mark.parametrize("path_view", ["TrialBalanceView", "AccountingDashboardView", "BalanceSheetView"])
+    def test_reports_use_constant_queries(self, company_uuid, mocker, django_assert_max_num_queries, path_view):
+        from rest_framework.test import APIRequestFactory
+        from apps.ledger import views
+
+        mocker.patch("apps.ledger.views.get_tenant_unit_ids", return_value=[company_uuid])
+        mocker.patch("apps.ledger.report_services.get_tenant_unit_ids", return_value=[company_uuid])
+        self._build_ledger(company_uuid, 25)
+
+        view = getattr(views, path_view).as_view()
+        request = APIRequestFactory().get("/", {"company_uuid": company_uuid})
+        with django_assert_max_num_queries(6):
+            response = view(request)
+        assert response.status_code == 200
+
+    def test_trial_balance_totals(self, company_uuid, mocker):
+        from rest_framework.test import APIRequestFactory
+        from apps.ledger.views import TrialBalanceView
+
+        mocker.patch("apps.ledger.views.get_tenant_unit_ids", return_value=[company_uuid])
+        mocker.patch("apps.ledger.report_services.get_tenant_unit_ids", return_value=[company_uuid])
+        self._build_ledger(company_uuid, 3)
+
+        response = TrialBalanceView.as_view()(APIRequestFactory().get("/", {"company_uuid": company_uuid}))
+        assert response.data["total_debit"] == "30.00"
+        assert response.data["total_credit"] == "30.00"
+        assert response.data["is_balanced"]
+
+
+@pytest.mark.django_db
+class TestBalanceSnapshots:
+    def test_as_of_reports_match_full_aggregate(self, company_uuid, mocker):
+        """Snapshot + tail balances equal a full aggregate, including back-dated postings."""
+        from datetime import timedelta
+        from apps.ledger.report_services import ReportService
+        from apps.ledger.snapshots import build_snapshots
+
+        mocker.patch("apps.ledger.report_services.get_tenant_unit_ids", return_value=[company_uuid])
+        group = AccountGroup.objects.create(company_uuid=company_uuid, name="Assets", group_type="asset")
+        cash = ChartOfAccount.objects.create(company_uuid=company_uuid, group=group, name="Cash", code="1000")
+        today = date.today()
+
+        def post(days_ago, amount):
+            entry = JournalEntry.objects.create(company_uuid=company_uuid, date=today - timedelta(days=days_ago))
+            JournalItem.objects.create(entry=entry, account=cash, debit=Decimal(amount))
+
+        post(10, "10.00")
+        post(5, "20.00")
+        post(0, "40.00")
+        build_snapshots(company_uuid, today - timedelta(days=1))
+
+        # Back-dated posting inside the snapshotted range
+        post(7, "1.00")
+
+        balances = ReportService.get_all_account_balances(company_uuid)
+        assert balances[cash.id]["cumulative_debit"] == Decimal("71.00")
+
+        as_of = ReportService.get_all_account_balances(company_uuid, as_of_date=today - timedelta(days=6))
+        assert as_of[cash.id]["cumulative_debit"] == Decimal("11.00")
+
+        window = ReportService.get_all_account_balances(
+            company_uuid, start_date=today - timedelta(days=6), as_of_date=today
+        )
+        assert window[cash.id]["periodic_debit"] == Decimal("60.00")
+
+    def test_posting_waits_for_snapshot_build(self, company_uuid):
+        """Postings read the checkpoint FOR SHARE, so they queue behind build_snapshots' FOR UPDATE."""
+        from datetime import timedelta
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from apps.ledger.snapshots import build_snapshots
+
+        group = AccountGroup.objects.create(company_uuid=company_uuid, name="Assets", group_type="asset")
+        cash = ChartOfAccount.objects.create(company_uuid=company_uuid, group=group, name="Cash", code="1000")
+        build_snapshots(company_uuid, date.today() - timedelta(days=1))
+        entry = JournalEntry.objects.create(company_uuid=company_uuid, date=date.today() - timedelta(days=3))
+
+        with CaptureQueriesContext(connection) as queries:
+            JournalItem.objects.create(entry=entry, account=cash, debit=Decimal("5.00"))
+        assert any("FOR SHARE" in query["sql"] for query in queries.captured_queries)
+
+    def test_moving_entry_date_or_wing_moves_snapshots(self, company_uuid, mocker):
+        """Editing a snapshotted entry's date or wing re-homes its totals, with or without new items."""
+        from datetime import timedelta
+        from apps.ledger.report_services import ReportService
+        from apps.ledger.serializers import JournalEntrySerializer
+        from apps.ledger.snapshots import build_snapshots
+
+        mocker.patch("apps.ledger.report_services.get_tenant_unit_ids", return_value=[company_uuid])
+        group = AccountGroup.objects.create(company_uuid=company_uuid, name="Assets", group_type="asset")
+        cash = ChartOfAccount.objects.create(company_uuid=company_uuid, group=group, name="Cash", code="1000")
+        today = date.today()
+
+        entry = JournalEntry.objects.create(company_uuid=company_uuid, date=today - timedelta(days=10))
+        JournalItem.objects.create(entry=entry, account=cash, debit=Decimal("10.00"))
+        build_snapshots(company_uuid, today - timedelta(days=1))
+
+        def debit_as_of(days_ago, wing_uuid=None):
+            balances = ReportService.get_all_account_balances(
+                company_uuid, as_of_date=today - timedelta(days=days_ago), wing_uuid=wing_uuid
+            )
+            return balances.get(cash.id, {}).get("cumulative_debit", Decimal("0"))
+
+        # Header-only date change
+        serializer = JournalEntrySerializer(entry, data={"date": today - timedelta(days=3)}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        assert debit_as_of(5) == Decimal("0")
+        assert debit_as_of(3) == Decimal("10.00")
+
+        # Date change together with new items
+        items = [{"account": cash.id, "debit": "25.00", "credit": "0"}]
+        serializer = JournalEntrySerializer(
+            entry, data={"date": today - timedelta(days=8), "items": items}, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        assert debit_as_of(9) == Decimal("0")
+        assert debit_as_of(8) == Decimal("25.00")
+        assert debit_as_of(2) == Decimal("25.00")
+
+        # Moving to a wing takes the totals out of the company-level scope
+        wing_uuid = str(uuid.uuid4())
+        serializer = JournalEntrySerializer(entry, data={"wing_uuid": wing_uuid}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        assert debit_as_of(2, wing_uuid=wing_uuid) == Decimal("25.00")
+        assert debit_as_of(2) == Decimal("25.00")
+
+
+class TestTenantUnitCache:
+    def test_resolution_is_cached_and_invalidated(self, mocker):
+        from django.core.cache import cache
+        from apps.ledger import utils
+
+        cache.clear()
+        utils._local_units.clear()
+        tenant, unit = str(uuid.uuid4()), str(uuid.uuid4())
+        resolve = mocker.patch.object(utils, "_resolve_tenant_unit_ids", return_value=([tenant, unit], True))
+
+        with utils.tenant_unit_memo():
+            assert sorted(utils.get_tenant_unit_ids(unit)) == sorted([tenant, unit])
+            assert sorted(utils.get_tenant_unit_ids(unit)) == sorted([tenant, unit])
+        assert resolve.call_count == 1
+
+        # Another process (empty local LRU) is served from the shared cache
+        utils._local_units.clear()
+        utils.get_tenant_unit_ids(unit)
+        assert resolve.call_count == 1
+
+        utils.invalidate_tenant_unit_ids([tenant])
+        utils.get_tenant_unit_ids(unit)
+        assert resolve.call_count == 3  # one for the invalidation sweep, one re-resolve
+
+
+@pytest.mark.django_db
+class TestAccountingConsumerBatch:
+    def test_post_sales_is_batched_and_idempotent(self, company_uuid):
+        from apps.ledger.management.commands.run_accounting_consumer import Command
+
+        command = Command()
+        sales = [
+            {"company_uuid": company_uuid, "order_number": f"ORD-{i}", "grand_total": "10.00"}
+            for i in range(5)
+        ]
+        # Redelivered message inside the same batch
+        sales.append(dict(sales[0]))
+
+        command.post_sales(sales)
+        # Redelivery of the whole batch later
+        command.post_sales(sales)
+
+        assert JournalEntry.objects.filter(company_uuid=company_uuid, source="pos").count() == 5
+        assert JournalItem.objects.filter(entry__company_uuid=company_uuid).count() == 10
+        cash = ChartOfAccount.objects.get(company_uuid=company_uuid, code="1001")
+        assert cash.current_balance == Decimal("50.00")
@@ -0,0 +1,24 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+from adaptix_core.token_cache import verified_tokens
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that reuses the signature check JWTCompanyMiddleware
+    already did for this exact token, instead of verifying RS256 again.
+    Expiry and token type are still checked; unknown tokens fall through
+    to the normal verification.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = raw_token.decode() if isinstance(raw_token, bytes) else raw_token
+        if verified_tokens.get(token) is not None:
+            try:
+                validated = AccessToken(token, verify=False)
+                validated.verify()
+                return validated
+            except TokenError:
+                pass
+        return super().get_validated_token(raw_token)
@@ -1,5 +1,7 @@
 # services/auth/apps/accounts/jwks.py
 import json
+import os
+import threading
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.backends import default_backend
@@ -15,3 +17,21 @@ def load_jwk_from_pem(pub_pem_path):
     jwk_json["alg"] = "RS256"
     jwk_json["use"] = "sig"
     return jwk_json
+
+
+_jwks_cache = {}
+_jwks_lock = threading.Lock()
+
+def get_jwks(pub_pem_path):
+    """
+    JWKS document for the public key. Built once and reused until the PEM
+    file's mtime changes, so key rotation doesn't need a restart.
+    """
+    mtime = os.stat(pub_pem_path).st_mtime
+    cached = _jwks_cache.get(pub_pem_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with _jwks_lock:
+        jwks = {"keys": [load_jwk_from_pem(pub_pem_path)]}
+        _jwks_cache[pub_pem_path] = (mtime, jwks)
+    return jwks
@@ -4,10 +4,11 @@ from django.http import JsonResponse
 from django.contrib.auth import authenticate, get_user_model
 from rest_framework.permissions import IsAuthenticated,AllowAny
 from rest_framework import viewsets, status
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, authentication_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .jwks import load_jwk_from_pem
+from .jwks import get_jwks
+from .authentication import CachedJWTAuthentication
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.backends import TokenBackend
 from .utils import api_response
@@ -552,6 +553,7 @@ def login_view(request):
 
 
 @api_view(["GET"])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def verify_view(request):
     user = request.user
@@ -600,8 +602,9 @@ def verify_view(request):
 @permission_classes([AllowAny])
 def jwks_view(request):
     public_key_path = getattr(settings, "PUBLIC_KEY_PATH", "/keys/public.pem")
-    jwk = load_jwk_from_pem(public_key_path)
-    return JsonResponse({"keys": [jwk]})
+    response = JsonResponse(get_jwks(public_key_path))
+    response["Cache-Control"] = "public, max-age=300"
+    return response
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
@@ -0,0 +1,260 @@
+"""
+Segment-hashed audit ledger.
+
+Writers insert audit rows with only their own leaf hash, so appends take no
+locks. A single sealer later groups each company's unsealed rows into
+segments (AUDIT_SEGMENT_SIZE rows, or whatever arrived within
+AUDIT_SEGMENT_MAX_AGE seconds), stores the segment's Merkle root and chains
+it to the previous segment's seal hash.
+
+Verification is embarrassingly parallel: every segment can be re-hashed on
+its own, and only the cheap seal-hash links are checked in order.
+"""
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+GENESIS_HASH = "0" * 64
+
+LEAF_FIELDS = (
+    'user_id', 'username', 'company_uuid', 'service_name', 'path', 'method',
+    'status_code', 'request_body', 'response_body', 'payload_preview', 'ip',
+    'user_agent', 'created_at',
+)
+
+
+def _canonical(value):
+    if value is None or isinstance(value, (dict, list, bool, int, float)):
+        return value
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc)
+        return value.isoformat()
+    return str(value)
+
+
+def leaf_hash(row):
+    """SHA-256 of one audit row's content; `row` is a dict (or values() row) of LEAF_FIELDS."""
+    data = {field: _canonical(row.get(field)) for field in LEAF_FIELDS}
+    data['status_code'] = int(data['status_code'] or 0)
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def legacy_chain_hash(row):
+    """Hash of a row written by the old per-row chain (before segments), kept for verification."""
+    created_at = row.get('created_at')
+    data = {
+        'user_id': str(row.get('user_id')),
+        'company_uuid': str(row.get('company_uuid')),
+        'service_name': row.get('service_name'),
+        'path': row.get('path'),
+        'method': row.get('method'),
+        'status_code': row.get('status_code'),
+        'request_body': row.get('request_body'),
+        'response_body': row.get('response_body'),
+        'created_at': created_at.isoformat() if created_at else None,
+        'previous_hash': row.get('previous_hash') or GENESIS_HASH,
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def merkle_root(leaf_hashes):
+    """
+    Merkle root over hex leaf hashes. Interior nodes are domain-separated
+    from leaves and an odd node is promoted rather than duplicated, so two
+    different leaf lists can't produce the same root.
+    """
+    level = [bytes.fromhex(h) for h in leaf_hashes]
+    if not level:
+        return GENESIS_HASH
+    while len(level) > 1:
+        paired = [
+            hashlib.sha256(b'\x01' + level[i] + level[i + 1]).digest()
+            for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            paired.append(level[-1])
+        level = paired
+    return level[0].hex()
+
+
+def seal_hash(previous_hash, root, first_log_id, last_log_id, row_count):
+    """Chains a segment to its predecessor; covers the row range and count so dropped rows show up."""
+    data = f"{previous_hash}:{root}:{first_log_id}:{last_log_id}:{row_count}"
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def verify_segment(task):
+    """
+    Re-hash one sealed segment. Runs in a worker process, so it only sees
+    plain data: {'segment': {...AuditSegment values}, 'rows': [values dicts]}.
+    Returns (segment_id, reasons, bad_row_ids); an empty reasons list means intact.
+    """
+    segment, rows = task['segment'], task['rows']
+    reasons, bad_rows, leaves = [], [], []
+
+    for row in rows:
+        leaf = leaf_hash(row)
+        if leaf != row['hash']:
+            bad_rows.append(row['id'])
+        leaves.append(leaf)
+    if bad_rows:
+        reasons.append(f"Tampered Data: {len(bad_rows)} row(s) no longer match their hash")
+
+    if len(rows) != segment['row_count']:
+        reasons.append(f"Row count {len(rows)} does not match sealed count {segment['row_count']}")
+    elif rows and (rows[0]['id'] != segment['first_log_id'] or rows[-1]['id'] != segment['last_log_id']):
+        reasons.append("Row range does not match the sealed range")
+
+    if merkle_root(leaves) != segment['merkle_root']:
+        reasons.append("Merkle root mismatch")
+
+    expected_seal = seal_hash(
+        segment['previous_hash'], segment['merkle_root'],
+        segment['first_log_id'], segment['last_log_id'], segment['row_count'],
+    )
+    if expected_seal != segment['seal_hash']:
+        reasons.append("Seal hash mismatch")
+
+    return segment['id'], reasons, bad_rows
+
+
+def verify_legacy_chain(task):
+    """
+    Walk one company's pre-segment hash chain (rows written before segments
+    existed). Same checks the old verify_ledger did, one company per worker.
+    """
+    reasons, bad_rows = [], []
+    expected_prev = GENESIS_HASH
+    for row in task['rows']:
+        actual_prev = row['previous_hash'] or GENESIS_HASH
+        recorded = row['hash'] or GENESIS_HASH
+        if actual_prev != expected_prev or recorded != legacy_chain_hash(row):
+            bad_rows.append(row['id'])
+        expected_prev = recorded
+    if bad_rows:
+        reasons.append(f"Legacy chain broken at AuditLog #{bad_rows[0]}")
+    return task['company_uuid'], reasons, bad_rows
+
+
+def _run_ordered(executor, fn, tasks, window):
+    """Like executor.map, but keeps at most `window` tasks (and their rows) in flight."""
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(fn, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def verify_ledger(company_uuid=None, workers=None):
+    """
+    Verify every sealed segment (and any legacy chain) across a process pool.
+
+    Rows are streamed from the database in the parent and handed as plain
+    dicts to spawned workers that never touch Django. Returns a report
+    dict; `first_broken` is the broken segment holding the oldest rows, or
+    None.
+    """
+    from .models import AuditLog, AuditSegment
+
+    segments = AuditSegment.objects.order_by('company_uuid', 'sequence')
+    logs = AuditLog.objects.all()
+    sealed = AuditLog.objects.filter(segment__isnull=False)
+    if company_uuid:
+        segments = segments.filter(company_uuid=company_uuid)
+        logs = logs.filter(company_uuid=company_uuid)
+        sealed = sealed.filter(segment__company_uuid=company_uuid)
+    segments = {s['id']: s for s in segments.values()}
+
+    report = {
+        "segments": len(segments),
+        "records": 0,
+        "corrupted_records": 0,
+        "broken_segments": [],
+        "first_broken": None,
+        "unsealed": logs.filter(segment__isnull=True, previous_hash__isnull=True).count(),
+    }
+
+    # Chain links are cheap; check them in order here
+    link_errors = {}
+    previous = {}
+    for segment in segments.values():
+        company = segment['company_uuid']
+        head = previous.get(company)
+        expected_prev = head['seal_hash'] if head else GENESIS_HASH
+        expected_seq = head['sequence'] + 1 if head else 1
+        if segment['previous_hash'] != expected_prev or segment['sequence'] != expected_seq:
+            link_errors[segment['id']] = "Broken Chain: segment does not link to its predecessor"
+        previous[company] = segment
+
+    def segment_tasks():
+        fields = ['id', 'hash', 'segment_id', *LEAF_FIELDS]
+        rows = sealed.order_by('segment_id', 'id').values(*fields)
+        current, batch = None, []
+        for row in rows.iterator(chunk_size=2000):
+            if row['segment_id'] != current and batch:
+                yield {'segment': segments[current], 'rows': batch}
+                batch = []
+            current = row['segment_id']
+            batch.append(row)
+        if batch:
+            yield {'segment': segments[current], 'rows': batch}
+
+    def legacy_tasks():
+        fields = ['id', 'hash', 'previous_hash', *LEAF_FIELDS]
+        rows = logs.filter(previous_hash__isnull=False).order_by('company_uuid', 'id').values(*fields)
+        current, batch = object(), []
+        for row in rows.iterator(chunk_size=2000):
+            if row['company_uuid'] != current and batch:
+                yield {'company_uuid': current, 'rows': batch}
+                batch = []
+            current = row['company_uuid']
+            batch.append(row)
+        if batch:
+            yield {'company_uuid': current, 'rows': batch}
+
+    workers = workers or os.cpu_count() or 1
+    seen = set()
+    # Spawned, not forked, so workers don't inherit the open DB connection
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        for segment_id, reasons, bad_rows in _run_ordered(executor, verify_segment, segment_tasks(), workers * 4):
+            seen.add(segment_id)
+            report["records"] += segments[segment_id]['row_count']
+            report["corrupted_records"] += len(bad_rows)
+            if segment_id in link_errors:
+                reasons.insert(0, link_errors[segment_id])
+            if reasons:
+                report["broken_segments"].append({"segment_id": segment_id, "reasons": reasons, "rows": bad_rows[:20]})
+
+        legacy = []
+        for company, reasons, bad_rows in _run_ordered(executor, verify_legacy_chain, legacy_tasks(), workers * 4):
+            report["corrupted_records"] += len(bad_rows)
+            if reasons:
+                legacy.append({"company_uuid": company, "reasons": reasons, "rows": bad_rows[:20]})
+        report["legacy_broken"] = legacy
+
+    # Sealed segments whose rows were all deleted never reached a worker
+    for segment_id, segment in segments.items():
+        if segment_id not in seen:
+            reasons = [link_errors[segment_id]] if segment_id in link_errors else []
+            reasons.append(f"Row count 0 does not match sealed count {segment['row_count']}")
+            report["broken_segments"].append({"segment_id": segment_id, "reasons": reasons, "rows": []})
+
+    if report["broken_segments"]:
+        report["broken_segments"].sort(key=lambda broken: segments[broken["segment_id"]]['first_log_id'])
+        first = report["broken_segments"][0]
+        segment = segments[first["segment_id"]]
+        report["first_broken"] = {
+            **first,
+            "company_uuid": segment['company_uuid'],
+            "sequence": segment['sequence'],
+            "first_log_id": segment['first_log_id'],
+            "last_log_id": segment['last_log_id'],
+        }
+    return report
@@ -51,6 +51,18 @@ class Command(BaseCommand):
                 # Optionally nack or dlq
                 ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
 
+        # Writes are lock-free; link them into the ledger on a timer
+        seal_interval = getattr(settings, 'AUDIT_SEGMENT_MAX_AGE', 1.0)
+
+        def seal():
+            try:
+                AuditLog.objects.seal_segments()
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Error sealing audit segments: {e}"))
+            connection.call_later(seal_interval, seal)
+
+        connection.call_later(seal_interval, seal)
+
         channel.basic_qos(prefetch_count=1)
         channel.basic_consume(queue=queue_name, on_message_callback=callback)
 
@@ -0,0 +1,23 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.audit.models import AuditLog
+
+class Command(BaseCommand):
+    help = 'Seals pending audit log rows into hash-chained ledger segments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Seal what is pending and exit')
+        parser.add_argument(
+            '--interval', type=float, default=getattr(settings, 'AUDIT_SEGMENT_MAX_AGE', 1.0),
+            help='Seconds between sealing passes'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            segments = AuditLog.objects.seal_segments()
+            if segments:
+                self.stdout.write(f"Sealed {len(segments)} segment(s), {sum(s.row_count for s in segments)} record(s)")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -1,58 +1,47 @@
 from django.core.management.base import BaseCommand
-from apps.audit.models import AuditLog
+from apps.audit.ledger import verify_ledger
 
 class Command(BaseCommand):
     help = 'Verifies the integrity of the Blockchain Audit Ledger'
 
     def add_arguments(self, parser):
         parser.add_argument('--company', type=str, help='Company UUID to verify')
+        parser.add_argument('--workers', type=int, help='Verification processes (default: CPU count)')
 
     def handle(self, *args, **options):
         company_uuid = options.get('company')
-        
-        queryset = AuditLog.objects.all().order_by('id')
         if company_uuid:
-            queryset = queryset.filter(company_uuid=company_uuid)
             self.stdout.write(f"Verifying ledger for company: {company_uuid}")
         else:
             self.stdout.write("Verifying global ledger (grouped by company)...")
 
-        valid_count = 0
-        corrupted_count = 0
-        
-        # Track previous hash for each company independently
-        last_hashes = {}
-
-        for log in queryset:
-            comp_id = log.company_uuid or "none"
-            expected_prev_hash = last_hashes.get(comp_id, "0" * 64)
-            
-            is_valid = True
-            reasons = []
-
-            # 1. Check if the link to the previous record is intact
-            actual_prev_hash = log.previous_hash or "0" * 64
-            if actual_prev_hash != expected_prev_hash:
-                is_valid = False
-                reasons.append(f"Broken Chain: expected prev_hash {expected_prev_hash[:8]}..., got {actual_prev_hash[:8]}...")
-            
-            # 2. Check if the current data matches the recorded hash
-            actual_hash = log.calculate_hash()
-            recorded_hash = log.hash or "0" * 64
-            if recorded_hash != actual_hash:
-                is_valid = False
-                reasons.append(f"Tampered Data: recorded hash {recorded_hash[:8]}... does not match calculated hash {actual_hash[:8]}...")
-            
-            if is_valid:
-                valid_count += 1
-            else:
-                corrupted_count += 1
-                self.stdout.write(self.style.ERROR(f"CRITICAL: AuditLog #{log.id} [{log.service_name}] is CORRUPTED! Reasons: {', '.join(reasons)}"))
-            
-            # Always update last_hashes with what is RECORDED in the DB to continue checking the chain
-            last_hashes[comp_id] = recorded_hash
-
-        if corrupted_count == 0:
-            self.stdout.write(self.style.SUCCESS(f"✅ Ledger Integrity Verified. {valid_count} records checked and valid."))
+        report = verify_ledger(company_uuid=company_uuid, workers=options.get('workers'))
+
+        for broken in report['legacy_broken']:
+            self.stdout.write(self.style.ERROR(
+                f"CRITICAL: Legacy chain for company {broken['company_uuid']} is CORRUPTED! "
+                f"Reasons: {', '.join(broken['reasons'])}"
+            ))
+
+        first = report['first_broken']
+        if first:
+            self.stdout.write(self.style.ERROR(
+                f"CRITICAL: First broken segment #{first['segment_id']} (company {first['company_uuid']}, "
+                f"sequence {first['sequence']}, AuditLog #{first['first_log_id']}-#{first['last_log_id']}). "
+                f"Reasons: {', '.join(first['reasons'])}"
+            ))
+            if first['rows']:
+                self.stdout.write(f"Tampered rows: {', '.join(str(row_id) for row_id in first['rows'])}")
+
+        if report['unsealed']:
+            self.stdout.write(f"{report['unsealed']} record(s) not sealed yet and not verified.")
+
+        if not first and not report['legacy_broken']:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Ledger Integrity Verified. {report['segments']} segments, {report['records']} records checked and valid."
+            ))
         else:
-            self.stdout.write(self.style.WARNING(f"⚠️ Ledger Verification Failed. Valid: {valid_count}, Corrupted: {corrupted_count}"))
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ Ledger Verification Failed. Broken segments: {len(report['broken_segments'])}, "
+                f"Corrupted records: {report['corrupted_records']}"
+            ))
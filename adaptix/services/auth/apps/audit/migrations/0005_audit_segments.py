@@ -0,0 +1,49 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0004_alter_auditlog_company_uuid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_uuid', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('sequence', models.PositiveIntegerField()),
+                ('first_log_id', models.BigIntegerField()),
+                ('last_log_id', models.BigIntegerField()),
+                ('row_count', models.PositiveIntegerField()),
+                ('merkle_root', models.CharField(max_length=64)),
+                ('previous_hash', models.CharField(max_length=64)),
+                ('seal_hash', models.CharField(db_index=True, max_length=64)),
+                ('sealed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['company_uuid', 'sequence'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='auditsegment',
+            constraint=models.UniqueConstraint(fields=('company_uuid', 'sequence'), name='uniq_audit_segment_sequence'),
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='segment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='logs', to='audit.auditsegment'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(condition=models.Q(('segment__isnull', True)), fields=['id'], name='audit_log_unsealed_idx'),
+        ),
+    ]
@@ -1,41 +1,122 @@
-import hashlib
-import json
-from django.db import models, transaction
+from datetime import datetime, timedelta
+from django.db import connections, models, transaction
 from django.conf import settings
+from django.utils import timezone
+from .ledger import GENESIS_HASH, LEAF_FIELDS, leaf_hash, legacy_chain_hash, merkle_root, seal_hash
+
+SEAL_LOCK_ID = 0x4155444954  # pg advisory lock key: one sealer at a time
+
 
 class AuditLogManager(models.Manager):
     def create_with_ledger(self, **kwargs):
         """
-        Creates an AuditLog entry and links it to the previous one via hash-chain.
-        Ensures atomicity and sequential integrity.
+        Appends an AuditLog entry to the ledger with a single INSERT.
+        The row carries only its own leaf hash and takes no locks; it is
+        linked into the company's chain later by seal_segments().
+        """
+        instance = self.model(**kwargs)
+        # Hash what the database will hand back to verify_ledger, not the raw kwargs
+        for name in LEAF_FIELDS:
+            setattr(instance, name, instance.stored_value(name))
+        instance.hash = instance.calculate_hash()
+        instance.save(force_insert=True, using=self.db)
+        return instance
+
+    def seal_segments(self, max_rows=None, max_age=None, limit=100000):
+        """
+        Groups each company's unsealed rows into segments of `max_rows`
+        (AUDIT_SEGMENT_SIZE) and seals them: Merkle root over the leaf hashes,
+        chained to the company's previous segment. A partial segment is only
+        sealed once its oldest row is `max_age` (AUDIT_SEGMENT_MAX_AGE)
+        seconds old. Returns the new AuditSegments; if another sealer holds
+        the lock this is a no-op.
         """
-        company_uuid = kwargs.get('company_uuid')
-        # Use a transaction block to ensure the lock is held only for the minimum time
-        with transaction.atomic():
-            # Query for the last record for this company with a non-blocking lock.
-            # If another request is currently appending to this company's chain, 
-            # we will fail fast rather than hanging the worker.
-            try:
-                last_log = self.select_for_update(of=('self',), nowait=True).filter(
-                    company_uuid=company_uuid
-                ).order_by('-id').first()
-            except Exception as e:
-                # If locked, we could potentially retry or skip. 
-                # For now, let's log and re-raise to see the impact.
-                print(f"DEBUG LEDGER: Lock busy for company {company_uuid}: {e}")
-                # Fallback: if we can't lock the chain, we might have to wait or fail.
-                # To prevent hanging the service, we'll re-raise as a distinct error.
-                raise Exception(f"Ledger lock busy: {e}")
-
-            prev_hash = last_log.hash if last_log and last_log.hash else "0" * 64
-            
-            instance = self.model(**kwargs)
-            instance.previous_hash = prev_hash
-            instance.save() 
-            
-            instance.hash = instance.calculate_hash()
-            instance.save(update_fields=['hash'])
-            return instance
+        max_rows = max_rows or getattr(settings, 'AUDIT_SEGMENT_SIZE', 1000)
+        if max_age is None:
+            max_age = getattr(settings, 'AUDIT_SEGMENT_MAX_AGE', 1.0)
+        cutoff = timezone.now() - timedelta(seconds=max_age)
+
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", [SEAL_LOCK_ID])
+                if not cursor.fetchone()[0]:
+                    return []
+
+            pending = self.filter(segment__isnull=True, previous_hash__isnull=True).order_by('id').values_list(
+                'id', 'company_uuid', 'hash', 'created_at'
+            )[:limit]
+            by_company = {}
+            for row in pending:
+                by_company.setdefault(row[1], []).append(row)
+            if not by_company:
+                return []
+
+            heads = {segment.company_uuid: segment for segment in AuditSegment.objects.latest_per_company(by_company)}
+
+            segments, members = [], []
+            for company_uuid, rows in by_company.items():
+                head = heads.get(company_uuid)
+                sequence = head.sequence if head else 0
+                previous = head.seal_hash if head else GENESIS_HASH
+                for start in range(0, len(rows), max_rows):
+                    chunk = rows[start:start + max_rows]
+                    if len(chunk) < max_rows and chunk[0][3] > cutoff:
+                        break  # Still filling
+                    sequence += 1
+                    segment = AuditSegment(
+                        company_uuid=company_uuid,
+                        sequence=sequence,
+                        first_log_id=chunk[0][0],
+                        last_log_id=chunk[-1][0],
+                        row_count=len(chunk),
+                        merkle_root=merkle_root([row[2] for row in chunk]),
+                        previous_hash=previous,
+                    )
+                    segment.seal_hash = segment.calculate_seal_hash()
+                    previous = segment.seal_hash
+                    segments.append(segment)
+                    members.append([row[0] for row in chunk])
+
+            AuditSegment.objects.bulk_create(segments)
+            for segment, ids in zip(segments, members):
+                self.filter(id__in=ids).update(segment=segment)
+        return segments
+
+
+class AuditSegmentManager(models.Manager):
+    def latest_per_company(self, company_uuids):
+        """Chain head (highest sequence) for each of the given companies."""
+        company_uuids = list(company_uuids)
+        query = models.Q(company_uuid__in=[c for c in company_uuids if c is not None])
+        if None in company_uuids:
+            query |= models.Q(company_uuid__isnull=True)
+        return self.filter(query).order_by('company_uuid', '-sequence').distinct('company_uuid')
+
+
+class AuditSegment(models.Model):
+    """A sealed run of one company's audit rows; see apps.audit.ledger."""
+    objects = AuditSegmentManager()
+    company_uuid = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+    sequence = models.PositiveIntegerField()
+    first_log_id = models.BigIntegerField()
+    last_log_id = models.BigIntegerField()
+    row_count = models.PositiveIntegerField()
+    merkle_root = models.CharField(max_length=64)
+    previous_hash = models.CharField(max_length=64)
+    seal_hash = models.CharField(max_length=64, db_index=True)
+    sealed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['company_uuid', 'sequence']
+        constraints = [
+            models.UniqueConstraint(fields=['company_uuid', 'sequence'], name='uniq_audit_segment_sequence'),
+        ]
+
+    def calculate_seal_hash(self):
+        return seal_hash(self.previous_hash, self.merkle_root, self.first_log_id, self.last_log_id, self.row_count)
+
+    def __str__(self):
+        return f"Segment {self.company_uuid} #{self.sequence} ({self.row_count} rows)"
 
 class AuditLog(models.Model):
     objects = AuditLogManager()
@@ -49,36 +130,47 @@ class AuditLog(models.Model):
     request_body = models.TextField(blank=True)
     payload_preview = models.JSONField(null=True, blank=True)
     response_body = models.TextField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set before INSERT so the leaf hash can cover it
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     ip = models.CharField(max_length=64, blank=True, null=True)
     user_agent = models.CharField(max_length=512, blank=True, null=True)
     
-    # Blockchain Audit Ledger fields
+    # Blockchain Audit Ledger fields. previous_hash is only set on rows from
+    # the old per-row chain; newer rows are linked through their segment.
     previous_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
     hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    segment = models.ForeignKey(AuditSegment, null=True, blank=True, on_delete=models.PROTECT, related_name='logs')
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Same filter as seal_segments(), so legacy chain rows (never sealed) stay out of it
+            models.Index(
+                fields=['id'], name='audit_log_unsealed_idx',
+                condition=models.Q(segment__isnull=True, previous_hash__isnull=True),
+            ),
+        ]
 
     def calculate_hash(self):
         """
-        Calculates the SHA-256 hash of the log entry.
-        Note: We exclude 'hash' itself. 'created_at' must be set.
+        Leaf hash of the entry's content. Rows from the legacy chain hash
+        their previous_hash in as well. 'created_at' must be set.
+        """
+        row = {field: self.stored_value(field) for field in LEAF_FIELDS}
+        if self.previous_hash:
+            return legacy_chain_hash({**row, 'previous_hash': self.previous_hash})
+        return leaf_hash(row)
+
+    def stored_value(self, name):
+        """
+        A leaf field's value in the form it reads back from the database
+        (e.g. user_id=5 -> '5', naive datetimes made aware), so the hash
+        computed at insert matches the one recomputed from values() rows.
         """
-        data = {
-            'user_id': str(self.user_id),
-            'company_uuid': str(self.company_uuid),
-            'service_name': self.service_name,
-            'path': self.path,
-            'method': self.method,
-            'status_code': self.status_code,
-            'request_body': self.request_body,
-            'response_body': self.response_body,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'previous_hash': self.previous_hash or "0" * 64
-        }
-        encoded_data = json.dumps(data, sort_keys=True).encode()
-        return hashlib.sha256(encoded_data).hexdigest()
+        value = self._meta.get_field(name).to_python(getattr(self, name))
+        if isinstance(value, datetime) and settings.USE_TZ and timezone.is_naive(value):
+            value = timezone.make_aware(value, timezone.get_default_timezone())
+        return value
 
     def __str__(self):
         return f"[{self.service_name}] {self.method} {self.path} - {self.status_code}"
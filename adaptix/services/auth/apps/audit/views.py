@@ -1,6 +1,7 @@
 from rest_framework import viewsets, permissions, filters
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import AuditLog
+from .models import AuditLog, AuditSegment
+from .ledger import LEAF_FIELDS, verify_segment
 from .serializers import AuditLogSerializer
 
 class IsAdminUser(permissions.BasePermission):
@@ -44,42 +45,39 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
         Returns the count of valid/invalid records for the current tenant.
         """
         company_uuid = request.query_params.get('company_uuid')
-        queryset = AuditLog.objects.all().order_by('id')
+        queryset = AuditLog.objects.all()
+        segments = AuditSegment.objects.all()
         if company_uuid:
             queryset = queryset.filter(company_uuid=company_uuid)
-            
-        # Optimization: only check the last 100 for a quick UI response
-        # Full verification should be done via management command
-        check_limit = 100
-        logs = list(queryset.reverse()[:check_limit])
-        logs.reverse() # back to chronological for chain check
-        
+            segments = segments.filter(company_uuid=company_uuid)
+
+        # Optimization: only re-hash the latest sealed segments for a quick UI response
+        # Full (parallel) verification should be done via management command
+        check_limit = 5
+        recent = list(segments.order_by('-id')[:check_limit].values())
+
         valid_count = 0
         corrupted_count = 0
-        last_hash = None
-        
-        # We need the hash from the record BEFORE the batch to properly check the first one
-        if logs:
-            first_log = logs[0]
-            prev_log = AuditLog.objects.filter(id__lt=first_log.id).order_by('-id').first()
-            last_hash = prev_log.hash if prev_log else "0" * 64
+        checked = 0
+        first_broken = None
 
-        for log in logs:
-            expected_prev = last_hash or "0" * 64
-            actual_prev = log.previous_hash or "0" * 64
-            actual_hash = log.calculate_hash()
-            
-            if actual_prev == expected_prev and log.hash == actual_hash:
-                valid_count += 1
-            else:
-                corrupted_count += 1
-            
-            last_hash = log.hash
+        fields = ['id', 'hash', 'segment_id', *LEAF_FIELDS]
+        for segment in reversed(recent):
+            rows = list(AuditLog.objects.filter(segment_id=segment['id']).order_by('id').values(*fields))
+            _, reasons, bad_rows = verify_segment({'segment': segment, 'rows': rows})
+            checked += len(rows)
+            corrupted_count += len(bad_rows)
+            valid_count += len(rows) - len(bad_rows)
+            if reasons and first_broken is None:
+                first_broken = {"segment_id": segment['id'], "sequence": segment['sequence'], "reasons": reasons}
 
         return Response({
-            "status": "compromised" if corrupted_count > 0 else "secure",
-            "checked_records": len(logs),
+            "status": "compromised" if first_broken else "secure",
+            "checked_records": checked,
             "valid": valid_count,
             "corrupted": corrupted_count,
-            "total_records": queryset.count()
+            "total_records": queryset.count(),
+            "checked_segments": len(recent),
+            "first_broken_segment": first_broken,
+            "unsealed_records": queryset.filter(segment__isnull=True, previous_hash__isnull=True).count(),
         })
@@ -36,9 +36,19 @@ class Company(models.Model):
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='subsidiaries')
     is_group = models.BooleanField(default=False, help_text="Is this a Group/Holding Company?")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_auth_company_uuid = instance.__dict__.get('auth_company_uuid')
+        return instance
+
     def save(self, *args, **kwargs):
         is_new = self._state.adding
+        previous_auth = getattr(self, '_loaded_auth_company_uuid', None)
         super().save(*args, **kwargs)
+        if is_new or previous_auth != self.auth_company_uuid:
+            self.publish_tenant_changed(previous_auth)
+            self._loaded_auth_company_uuid = self.auth_company_uuid
         if is_new:
             # Create default settings with features based on business type
             features = DEFAULT_FEATURES.get(self.business_type, [])
@@ -51,6 +61,29 @@ class Company(models.Model):
                 ui_schema={} # Can be populated dynamically too
             )
 
+    def delete(self, *args, **kwargs):
+        previous_auth = self.auth_company_uuid
+        # super().delete() clears self.pk, so capture it first
+        company_id = self.pk
+        result = super().delete(*args, **kwargs)
+        self.publish_tenant_changed(previous_auth, company_id=company_id)
+        return result
+
+    def publish_tenant_changed(self, previous_auth_company_uuid=None, company_id=None):
+        """
+        Tell other services that tenant membership changed so they can drop
+        cached tenant -> unit resolutions.
+        """
+        from adaptix_core.messaging import publish_event
+
+        payload = {
+            "event": "company.tenant.changed",
+            "company_id": str(company_id or self.pk),
+            "auth_company_uuid": str(self.auth_company_uuid) if self.auth_company_uuid else None,
+            "previous_auth_company_uuid": str(previous_auth_company_uuid) if previous_auth_company_uuid else None,
+        }
+        transaction.on_commit(lambda: publish_event("events", "company.tenant.changed", payload))
+
     class Meta:
         indexes = [models.Index(fields=["auth_company_uuid"])]
 
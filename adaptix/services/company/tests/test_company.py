@@ -45,3 +45,17 @@ class TestCompanyLogic:
         )
         assert emp.department.name == "Engineering"
         assert emp.company == company
+
+    def test_delete_publishes_company_id(self, mocker, django_capture_on_commit_callbacks):
+        """The tenant-changed event names the deleted company, not 'None'."""
+        publish = mocker.patch("adaptix_core.messaging.publish_event")
+        auth_uuid = uuid.uuid4()
+        company = Company.objects.create(name="Gone Corp", code="GONE", auth_company_uuid=auth_uuid)
+        company_id = company.pk
+
+        with django_capture_on_commit_callbacks(execute=True):
+            company.delete()
+
+        payload = publish.call_args.args[2]
+        assert payload["company_id"] == str(company_id)
+        assert payload["previous_auth_company_uuid"] == str(auth_uuid)
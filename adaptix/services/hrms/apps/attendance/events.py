@@ -0,0 +1,25 @@
+from adaptix_core.messaging import publish_event
+
+
+def attendance_payload(records):
+    """Group attendance rows into one hrms.attendance.recorded payload per company."""
+    by_company = {}
+    for record in records:
+        employee = record.employee
+        by_company.setdefault(str(employee.company_uuid), []).append({
+            "attendance_id": str(record.id),
+            "employee_uuid": str(employee.id),
+            "employee_name": f"{employee.first_name} {employee.last_name}",
+            "date": str(record.date),
+            "status": record.status,
+            "late_minutes": record.late_minutes,
+        })
+    return [
+        {"event": "hrms.attendance.recorded", "company_uuid": company_uuid, "records": items}
+        for company_uuid, items in by_company.items()
+    ]
+
+
+def publish_attendance(records):
+    for payload in attendance_payload(records):
+        publish_event("events", "hrms.attendance.recorded", payload)
@@ -1,5 +1,5 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from apps.employees.models import Employee
 
@@ -81,6 +81,9 @@ class Attendance(models.Model):
         self.calculate_status()
         super().save(*args, **kwargs)
 
+        from .events import publish_attendance
+        transaction.on_commit(lambda: publish_attendance([self]))
+
     class Meta:
         unique_together = ('employee', 'date')
 
@@ -0,0 +1,161 @@
+import logging
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from apps.employees.models import Employee
+from .events import publish_attendance
+from .models import Attendance
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = 1000
+
+
+class DeviceLogIngestor:
+    """
+    Set-based ingestion of biometric device pushes.
+
+    Employees and existing attendance rows are resolved in two queries, each
+    employee's punches for a day are reduced to first-in/last-out in memory,
+    late/early minutes are computed against the prefetched shifts, and rows
+    are written with bulk_create/bulk_update.
+    """
+
+    def __init__(self, logs):
+        self.logs = logs
+        self.errors = []
+
+    def run(self):
+        punches = self._parse()
+        if not punches:
+            return 0
+
+        employees = self._resolve_employees({code for code, _, _ in punches})
+        days = {}  # (employee_id, date) -> [first, last, device_id]
+        for code, moment, device_id in punches:
+            employee = employees.get(code)
+            if employee is None:
+                continue
+            key = (employee.id, moment.date())
+            span = days.get(key)
+            if span is None:
+                days[key] = [moment.time(), moment.time(), device_id]
+            else:
+                if moment.time() < span[0]:
+                    span[0], span[2] = moment.time(), device_id
+                span[1] = max(span[1], moment.time())
+        if not days:
+            return 0
+
+        by_id = {e.id: e for e in employees.values()}
+        existing = self._existing_attendance(days)
+
+        to_create, to_update = [], []
+        for (employee_id, day), (first, last, device_id) in days.items():
+            attendance = existing.get((employee_id, day))
+            if attendance is None:
+                attendance = Attendance(
+                    employee=by_id[employee_id], date=day, status='present',
+                    method='biometric', device_id=device_id,
+                    check_in=first, check_out=last if last > first else None,
+                )
+                to_create.append(attendance)
+            elif self._merge(attendance, first, last, device_id):
+                to_update.append(attendance)
+            else:
+                continue
+            attendance.employee = by_id[employee_id]
+            attendance.calculate_status()
+
+        with transaction.atomic():
+            Attendance.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+            to_create = self._resolve_conflicts(to_create, days, by_id, to_update)
+            Attendance.objects.bulk_update(
+                to_update,
+                ['check_in', 'check_out', 'method', 'device_id', 'status',
+                 'late_minutes', 'early_out_minutes', 'is_flexible'],
+                batch_size=BULK_BATCH_SIZE,
+            )
+            changed = to_create + to_update
+            transaction.on_commit(lambda: publish_attendance(changed))
+
+        return len(to_create) + len(to_update)
+
+    def _parse(self):
+        punches = []
+        for log in self.logs:
+            emp_code = log.get('user_id') if isinstance(log, dict) else None
+            timestamp_str = log.get('timestamp') if isinstance(log, dict) else None
+            moment = parse_datetime(str(timestamp_str)) if timestamp_str else None
+            if not emp_code or moment is None:
+                self.errors.append(f"Invalid log: {log}")
+                continue
+            # Devices report wall-clock time; aware timestamps are shifted to local time
+            if timezone.is_aware(moment):
+                moment = timezone.localtime(moment).replace(tzinfo=None)
+            punches.append((str(emp_code), moment, log.get('device_id')))
+        return punches
+
+    def _resolve_employees(self, codes):
+        matches = {}
+        for employee in Employee.objects.filter(employee_code__in=codes).select_related('current_shift'):
+            matches.setdefault(employee.employee_code, []).append(employee)
+
+        employees = {}
+        for code in codes:
+            found = matches.get(code, [])
+            if not found:
+                self.errors.append(f"Employee {code} not found")
+            elif len(found) > 1:
+                self.errors.append(f"Employee code {code} matches {len(found)} employees")
+            else:
+                employees[code] = found[0]
+        return employees
+
+    def _existing_attendance(self, days):
+        employee_ids = {employee_id for employee_id, _ in days}
+        dates = {day for _, day in days}
+        rows = Attendance.objects.filter(employee_id__in=employee_ids, date__in=dates)
+        return {(a.employee_id, a.date): a for a in rows if (a.employee_id, a.date) in days}
+
+    def _resolve_conflicts(self, created, days, by_id, to_update):
+        """
+        Rows a concurrent push inserted first were skipped by ignore_conflicts;
+        merge our punches into the stored row instead (locked, so the two
+        pushes can't overwrite each other). Returns the rows actually inserted.
+        """
+        if not created:
+            return created
+        stored = {
+            (a.employee_id, a.date): a for a in Attendance.objects.select_for_update().filter(
+                employee_id__in={a.employee_id for a in created}, date__in={a.date for a in created},
+            )
+        }
+        inserted = []
+        for attendance in created:
+            key = (attendance.employee_id, attendance.date)
+            current = stored.get(key)
+            if current is None or current.pk == attendance.pk:
+                inserted.append(attendance)
+                continue
+            first, last, device_id = days[key]
+            if self._merge(current, first, last, device_id):
+                current.employee = by_id[attendance.employee_id]
+                current.calculate_status()
+                to_update.append(current)
+        return inserted
+
+    @staticmethod
+    def _merge(attendance, first, last, device_id):
+        """Widen an existing record to cover the new punches; returns True if it changed."""
+        changed = False
+        if not attendance.check_in or first < attendance.check_in:
+            attendance.check_in = first
+            attendance.device_id = device_id
+            attendance.method = 'biometric'
+            changed = True
+        out = max(t for t in (last, attendance.check_out) if t is not None)
+        if out > attendance.check_in and out != attendance.check_out:
+            attendance.check_out = out
+            changed = True
+        return changed
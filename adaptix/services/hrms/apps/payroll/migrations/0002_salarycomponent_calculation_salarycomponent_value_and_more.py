@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salarycomponent',
+            name='calculation',
+            field=models.CharField(choices=[('percentage', '% of Base Amount'), ('fixed', 'Fixed Amount')], default='percentage', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='salarycomponent',
+            name='value',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Percentage of base, or a fixed monthly amount', max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='PayrollRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('company_uuid', models.UUIDField(db_index=True)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('finalized', 'Finalized')], default='draft', max_length=20)),
+                ('employee_count', models.PositiveIntegerField(default=0)),
+                ('total_net_pay', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finalized_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'unique_together': {('company_uuid', 'start_date')},
+            },
+        ),
+        migrations.AddField(
+            model_name='payslip',
+            name='run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payslips', to='payroll.payrollrun'),
+        ),
+    ]
@@ -18,7 +18,13 @@ class SalaryComponent(models.Model):
     type = models.CharField(max_length=20, choices=COMPONENT_TYPES)
     is_taxable = models.BooleanField(default=True)
     
-    # Configuration for auto-calculation (e.g., % of Basic) - simplified for now
+    # Configuration for auto-calculation (e.g., % of Basic)
+    CALCULATION_CHOICES = (
+        ('percentage', '% of Base Amount'),
+        ('fixed', 'Fixed Amount'),
+    )
+    calculation = models.CharField(max_length=20, choices=CALCULATION_CHOICES, default='percentage')
+    value = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Percentage of base, or a fixed monthly amount")
     
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -61,6 +67,33 @@ class EmployeeSalary(models.Model):
     def __str__(self):
         return f"{self.employee} - {self.base_amount}"
 
+class PayrollRun(models.Model):
+    """
+    One payroll pass for a company and period; groups the payslips it generated.
+    """
+    STATUS_CHOICES = (
+        ('draft', 'Draft'),
+        ('finalized', 'Finalized'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company_uuid = models.UUIDField(db_index=True)
+    start_date = models.DateField()
+    end_date = models.DateField()
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
+    employee_count = models.PositiveIntegerField(default=0)
+    total_net_pay = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finalized_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('company_uuid', 'start_date')
+
+    def __str__(self):
+        return f"Payroll Run: {self.company_uuid} ({self.start_date} - {self.end_date})"
+
 class Payslip(models.Model):
     """
     The monthly generated salary record.
@@ -74,6 +107,7 @@ class Payslip(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     company_uuid = models.UUIDField(db_index=True)
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='payslips')
+    run = models.ForeignKey(PayrollRun, on_delete=models.SET_NULL, null=True, blank=True, related_name='payslips')
     
     start_date = models.DateField()
     end_date = models.DateField()
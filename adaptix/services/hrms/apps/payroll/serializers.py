@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import SalaryComponent, SalaryStructure, EmployeeSalary, Payslip, PayslipLineItem
+from .models import SalaryComponent, SalaryStructure, EmployeeSalary, PayrollRun, Payslip, PayslipLineItem
 
 class SalaryComponentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -38,3 +38,15 @@ class PayslipSerializer(serializers.ModelSerializer):
         model = Payslip
         fields = '__all__'
         read_only_fields = ['net_pay', 'total_earnings', 'total_deductions', 'status']
+
+class PayrollRunSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PayrollRun
+        fields = '__all__'
+        read_only_fields = ['company_uuid', 'status', 'employee_count', 'total_net_pay', 'finalized_at']
+        validators = []  # Re-running a draft period updates the existing run
+
+    def validate(self, attrs):
+        if attrs['end_date'] < attrs['start_date']:
+            raise serializers.ValidationError("end_date must not be before start_date")
+        return attrs
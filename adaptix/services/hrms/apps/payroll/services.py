@@ -0,0 +1,243 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from apps.attendance.models import Attendance
+from apps.leaves.models import LeaveApplication
+from .models import EmployeeSalary, PayrollRun, Payslip, PayslipLineItem, SalaryStructure
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+BULK_BATCH_SIZE = 1000
+PRESENT_STATUSES = ('present', 'late')
+
+
+def _money(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def compute_payslips(rows, period_days):
+    """
+    Pure computation over plain data so it can run in a worker process.
+
+    rows: [{employee_id, base_amount, components: [(component_id, type, calculation, value)],
+            present_days, absent_days, unpaid_leave_days}]
+    Returns [(employee_id, totals dict, [(component_id, amount)])].
+    """
+    results = []
+    for row in rows:
+        paid_days = max(period_days - row['absent_days'] - row['unpaid_leave_days'], 0)
+        factor = Decimal(str(paid_days)) / Decimal(period_days)
+        earned_base = Decimal(row['base_amount']) * factor
+
+        earnings = deductions = Decimal('0')
+        lines = []
+        for component_id, component_type, calculation, value in row['components']:
+            value = Decimal(value)
+            if calculation == 'fixed':
+                # Fixed earnings follow attendance; fixed deductions are charged in full
+                amount = value * factor if component_type == 'earning' else value
+            else:
+                amount = earned_base * value / 100
+            amount = _money(amount)
+            if component_type == 'earning':
+                earnings += amount
+            else:
+                deductions += amount
+            lines.append((component_id, amount))
+
+        results.append((row['employee_id'], {
+            'total_earnings': earnings,
+            'total_deductions': deductions,
+            'net_pay': earnings - deductions,
+            'present_days': row['present_days'],
+            'absent_days': row['absent_days'],
+            'unpaid_leave_days': row['unpaid_leave_days'],
+        }, lines))
+    return results
+
+
+class PayrollEngine:
+    """
+    Generates a company's payslips for a period in bulk.
+
+    Inputs are loaded in a fixed number of queries (salary configs with
+    employees, structure components, attendance counts, unpaid leave,
+    existing payslips), earnings and deductions are computed in memory
+    (optionally across a process pool, one chunk per department) and
+    payslips and line items are written with bulk_create.
+    """
+
+    def __init__(self, company_uuid, start_date, end_date, workers=None):
+        self.company_uuid = company_uuid
+        self.start_date = start_date
+        self.end_date = end_date
+        self.period_days = (end_date - start_date).days + 1
+        self.workers = workers if workers is not None else getattr(settings, 'PAYROLL_WORKERS', 1)
+
+    def run(self):
+        run, _ = PayrollRun.objects.get_or_create(
+            company_uuid=self.company_uuid, start_date=self.start_date,
+            defaults={'end_date': self.end_date},
+        )
+        if run.status == 'finalized':
+            raise ValueError("Payroll for this period is already finalized")
+
+        configs = list(EmployeeSalary.objects.filter(
+            company_uuid=self.company_uuid, employee__is_active=True,
+        ).select_related('employee'))
+        employee_ids = [c.employee_id for c in configs]
+
+        components = self._structure_components({c.structure_id for c in configs})
+        attendance = self._attendance_counts(employee_ids)
+        unpaid = self._unpaid_leave_days(employee_ids)
+
+        by_department = {}
+        for config in configs:
+            counts = attendance.get(config.employee_id, {})
+            by_department.setdefault(config.employee.department_id, []).append({
+                'employee_id': config.employee_id,
+                'base_amount': str(config.base_amount),
+                'components': components.get(config.structure_id, []),
+                'present_days': counts.get('present', 0),
+                'absent_days': counts.get('absent', 0),
+                'unpaid_leave_days': unpaid.get(config.employee_id, 0),
+            })
+
+        results = self._compute(list(by_department.values()))
+        return self._write(run, results)
+
+    def _structure_components(self, structure_ids):
+        through = SalaryStructure.components.through
+        components = {}
+        rows = through.objects.filter(salarystructure_id__in=structure_ids).values_list(
+            'salarystructure_id', 'salarycomponent_id', 'salarycomponent__type',
+            'salarycomponent__calculation', 'salarycomponent__value',
+        )
+        for structure_id, component_id, component_type, calculation, value in rows:
+            components.setdefault(structure_id, []).append((component_id, component_type, calculation, str(value)))
+        return components
+
+    def _attendance_counts(self, employee_ids):
+        counts = {}
+        rows = Attendance.objects.filter(
+            employee_id__in=employee_ids, date__range=(self.start_date, self.end_date),
+        ).values('employee_id').annotate(
+            present=Count('id', filter=Q(status__in=PRESENT_STATUSES)),
+            half=Count('id', filter=Q(status='half_day')),
+            absent=Count('id', filter=Q(status='absent')),
+        )
+        for row in rows:
+            counts[row['employee_id']] = {
+                'present': row['present'] + row['half'] * 0.5,
+                'absent': row['absent'] + row['half'] * 0.5,
+            }
+        return counts
+
+    def _unpaid_leave_days(self, employee_ids):
+        days = {}
+        leaves = LeaveApplication.objects.filter(
+            employee_id__in=employee_ids, status='approved', leave_type__is_paid=False,
+            start_date__lte=self.end_date, end_date__gte=self.start_date,
+        ).values_list('employee_id', 'start_date', 'end_date')
+        for employee_id, start, end in leaves:
+            overlap = (min(end, self.end_date) - max(start, self.start_date)).days + 1
+            days[employee_id] = days.get(employee_id, 0) + overlap
+        return days
+
+    def _compute(self, chunks):
+        if self.workers <= 1 or len(chunks) <= 1 or multiprocessing.current_process().daemon:
+            return [result for chunk in chunks for result in compute_payslips(chunk, self.period_days)]
+
+        ctx = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx) as pool:
+            parts = pool.map(compute_payslips, chunks, [self.period_days] * len(chunks))
+            return [result for part in parts for result in part]
+
+    @transaction.atomic
+    def _write(self, run, results):
+        # Locked so a concurrent finalize or regenerate of the same period waits for us
+        run = PayrollRun.objects.select_for_update().get(pk=run.pk)
+        if run.status != 'draft':
+            raise ValueError("Payroll for this period is already finalized")
+
+        # Payslips finalized one by one are kept; checked under the lock so none slips in meanwhile
+        finalized = set(Payslip.objects.filter(
+            employee_id__in=[employee_id for employee_id, _, _ in results], start_date=self.start_date,
+        ).exclude(status='draft').values_list('employee_id', flat=True))
+        results = [result for result in results if result[0] not in finalized]
+
+        employee_ids = [employee_id for employee_id, _, _ in results]
+        # Re-running a draft period replaces its draft payslips
+        Payslip.objects.filter(employee_id__in=employee_ids, start_date=self.start_date, status='draft').delete()
+
+        payslips, lines = [], []
+        total_net = Decimal('0')
+        for employee_id, totals, payslip_lines in results:
+            payslip = Payslip(
+                company_uuid=self.company_uuid, employee_id=employee_id, run=run,
+                start_date=self.start_date, end_date=self.end_date, **totals,
+            )
+            payslips.append(payslip)
+            lines.extend(
+                PayslipLineItem(payslip=payslip, component_id=component_id, amount=amount)
+                for component_id, amount in payslip_lines
+            )
+            total_net += totals['net_pay']
+
+        Payslip.objects.bulk_create(payslips, batch_size=BULK_BATCH_SIZE)
+        PayslipLineItem.objects.bulk_create(lines, batch_size=BULK_BATCH_SIZE)
+
+        run.end_date = self.end_date
+        run.employee_count = len(payslips)
+        run.total_net_pay = total_net
+        run.save(update_fields=['end_date', 'employee_count', 'total_net_pay'])
+        logger.info(f"Payroll run {run.id}: generated {len(payslips)} payslips")
+        return run
+
+
+def finalize_run(run):
+    """
+    Finalize the run's draft payslips and announce them with one event.
+
+    The run row is locked while its status is checked, so concurrent calls
+    can't both finalize it. Payslips already finalized one by one were
+    announced then, so the event only carries the ones finalized here.
+    """
+    with transaction.atomic():
+        locked = PayrollRun.objects.select_for_update().get(pk=run.pk)
+        if locked.status != 'draft':
+            raise ValueError("Only draft payroll runs can be finalized")
+
+        payslips = list(
+            Payslip.objects.select_for_update().filter(run=run, status='draft').values_list('id', 'employee_id', 'net_pay')
+        )
+        Payslip.objects.filter(pk__in=[pid for pid, _, _ in payslips]).update(status='finalized')
+        run.status = 'finalized'
+        run.finalized_at = timezone.now()
+        run.save(update_fields=['status', 'finalized_at'])
+
+    total_net = sum((net for _, _, net in payslips), Decimal('0'))
+    try:
+        from utils.messaging import publish_event
+        payload = {
+            "type": "payroll_run_finalized",
+            "run_id": str(run.id),
+            "company_uuid": str(run.company_uuid),
+            "net_pay": float(total_net),
+            "period_start": str(run.start_date),
+            "period_end": str(run.end_date),
+            "payslips": [
+                {"payslip_id": str(pid), "employee_id": str(eid), "net_pay": float(net)}
+                for pid, eid, net in payslips
+            ],
+        }
+        publish_event(exchange="events", routing_key="hrms.payroll.finalized", payload=payload)
+    except Exception as e:
+        print(f"Failed to publish payroll event: {e}")
+    return run
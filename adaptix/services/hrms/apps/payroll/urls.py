@@ -4,6 +4,7 @@ from .views import (
     SalaryComponentViewSet, 
     SalaryStructureViewSet, 
     EmployeeSalaryViewSet, 
+    PayrollRunViewSet,
     PayslipViewSet
 )
 
@@ -12,6 +13,7 @@ router.register(r'components', SalaryComponentViewSet)
 router.register(r'structures', SalaryStructureViewSet)
 router.register(r'assignments', EmployeeSalaryViewSet)
 router.register(r'payslips', PayslipViewSet)
+router.register(r'runs', PayrollRunViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
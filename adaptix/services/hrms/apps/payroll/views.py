@@ -1,13 +1,15 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import SalaryComponent, SalaryStructure, EmployeeSalary, Payslip
+from .models import SalaryComponent, SalaryStructure, EmployeeSalary, PayrollRun, Payslip
 from .serializers import (
     SalaryComponentSerializer, 
     SalaryStructureSerializer, 
     EmployeeSalarySerializer, 
+    PayrollRunSerializer,
     PayslipSerializer
 )
+from .services import PayrollEngine, finalize_run
 
 class SalaryComponentViewSet(viewsets.ModelViewSet):
     queryset = SalaryComponent.objects.all()
@@ -52,3 +54,35 @@ class PayslipViewSet(viewsets.ModelViewSet):
             print(f"Failed to publish payroll event: {e}")
         
         return Response(self.get_serializer(payslip).data)
+
+class PayrollRunViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    POST generates (or regenerates, while still draft) every payslip of a
+    company for a period; finalize closes the run with one batched event.
+    """
+    queryset = PayrollRun.objects.all()
+    serializer_class = PayrollRunSerializer
+
+    def create(self, request):
+        company_uuid = getattr(request, 'company_uuid', None) or request.data.get('company_uuid') or request.headers.get('X-Company-UUID')
+        if not company_uuid:
+            return Response({"error": "company_uuid is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            run = PayrollEngine(
+                company_uuid, serializer.validated_data['start_date'], serializer.validated_data['end_date'],
+            ).run()
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(run).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        run = self.get_object()
+        try:
+            finalize_run(run)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(run).data)
@@ -0,0 +1,64 @@
+import pytest
+import uuid
+from datetime import date, time
+from apps.attendance.models import Attendance
+from apps.employees.models import Employee
+from apps.shifts.models import Shift
+
+
+@pytest.mark.django_db
+class TestDeviceSync:
+    def test_device_push_is_ingested_in_bulk(self, auth_client, company_uuid, mocker, django_assert_max_num_queries):
+        """Punches reduce to first-in/last-out with shift-based late minutes in a fixed number of queries"""
+        publish = mocker.patch('apps.attendance.services.publish_attendance')
+        shift = Shift.objects.create(company_uuid=company_uuid, name="Morning", code="M",
+                                     start_time=time(9, 0), end_time=time(17, 0), grace_time_in=15)
+        employees = [
+            Employee.objects.create(company_uuid=company_uuid, employee_code=f"EMP{i}", first_name="E",
+                                    last_name=str(i), email=f"e{i}@example.com", current_shift=shift)
+            for i in range(3)
+        ]
+        Attendance.objects.create(employee=employees[2], date=date(2024, 12, 10), check_in=time(8, 55))
+
+        logs = [
+            {"device_id": "ZK001", "user_id": "EMP0", "timestamp": "2024-12-10 09:40:00"},
+            {"device_id": "ZK001", "user_id": "EMP0", "timestamp": "2024-12-10 09:30:00"},
+            {"device_id": "ZK001", "user_id": "EMP0", "timestamp": "2024-12-10 16:00:00"},
+            {"device_id": "ZK002", "user_id": "EMP1", "timestamp": "2024-12-10 09:05:00"},
+            {"device_id": "ZK001", "user_id": "EMP2", "timestamp": "2024-12-10 17:10:00"},
+            {"device_id": "ZK001", "user_id": "UNKNOWN", "timestamp": "2024-12-10 09:00:00"},
+            {"device_id": "ZK001", "user_id": "EMP1", "timestamp": "not a time"},
+        ]
+        with django_assert_max_num_queries(10):
+            response = auth_client.post('/api/hrms/attendance/sync/', logs, format='json')
+
+        assert response.status_code == 200
+        assert response.data["synced"] == 3
+        assert len(response.data["errors"]) == 2
+
+        late = Attendance.objects.get(employee=employees[0])
+        assert (late.check_in, late.check_out) == (time(9, 30), time(16, 0))
+        assert late.status == 'late' and late.late_minutes == 30 and late.early_out_minutes == 60
+        on_time = Attendance.objects.get(employee=employees[1])
+        assert on_time.status == 'present' and on_time.check_out is None
+        assert Attendance.objects.get(employee=employees[2]).check_out == time(17, 10)
+
+    def test_concurrently_created_day_is_merged_not_duplicated(self, company_uuid, mocker):
+        """A row inserted by another push after our read is widened instead of raising"""
+        from apps.attendance.services import DeviceLogIngestor
+
+        mocker.patch('apps.attendance.services.publish_attendance')
+        employee = Employee.objects.create(company_uuid=company_uuid, employee_code="EMP9", first_name="E",
+                                           last_name="9", email="e9@example.com")
+        Attendance.objects.create(employee=employee, date=date(2024, 12, 10), check_in=time(9, 0))
+        # Simulate the other push committing between our read and our insert
+        mocker.patch.object(DeviceLogIngestor, '_existing_attendance', return_value={})
+
+        ingestor = DeviceLogIngestor([
+            {"device_id": "ZK001", "user_id": "EMP9", "timestamp": "2024-12-10 08:50:00"},
+            {"device_id": "ZK001", "user_id": "EMP9", "timestamp": "2024-12-10 18:00:00"},
+        ])
+        assert ingestor.run() == 1
+
+        stored = Attendance.objects.get(employee=employee)
+        assert (stored.check_in, stored.check_out) == (time(8, 50), time(18, 0))
@@ -0,0 +1,73 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.db.models import Sum
+from apps.attendance.models import Attendance
+from apps.employees.models import Employee
+from apps.leaves.models import LeaveApplication, LeaveType
+from apps.payroll.models import EmployeeSalary, PayrollRun, Payslip, SalaryComponent, SalaryStructure
+from apps.payroll.services import PayrollEngine, finalize_run
+
+
+@pytest.mark.django_db
+class TestPayrollRun:
+    def test_bulk_run_and_batched_finalize(self, company_uuid, mocker, django_assert_max_num_queries):
+        """A run builds every payslip in a fixed number of queries and finalizes with one event"""
+        publish = mocker.patch('utils.messaging.publish_event')
+        basic = SalaryComponent.objects.create(company_uuid=company_uuid, name="Basic", type="earning", calculation="percentage", value=60)
+        allowance = SalaryComponent.objects.create(company_uuid=company_uuid, name="Transport", type="earning", calculation="fixed", value=300)
+        tax = SalaryComponent.objects.create(company_uuid=company_uuid, name="Tax", type="deduction", calculation="percentage", value=10)
+        structure = SalaryStructure.objects.create(company_uuid=company_uuid, name="Grade A")
+        structure.components.set([basic, allowance, tax])
+
+        employees = []
+        for i in range(5):
+            employee = Employee.objects.create(company_uuid=company_uuid, employee_code=f"E{i}", first_name="E",
+                                               last_name=str(i), email=f"payroll{i}@example.com")
+            EmployeeSalary.objects.create(company_uuid=company_uuid, employee=employee, structure=structure, base_amount=3000)
+            employees.append(employee)
+
+        start, end = date(2026, 6, 1), date(2026, 6, 30)
+        Attendance.objects.create(employee=employees[0], date=date(2026, 6, 2), status='absent')
+        unpaid = LeaveType.objects.create(company_uuid=company_uuid, name="Unpaid", code="UL", is_paid=False)
+        LeaveApplication.objects.create(company_uuid=company_uuid, employee=employees[1], leave_type=unpaid,
+                                        start_date=date(2026, 5, 30), end_date=date(2026, 6, 2), status='approved')
+
+        with django_assert_max_num_queries(16):
+            run = PayrollEngine(company_uuid, start, end).run()
+        # Re-running a draft period replaces its payslips
+        run = PayrollEngine(company_uuid, start, end).run()
+
+        assert run.employee_count == 5
+        assert Payslip.objects.filter(run=run).count() == 5
+        full = Payslip.objects.get(employee=employees[4], run=run)
+        # 1800 basic + 300 transport - 300 tax (10% of the 3000 base)
+        assert (full.total_earnings, full.total_deductions, full.net_pay) == (Decimal('2100.00'), Decimal('300.00'), Decimal('1800.00'))
+        assert full.lines.count() == 3
+        absent = Payslip.objects.get(employee=employees[0], run=run)
+        assert absent.absent_days == 1 and absent.net_pay == Decimal('1740.00')
+        assert Payslip.objects.get(employee=employees[1], run=run).unpaid_leave_days == 2
+
+        # One payslip was finalized (and announced) on its own beforehand
+        Payslip.objects.filter(pk=full.pk).update(status='finalized')
+        # Regenerating keeps it and replaces only the drafts
+        run = PayrollEngine(company_uuid, start, end).run()
+        assert Payslip.objects.filter(run=run).count() == 5
+        assert Payslip.objects.filter(employee=employees[4], start_date=start).count() == 1
+
+        finalize_run(run)
+        assert PayrollRun.objects.get(pk=run.pk).status == 'finalized'
+        assert not Payslip.objects.filter(run=run, status='draft').exists()
+        publish.assert_called_once()
+        payload = publish.call_args.kwargs['payload']
+        assert payload['type'] == 'payroll_run_finalized' and len(payload['payslips']) == 4
+        assert str(full.pk) not in {p['payslip_id'] for p in payload['payslips']}
+        assert payload['net_pay'] == float(Payslip.objects.filter(run=run).exclude(pk=full.pk).aggregate(t=Sum('net_pay'))['t'])
+
+        with pytest.raises(ValueError):
+            finalize_run(run)
+        publish.assert_called_once()
+        # A regenerate that lost the race to finalize must not add drafts to the run
+        with pytest.raises(ValueError):
+            PayrollEngine(company_uuid, start, end)._write(run, [])
+        assert not Payslip.objects.filter(run=run, status='draft').exists()
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from apps.assistant.summaries import rebuild
+
+
+class Command(BaseCommand):
+    help = "Seed the assistant's summary store from the POS and HRMS tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=str, help='Only rebuild this company UUID')
+
+    def handle(self, *args, **options):
+        companies = [options['company']] if options.get('company') else None
+        if companies is None:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT DISTINCT company_uuid FROM pos.sales_order")
+                companies = [str(row[0]) for row in cursor.fetchall()]
+
+        for company_uuid in companies:
+            rebuild(company_uuid)
+            self.stdout.write(f"Rebuilt summaries for {company_uuid}")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(companies)} companies."))
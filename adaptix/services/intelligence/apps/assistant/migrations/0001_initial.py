@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SummarizedOrder',
+            fields=[
+                ('order_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('company_uuid', models.UUIDField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductSalesSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_uuid', models.UUIDField()),
+                ('product_name', models.CharField(max_length=255)),
+                ('quantity', models.DecimalField(decimal_places=3, default=0, max_digits=16)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company_uuid', '-quantity'], name='assistant_p_company_aeae53_idx')],
+                'unique_together': {('company_uuid', 'product_name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySalesSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_uuid', models.UUIDField()),
+                ('date', models.DateField()),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+            options={
+                'unique_together': {('company_uuid', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_uuid', models.UUIDField()),
+                ('employee_uuid', models.UUIDField()),
+                ('date', models.DateField()),
+                ('employee_name', models.CharField(max_length=255)),
+                ('status', models.CharField(max_length=20)),
+                ('late_minutes', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('company_uuid', 'employee_uuid', 'date')},
+            },
+        ),
+    ]
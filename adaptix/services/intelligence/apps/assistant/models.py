@@ -0,0 +1,44 @@
+from django.db import models
+
+
+class ProductSalesSummary(models.Model):
+    """Running units sold per product, maintained from pos.sale.closed events."""
+    company_uuid = models.UUIDField()
+    product_name = models.CharField(max_length=255)
+    quantity = models.DecimalField(max_digits=16, decimal_places=3, default=0)
+
+    class Meta:
+        unique_together = ('company_uuid', 'product_name')
+        indexes = [
+            models.Index(fields=['company_uuid', '-quantity']),
+        ]
+
+
+class DailySalesSummary(models.Model):
+    company_uuid = models.UUIDField()
+    date = models.DateField()
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('company_uuid', 'date')
+
+
+class AttendanceAlert(models.Model):
+    """Late/absent staff per day, maintained from hrms.attendance.recorded events."""
+    company_uuid = models.UUIDField()
+    employee_uuid = models.UUIDField()
+    date = models.DateField()
+    employee_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=20)
+    late_minutes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('company_uuid', 'employee_uuid', 'date')
+
+
+class SummarizedOrder(models.Model):
+    """Orders already counted, so redelivered sale events are not double counted."""
+    order_id = models.UUIDField(primary_key=True)
+    company_uuid = models.UUIDField()
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -1,5 +1,33 @@
-from django.db import connection
+import threading
+import time
+from collections import OrderedDict
 from datetime import date
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection
+from .models import AttendanceAlert, DailySalesSummary, ProductSalesSummary
+
+# (company_uuid, intent) -> (expires_at, answer); recent answers per process
+_answers = OrderedDict()
+_answers_lock = threading.Lock()
+
+
+def _cached_answer(key, compute):
+    now = time.monotonic()
+    with _answers_lock:
+        entry = _answers.get(key)
+        if entry is not None and entry[0] > now:
+            _answers.move_to_end(key)
+            return entry[1]
+
+    answer = compute()
+    with _answers_lock:
+        _answers[key] = (now + getattr(settings, 'ASSISTANT_ANSWER_TTL', 15), answer)
+        _answers.move_to_end(key)
+        while len(_answers) > getattr(settings, 'ASSISTANT_ANSWER_CACHE_SIZE', 1024):
+            _answers.popitem(last=False)
+    return answer
+
 
 class NLPEngine:
     def __init__(self, company_uuid):
@@ -19,108 +47,65 @@ class NLPEngine:
 
         # Intent: Top Products
         if 'top' in message and ('product' in message or 'selling' in message):
-            return self._get_top_products()
+            return self._answer('top_products', self._get_top_products)
 
         # Intent: Attendance / Staff
         if 'staff' in message or 'attendance' in message or 'late' in message or 'absent' in message:
-            return self._get_staff_insights(message)
+            return self._answer('staff', lambda: self._get_staff_insights(message))
 
         # Intent: Sales Summary/Revenue
         if 'sales' in message or 'revenue' in message:
-            return self._get_sales_summary(message)
+            return self._answer('sales_today', lambda: self._get_sales_summary(message))
 
         # Intent: Low Stock
         if 'stock' in message or 'inventory' in message or 'low' in message:
-            return self._get_low_stock()
+            return self._answer('low_stock', self._get_low_stock)
 
         return {
             "reply": "I didn't quite understand that. Try asking:\n- 'Show top selling products'\n- 'Is anyone late today?'\n- 'What are today's sales?'\n- 'Show me low stock items'"
         }
 
+    def _answer(self, intent, compute):
+        return _cached_answer((str(self.company_uuid), intent), compute)
+
     def _get_top_products(self):
-        """Query for top 5 selling products by quantity."""
-        with connection.cursor() as cursor:
-            sql = """
-                SELECT oi.product_name, SUM(oi.quantity) as total_qty
-                FROM pos.sales_order o
-                JOIN pos.sales_orderitem oi ON o.id = oi.order_id
-                WHERE o.company_uuid = %s AND o.status = 'completed'
-                GROUP BY oi.product_name
-                ORDER BY total_qty DESC
-                LIMIT 5
-            """
-            try:
-                cursor.execute(sql, [self.company_uuid])
-                rows = cursor.fetchall()
-                if not rows: return {"reply": "No sales data found yet."}
-                
-                reply = "Your top 5 selling products are:\n" + "\n".join([f"{i+1}. {r[0]} ({int(r[1])} units)" for i, r in enumerate(rows)])
-                return {"reply": reply, "data": rows}
-            except Exception as e:
-                return {"reply": "Error fetching top products.", "debug": str(e)}
+        """Top 5 selling products by quantity, from the summary store."""
+        rows = [
+            (r['product_name'], r['quantity']) for r in ProductSalesSummary.objects.filter(
+                company_uuid=self.company_uuid, quantity__gt=0
+            ).order_by('-quantity').values('product_name', 'quantity')[:5]
+        ]
+        if not rows: return {"reply": "No sales data found yet."}
+
+        reply = "Your top 5 selling products are:\n" + "\n".join([f"{i+1}. {r[0]} ({int(r[1])} units)" for i, r in enumerate(rows)])
+        return {"reply": reply, "data": rows}
 
     def _get_staff_insights(self, message):
-        """Query for late or absent staff today."""
-        with connection.cursor() as cursor:
-            # Table names based on app_model naming: hrms.employees_employee, hrms.attendance_attendance
-            sql = """
-                SELECT e.first_name, e.last_name, a.status, a.late_minutes
-                FROM hrms.attendance_attendance a
-                JOIN hrms.employees_employee e ON a.employee_id = e.id
-                WHERE e.company_uuid = %s AND a.date = CURRENT_DATE
-                AND (a.status IN ('late', 'absent') OR a.late_minutes > 0)
-            """
-            try:
-                cursor.execute(sql, [self.company_uuid])
-                rows = cursor.fetchall()
-                if not rows: return {"reply": "Everyone is on time today! No late or absent staff reported."}
-                
-                reply = "Attendance Alerts for today:\n" + "\n".join([f"- {r[0]} {r[1]}: {r[2].capitalize()}" + (f" ({r[3]} mins late)" if r[3] > 0 else "") for r in rows])
-                return {"reply": reply, "data": rows}
-            except Exception as e:
-                return {"reply": "I couldn't access the attendance records.", "debug": str(e)}
+        """Late or absent staff today, from the summary store."""
+        rows = [
+            (a.employee_name, a.status, a.late_minutes) for a in AttendanceAlert.objects.filter(
+                company_uuid=self.company_uuid, date=date.today()
+            ).order_by('employee_name')
+        ]
+        if not rows: return {"reply": "Everyone is on time today! No late or absent staff reported."}
+
+        reply = "Attendance Alerts for today:\n" + "\n".join([f"- {r[0]}: {r[1].capitalize()}" + (f" ({r[2]} mins late)" if r[2] > 0 else "") for r in rows])
+        return {"reply": reply, "data": rows}
 
     def _get_sales_summary(self, message):
-        """
-        Query the POS schema for sales data.
-        """
+        """Today's order count and revenue, from the summary store."""
         # Determine timeframe (default to today)
         query_date = date.today()
         # TODO: Add logic for 'yesterday', 'this week' parsing
-        
-        with connection.cursor() as cursor:
-            # Note: We access the 'pos' schema directly.
-            # Table name is typically 'sales_order' inside 'apps/sales'.
-            # Given Django's default: app_label + '_' + model_name -> 'sales_order'
-            
-            # Since we are in the 'intelligence' service, we need to ensure we target the 'pos' schema.
-            # However, looking at the project structure, it seems we might need to confirm the schema name.
-            # Assuming 'pos' schema based on standard microservice pattern in this project.
-            
-            # Query: Total Sales for the Company for Today, Status can be 'completed'
-            sql = """
-                SELECT COUNT(*), COALESCE(SUM(grand_total), 0)
-                FROM pos.sales_order 
-                WHERE company_uuid = %s 
-                AND status = 'completed'
-                AND created_at::date = %s
-            """
-            
-            try:
-                cursor.execute(sql, [self.company_uuid, query_date])
-                row = cursor.fetchone()
-                count = row[0]
-                total = row[1]
-                
-                return {
-                    "reply": f"Sales for today ({query_date}):\n\nTotal Orders: {count}\nTotal Revenue: ৳{total:,.2f}",
-                    "data": {"count": count, "total": float(total)}
-                }
-            except Exception as e:
-                return {
-                    "reply": f"I couldn't fetch the sales data. Error: {str(e)}",
-                    "debug": str(e)
-                }
+
+        summary = DailySalesSummary.objects.filter(company_uuid=self.company_uuid, date=query_date).first()
+        count = summary.order_count if summary else 0
+        total = summary.revenue if summary else Decimal('0')
+
+        return {
+            "reply": f"Sales for today ({query_date}):\n\nTotal Orders: {count}\nTotal Revenue: ৳{total:,.2f}",
+            "data": {"count": count, "total": float(total)}
+        }
 
     def _get_low_stock(self):
         """
@@ -0,0 +1,161 @@
+"""
+Per-company summary store behind the assistant's intent handlers.
+
+Kept up to date from pos.sale.closed and hrms.attendance.recorded events
+(see run_assistant_consumer), so answering a question never touches the
+POS or HRMS transactional tables.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import AttendanceAlert, DailySalesSummary, ProductSalesSummary, SummarizedOrder
+
+ALERT_STATUSES = ('late', 'absent')
+SALE_STATUS = 'completed'
+
+
+def _event_date(value):
+    parsed = parse_datetime(value) if value else None
+    return parsed.date() if parsed else date.today()
+
+
+@transaction.atomic
+def record_sale(data):
+    """
+    Fold one pos.sale.closed event into the sales summaries. Returns False for
+    redeliveries and for orders that are not completed (drafts, cancellations).
+    """
+    company_uuid = data.get('company_uuid')
+    order_id = data.get('order_id')
+    if not company_uuid or not order_id or data.get('status') != SALE_STATUS:
+        return False
+
+    _, created = SummarizedOrder.objects.get_or_create(order_id=order_id, defaults={'company_uuid': company_uuid})
+    if not created:
+        return False
+
+    quantities = {}
+    for item in data.get('items', []):
+        name = item.get('product_name')
+        if name:
+            quantities[name] = quantities.get(name, Decimal('0')) + Decimal(str(item.get('quantity') or 0))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {DailySalesSummary._meta.db_table} (company_uuid, date, order_count, revenue)
+            VALUES (%s, %s, 1, %s)
+            ON CONFLICT (company_uuid, date) DO UPDATE SET
+                order_count = {DailySalesSummary._meta.db_table}.order_count + 1,
+                revenue = {DailySalesSummary._meta.db_table}.revenue + EXCLUDED.revenue
+            """,
+            [company_uuid, _event_date(data.get('created_at')), Decimal(str(data.get('grand_total') or 0))],
+        )
+        if quantities:
+            cursor.executemany(
+                f"""
+                INSERT INTO {ProductSalesSummary._meta.db_table} (company_uuid, product_name, quantity)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (company_uuid, product_name) DO UPDATE SET
+                    quantity = {ProductSalesSummary._meta.db_table}.quantity + EXCLUDED.quantity
+                """,
+                [[company_uuid, name, qty] for name, qty in quantities.items()],
+            )
+    return True
+
+
+@transaction.atomic
+def record_attendance(data):
+    """Apply one hrms.attendance.recorded event to the late/absent list."""
+    company_uuid = data.get('company_uuid')
+    if not company_uuid:
+        return
+
+    alerts, cleared = [], []
+    for record in data.get('records', []):
+        key = (record['employee_uuid'], record['date'])
+        if record.get('status') in ALERT_STATUSES or (record.get('late_minutes') or 0) > 0:
+            alerts.append(AttendanceAlert(
+                company_uuid=company_uuid,
+                employee_uuid=record['employee_uuid'],
+                date=record['date'],
+                employee_name=record.get('employee_name', ''),
+                status=record.get('status', ''),
+                late_minutes=record.get('late_minutes') or 0,
+            ))
+        else:
+            cleared.append(key)
+
+    AttendanceAlert.objects.bulk_create(
+        alerts,
+        update_conflicts=True,
+        unique_fields=['company_uuid', 'employee_uuid', 'date'],
+        update_fields=['employee_name', 'status', 'late_minutes'],
+    )
+    for employee_uuid, day in cleared:
+        AttendanceAlert.objects.filter(company_uuid=company_uuid, employee_uuid=employee_uuid, date=day).delete()
+
+
+@transaction.atomic
+def rebuild(company_uuid):
+    """
+    Seed a company's summaries from the transactional tables. Only needed
+    once (or after an outage); events keep them current afterwards.
+    """
+    today = date.today()
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT oi.product_name, SUM(oi.quantity)
+            FROM pos.sales_order o
+            JOIN pos.sales_orderitem oi ON o.id = oi.order_id
+            WHERE o.company_uuid = %s AND o.status = 'completed'
+            GROUP BY oi.product_name
+        """, [str(company_uuid)])
+        products = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT o.created_at::date, COUNT(*), COALESCE(SUM(o.grand_total), 0)
+            FROM pos.sales_order o
+            WHERE o.company_uuid = %s AND o.status = 'completed'
+            GROUP BY o.created_at::date
+        """, [str(company_uuid)])
+        days = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT e.id, e.first_name, e.last_name, a.status, a.late_minutes
+            FROM hrms.attendance_attendance a
+            JOIN hrms.employees_employee e ON a.employee_id = e.id
+            WHERE e.company_uuid = %s AND a.date = %s
+            AND (a.status IN ('late', 'absent') OR a.late_minutes > 0)
+        """, [str(company_uuid), today])
+        late = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT o.id FROM pos.sales_order o WHERE o.company_uuid = %s
+        """, [str(company_uuid)])
+        orders = [row[0] for row in cursor.fetchall()]
+
+    ProductSalesSummary.objects.filter(company_uuid=company_uuid).delete()
+    ProductSalesSummary.objects.bulk_create(
+        [ProductSalesSummary(company_uuid=company_uuid, product_name=name, quantity=qty) for name, qty in products],
+        batch_size=1000,
+    )
+    DailySalesSummary.objects.filter(company_uuid=company_uuid).delete()
+    DailySalesSummary.objects.bulk_create(
+        [DailySalesSummary(company_uuid=company_uuid, date=d, order_count=c, revenue=r) for d, c, r in days],
+        batch_size=1000,
+    )
+    AttendanceAlert.objects.filter(company_uuid=company_uuid, date=today).delete()
+    AttendanceAlert.objects.bulk_create([
+        AttendanceAlert(company_uuid=company_uuid, employee_uuid=emp_id, date=today,
+                        employee_name=f"{first} {last}", status=status, late_minutes=late_minutes or 0)
+        for emp_id, first, last, status, late_minutes in late
+    ])
+    SummarizedOrder.objects.bulk_create(
+        [SummarizedOrder(order_id=order_id, company_uuid=company_uuid) for order_id in orders],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class AutomationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.automation'
+
+    def ready(self):
+        import apps.automation.signals
@@ -0,0 +1,195 @@
+"""
+In-memory index of compiled automation triggers.
+
+Active rules and workflow trigger nodes are loaded in two queries and grouped
+by (trigger_type, company) so a trigger only walks the entries it can match.
+Rule conditions are compiled into closures once, at build time. The index is
+dropped whenever a rule or workflow is saved or deleted in this process and
+rebuilt after AUTOMATION_RULE_INDEX_TTL seconds so that changes made by other
+processes are picked up as well.
+
+Matched rules' last_triggered_at values are buffered and written with one
+UPDATE per flush instead of one save per rule. A buffer is flushed once it
+is full, by a background timer AUTOMATION_TRIGGER_FLUSH_SECONDS after its
+first mark (so a quiet process doesn't hold values forever), and at exit.
+"""
+import atexit
+import logging
+import operator
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import AutomationRule, Workflow
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '<': operator.lt,
+    '>=': operator.ge,
+    '<=': operator.le,
+}
+
+
+def _always(context):
+    return True
+
+
+def _never(context):
+    return False
+
+
+def compile_condition(field, op, target_value):
+    """
+    Returns a callable(context) -> bool equivalent to RuleEngine's
+    "field operator value" check, with the operator and the numeric form of
+    the target resolved up front.
+    """
+    if not field:
+        return _always
+    compare = OPERATORS.get(op)
+    if compare is None:
+        return _never
+    try:
+        numeric = float(target_value)
+    except (TypeError, ValueError):
+        numeric = target_value
+
+    def check(context):
+        value = context.get(field)
+        if value is None:
+            return False
+        # Numeric context values are compared against the numeric target
+        target = numeric if isinstance(value, (int, float)) else target_value
+        try:
+            return compare(value, target)
+        except Exception:
+            return False
+
+    return check
+
+
+class CompiledRule:
+    __slots__ = ('id', 'company_uuid', 'check')
+
+    def __init__(self, rule):
+        self.id = rule.id
+        self.company_uuid = rule.company_uuid
+        self.check = compile_condition(rule.condition_field, rule.condition_operator, rule.condition_value)
+
+
+class RuleIndex:
+    def __init__(self):
+        self._entries = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def lookup(self, trigger_type, company_uuid=None):
+        """(compiled rules, workflows) for a trigger; company None matches every company."""
+        entries = self._entries
+        if not self._fresh(entries):
+            entries = self._build()
+        company_key = str(company_uuid) if company_uuid else None
+        return entries.get(trigger_type, {}).get(company_key, ((), ()))
+
+    def invalidate(self):
+        self._entries = None
+
+    def _fresh(self, entries):
+        ttl = getattr(settings, 'AUTOMATION_RULE_INDEX_TTL', 60)
+        return entries is not None and time.monotonic() - self._built_at <= ttl
+
+    def _build(self):
+        with self._lock:
+            if self._fresh(self._entries):
+                return self._entries
+
+            grouped = {}  # trigger_type -> company -> ([rules], [workflows])
+
+            def slot(trigger_type, company_uuid):
+                companies = grouped.setdefault(trigger_type, {})
+                return companies.setdefault(str(company_uuid) if company_uuid else '', ([], []))
+
+            for rule in AutomationRule.objects.filter(is_active=True).only(
+                'id', 'trigger_type', 'company_uuid', 'condition_field', 'condition_operator', 'condition_value',
+            ):
+                slot(rule.trigger_type, rule.company_uuid)[0].append(CompiledRule(rule))
+
+            for workflow in Workflow.objects.filter(is_active=True):
+                graph = workflow.get_graph()
+                start_node = graph['nodes'].get(graph['start']) if graph.get('start') else None
+                event = start_node.get('data', {}).get('event') if start_node else None
+                if event:
+                    slot(event, workflow.company_uuid)[1].append(workflow)
+
+            entries = {}
+            for trigger_type, companies in grouped.items():
+                by_company = {
+                    company: (tuple(rules), tuple(workflows))
+                    for company, (rules, workflows) in companies.items() if company
+                }
+                # Unscoped triggers match every company, including rules without one
+                by_company[None] = (
+                    tuple(r for rules, _ in companies.values() for r in rules),
+                    tuple(w for _, workflows in companies.values() for w in workflows),
+                )
+                entries[trigger_type] = by_company
+
+            self._entries = entries
+            self._built_at = time.monotonic()
+            return entries
+
+    def mark_triggered(self, rule_ids, when=None):
+        when = when or timezone.now()
+        interval = getattr(settings, 'AUTOMATION_TRIGGER_FLUSH_SECONDS', 5)
+        with self._lock:
+            for rule_id in rule_ids:
+                self._pending[rule_id] = when
+            due = (
+                len(self._pending) >= getattr(settings, 'AUTOMATION_TRIGGER_FLUSH_SIZE', 500)
+                or time.monotonic() - self._last_flush >= interval
+            )
+            if not due and self._pending and self._timer is None:
+                self._timer = threading.Timer(interval, self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Writes buffered last_triggered_at values, one UPDATE per distinct timestamp."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        by_time = {}
+        for rule_id, when in pending.items():
+            by_time.setdefault(when, []).append(rule_id)
+        # QuerySet.update() sends no post_save, so flushing keeps the index warm
+        for when, rule_ids in by_time.items():
+            AutomationRule.all_objects.filter(id__in=rule_ids).update(last_triggered_at=when)
+        return len(pending)
+
+    def _flush_in_background(self):
+        """Timer/atexit flush: never raises, and releases this thread's DB connection."""
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Failed to flush automation trigger marks")
+        finally:
+            connection.close()
+
+
+rule_index = RuleIndex()
+atexit.register(rule_index._flush_in_background)
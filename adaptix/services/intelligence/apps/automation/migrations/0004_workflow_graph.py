@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:55
+
+from django.db import migrations, models
+
+
+def compile_graphs(apps, schema_editor):
+    from apps.automation.models import compile_flow
+
+    Workflow = apps.get_model('automation', 'Workflow')
+    workflows = list(Workflow.objects.all())
+    for workflow in workflows:
+        workflow.graph = compile_flow(workflow.flow_data or {})
+    Workflow.objects.bulk_update(workflows, ['graph'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0003_workflow_automationrule_is_scheduled_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflow',
+            name='graph',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(compile_graphs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:56
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def schedule_rules(apps, schema_editor):
+    from apps.automation.models import next_run_for
+
+    AutomationRule = apps.get_model('automation', 'AutomationRule')
+    now = timezone.now()
+    rules = list(AutomationRule.objects.filter(is_scheduled=True))
+    for rule in rules:
+        rule.next_run_at = next_run_for(rule.trigger_config or {}, rule.last_triggered_at, now)
+    AutomationRule.objects.bulk_update(rules, ['next_run_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0004_workflow_graph'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='automationrule',
+            name='next_run_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='automationrule',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_scheduled', True)), fields=['next_run_at'], name='automation_rule_due_idx'),
+        ),
+        migrations.RunPython(schedule_rules, migrations.RunPython.noop),
+    ]
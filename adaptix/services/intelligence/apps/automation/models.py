@@ -1,7 +1,35 @@
+import logging
 import uuid
+from datetime import datetime, timedelta
 from django.db import models
+from django.utils import timezone
 from apps.utils.models import SoftDeleteModel
 
+logger = logging.getLogger(__name__)
+
+def next_run_for(trigger_config, last_run, now):
+    """
+    When a scheduled rule is next due, from its trigger_config
+    ({"interval_minutes": 60} or {"cron": "0 17 * * 5"}) and its last run.
+    Rules that never ran are due immediately; None means never.
+    """
+    if not last_run:
+        return now
+
+    interval = trigger_config.get('interval_minutes')
+    if interval:
+        return last_run + timedelta(minutes=interval)
+
+    cron_expr = trigger_config.get('cron')
+    if cron_expr:
+        try:
+            from croniter import croniter
+            # The first scheduled time after the last execution
+            return croniter(cron_expr, last_run).get_next(datetime)
+        except Exception as e:
+            logger.error(f"Invalid cron expression {cron_expr!r}: {e}")
+    return None
+
 class AutomationRule(SoftDeleteModel):
     TRIGGER_CHOICES = (
         ('stock_level', 'Stock Level Change'),
@@ -36,6 +64,8 @@ class AutomationRule(SoftDeleteModel):
     # New: Scheduling support
     trigger_config = models.JSONField(default=dict, blank=True, help_text="Config for schedule (e.g. cron)")
     is_scheduled = models.BooleanField(default=False)
+    # Precomputed from trigger_config and last_triggered_at, see next_run_for
+    next_run_at = models.DateTimeField(null=True, blank=True, editable=False)
     
     company_uuid = models.UUIDField(db_index=True, null=True, blank=True)
     description = models.TextField(blank=True, null=True)
@@ -44,6 +74,27 @@ class AutomationRule(SoftDeleteModel):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Heartbeat lookup of due rules
+            models.Index(
+                fields=['next_run_at'], name='automation_rule_due_idx',
+                condition=models.Q(is_active=True, is_scheduled=True),
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.next_run_at = self.compute_next_run()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'next_run_at'}
+        super().save(*args, **kwargs)
+
+    def compute_next_run(self, now=None):
+        if not self.is_scheduled:
+            return None
+        return next_run_for(self.trigger_config or {}, self.last_triggered_at, now or timezone.now())
+
     def __str__(self):
         return f"{self.name} ({self.trigger_type} -> {self.action_type})"
 
@@ -57,6 +108,30 @@ class ActionLog(models.Model):
     def __str__(self):
         return f"Log {self.id} - {self.rule.name}"
 
+def compile_flow(flow_data):
+    """
+    Adjacency index of a visual-builder flow: the start (trigger) node, nodes
+    by id and outgoing edges by source, so execution never scans the lists.
+    """
+    nodes = {}
+    start = None
+    for node in flow_data.get('nodes', []):
+        if 'id' not in node:
+            continue
+        nodes[str(node['id'])] = node
+        if start is None and node.get('type') == 'trigger':
+            start = str(node['id'])
+
+    edges = {}
+    for edge in flow_data.get('edges', []):
+        if edge.get('source') is None or edge.get('target') is None:
+            continue
+        edges.setdefault(str(edge['source']), []).append({
+            'target': str(edge['target']),
+            'label': edge.get('label'),
+        })
+    return {'start': start, 'nodes': nodes, 'edges': edges}
+
 class Workflow(SoftDeleteModel):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255)
@@ -65,11 +140,24 @@ class Workflow(SoftDeleteModel):
     
     # Nodes/Edges for visual builder integration
     flow_data = models.JSONField(default=dict, help_text="JSON structure of steps and transitions")
+    # Compiled from flow_data on every save, see compile_flow
+    graph = models.JSONField(default=dict, blank=True, editable=False)
     
     company_uuid = models.UUIDField(db_index=True, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        self.graph = compile_flow(self.flow_data or {})
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'flow_data' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'graph'}
+        super().save(*args, **kwargs)
+
+    def get_graph(self):
+        # Rows written around save() (e.g. queryset.update) are compiled on the fly
+        return self.graph or compile_flow(self.flow_data or {})
+
     def __str__(self):
         return self.name
 
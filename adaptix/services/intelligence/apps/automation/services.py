@@ -1,7 +1,11 @@
 import requests
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
-from datetime import datetime
+from .index import compile_condition, rule_index
 from .models import AutomationRule, ActionLog, Workflow, WorkflowInstance
 
 logger = logging.getLogger(__name__)
@@ -96,7 +100,16 @@ class ActionRunner:
 class WorkflowRunner:
     """
     Handles execution of multi-step workflows.
+
+    Walks the workflow's compiled graph (see compile_flow) iteratively, one
+    wave of nodes at a time. Action nodes reached through fan-out edges run
+    concurrently on a shared thread pool. The instance is saved only at
+    durable boundaries: after a wave of actions, at an approval and when the
+    run ends.
     """
+    _pool = None
+    _pool_lock = threading.Lock()
+
     @staticmethod
     def start(workflow, company_uuid, context):
         instance = WorkflowInstance.objects.create(
@@ -105,108 +118,129 @@ class WorkflowRunner:
             context_data=context,
             status='running'
         )
-        WorkflowRunner.execute_next_step(instance)
+        WorkflowRunner.run(instance)
         return instance
 
     @staticmethod
     def execute_next_step(instance):
-        flow_data = instance.workflow.flow_data
-        nodes = flow_data.get('nodes', [])
-        edges = flow_data.get('edges', [])
-        
-        # Simple BFS/DFS progression based on current_node_id
-        if not instance.current_node_id:
-            # Find start node (e.g. type: 'trigger')
-            start_node = next((n for n in nodes if n.get('type') == 'trigger'), None)
-            if not start_node:
-                instance.status = 'failed'
-                instance.save()
+        WorkflowRunner.run(instance)
+
+    @staticmethod
+    def run(instance):
+        graph = instance.workflow.get_graph()
+        nodes = graph.get('nodes', {})
+        edges = graph.get('edges', {})
+
+        start = instance.current_node_id or graph.get('start')
+        if not start:
+            return WorkflowRunner._fail(instance, "no trigger node")
+
+        frontier = [start]
+        visited = set()
+        while frontier:
+            wave = []
+            for node_id in frontier:
+                # A node runs once per pass, which also stops cycles
+                if node_id in visited:
+                    continue
+                visited.add(node_id)
+                node = nodes.get(node_id)
+                if node is None:
+                    return WorkflowRunner._fail(instance, f"unknown node {node_id}")
+                wave.append(node)
+
+            actions = [node for node in wave if node.get('type') == 'action']
+            if actions:
+                error = WorkflowRunner._run_actions(instance, actions)
+                if error:
+                    return WorkflowRunner._fail(instance, error)
+
+            approval = next((node for node in wave if node.get('type') == 'approval'), None)
+            if approval:
+                instance.status = 'pending_approval'
+                instance.current_node_id = str(approval['id'])
+                instance.save(update_fields=['status', 'current_node_id'])
+                logger.info(f"Workflow {instance.id} waiting for approval at node {approval['id']}")
                 return
-            instance.current_node_id = start_node['id']
-            
-        # Find current node
-        current_node = next((n for n in nodes if n['id'] == instance.current_node_id), None)
-        if not current_node:
-            instance.status = 'failed'
-            instance.save()
-            return
-            
-        # Find next nodes
-        next_edges = [e for e in edges if e['source'] == instance.current_node_id]
-        if not next_edges:
-            instance.set_completed()
-            return
-            
-        # If multiple edges, logic usually depends on node type (like condition)
-        # For simple linear, we take the first. For condition, we'll pick based on result.
-        
-        # We'll postpone finding next_node to _process_node or call it sequentially
-        WorkflowRunner._process_node(instance, current_node, next_edges, nodes)
+
+            frontier = []
+            for node in wave:
+                frontier.extend(WorkflowRunner._next_nodes(instance, node, edges.get(str(node['id']), [])))
+
+            if actions and frontier:
+                # Durable point: a resumed run continues after the executed actions
+                instance.current_node_id = frontier[0]
+                instance.save(update_fields=['current_node_id'])
+
+        instance.set_completed()
 
     @staticmethod
-    def _process_node(instance, node, next_edges, all_nodes):
-        node_type = node.get('type')
+    def _next_nodes(instance, node, next_edges):
+        if node.get('type') != 'condition':
+            return [edge['target'] for edge in next_edges]
+
+        # Branching logic: condition based on data in context
+        # We expect edges to have a 'label' like 'True'/'False'
         data = node.get('data', {})
-        
-        if node_type == 'action':
-            # ... existing action logic ...
-            rule_stub = type('RuleStub', (), {
-                'action_type': data.get('action_type'),
-                'action_config': data.get('config', {}),
-                'name': f"FlowStep: {node['id']}"
-            })
+        condition_met = RuleEngine._check_condition_logic(
+            data.get('field'),
+            data.get('operator', '=='),
+            data.get('value'),
+            instance.context_data
+        )
+        target_label = 'True' if condition_met else 'False'
+        matched = [e['target'] for e in next_edges if e.get('label') == target_label]
+        if not matched and next_edges:
+            # Fallback to first if no labels match
+            matched = [next_edges[0]['target']]
+        return matched
+
+    @staticmethod
+    def _run_actions(instance, actions):
+        """Runs a wave of action nodes; returns an error message if any of them failed."""
+        if len(actions) == 1:
+            calls = [lambda: WorkflowRunner._run_action(instance, actions[0])]
+        else:
+            pool = WorkflowRunner._action_pool()
+            futures = [pool.submit(WorkflowRunner._run_action, instance, node) for node in actions]
+            calls = [future.result for future in futures]
+
+        errors = []
+        for node, call in zip(actions, calls):
             try:
-                ActionRunner.run(rule_stub, instance.context_data)
-                # Linear progression
-                if next_edges:
-                    instance.current_node_id = next_edges[0]['target']
-                    instance.save()
-                    WorkflowRunner.execute_next_step(instance)
-                else:
-                    instance.set_completed()
+                call()
             except Exception as e:
-                instance.status = 'failed'
-                instance.save()
                 logger.error(f"Workflow {instance.id} failed at node {node['id']}: {e}")
+                errors.append(f"node {node['id']}: {e}")
+        return "; ".join(errors)
 
-        elif node_type == 'condition':
-            # Branching logic: condition based on data in context
-            # We expect edges to have a 'label' or 'condition' like 'True'/'False'
-            # Or data.condition to define what to check
-            condition_met = RuleEngine._check_condition_logic(
-                data.get('field'), 
-                data.get('operator', '=='), 
-                data.get('value'), 
-                instance.context_data
-            )
-            
-            target_label = 'True' if condition_met else 'False'
-            edge = next((e for e in next_edges if e.get('label') == target_label), None)
-            
-            if not edge and next_edges:
-                 # Fallback to first if no labels match
-                 edge = next_edges[0]
-            
-            if edge:
-                instance.current_node_id = edge['target']
-                instance.save()
-                WorkflowRunner.execute_next_step(instance)
-            else:
-                instance.set_completed()
-
-        elif node_type == 'approval':
-            instance.status = 'pending_approval'
-            instance.save()
-            logger.info(f"Workflow {instance.id} waiting for approval at node {node['id']}")
-
-        elif node_type == 'trigger':
-            # Trigger node itself just continues
-            if next_edges:
-                instance.current_node_id = next_edges[0]['target']
-                instance.save()
-                WorkflowRunner.execute_next_step(instance)
-            else:
-                instance.set_completed()
+    @staticmethod
+    def _run_action(instance, node):
+        data = node.get('data', {})
+        rule_stub = type('RuleStub', (), {
+            'action_type': data.get('action_type'),
+            'action_config': data.get('config', {}),
+            'name': f"FlowStep: {node['id']}",
+            'trigger_type': 'workflow',
+            'company_uuid': instance.company_uuid,
+        })
+        return ActionRunner.run(rule_stub, instance.context_data)
+
+    @classmethod
+    def _action_pool(cls):
+        with cls._pool_lock:
+            if cls._pool is None:
+                cls._pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'WORKFLOW_ACTION_WORKERS', 4),
+                    thread_name_prefix='workflow-action',
+                )
+            return cls._pool
+
+    @staticmethod
+    def _fail(instance, reason):
+        logger.error(f"Workflow {instance.id} failed: {reason}")
+        instance.status = 'failed'
+        instance.save(update_fields=['status'])
 
 class RuleEngine:
     """
@@ -217,40 +251,32 @@ class RuleEngine:
     def evaluate(trigger_type: str, context: dict, company_uuid=None):
         """
         Evaluate all active rules for a given trigger type and company.
+
+        Candidates come from the compiled rule index, so a trigger costs one
+        dict lookup plus one precompiled check per candidate rule.
         """
-        rules = AutomationRule.objects.filter(trigger_type=trigger_type, is_active=True)
-        if company_uuid:
-            rules = rules.filter(company_uuid=company_uuid)
-            
-        # Also check Workflows
-        workflows = Workflow.objects.filter(is_active=True)
-        if company_uuid:
-            workflows = workflows.filter(company_uuid=company_uuid)
-            
-        # For now, we only trigger workflows that have a trigger node matching trigger_type
-        # In a real system, we'd have a trigger registry
-            
+        from .tasks import execute_rule_action
+
+        rules, workflows = rule_index.lookup(trigger_type, company_uuid)
+
         results = []
+        triggered = []
         for rule in rules:
-            if RuleEngine._check_condition(rule, context):
+            if rule.check(context):
                 # We trigger execution via a celery task
-                from .tasks import execute_rule_action
                 execute_rule_action.delay(str(rule.id), context)
-                
-                # Mark as triggered
-                rule.last_triggered_at = timezone.now()
-                rule.save(update_fields=['last_triggered_at'])
-                
+                triggered.append(rule.id)
                 results.append({"rule_id": str(rule.id), "status": "queued"})
-        
+
+        if triggered:
+            # Mark as triggered; written in batches by the index
+            rule_index.mark_triggered(triggered)
+
         for wf in workflows:
-            # Check if workflow starts with this trigger
-            start_node = next((n for n in wf.flow_data.get('nodes', []) if n.get('type') == 'trigger'), None)
-            if start_node and start_node.get('data', {}).get('event') == trigger_type:
-                # Start workflow
-                WorkflowRunner.start(wf, company_uuid, context)
-                results.append({"workflow_id": str(wf.id), "status": "started"})
-                
+            # Workflows are indexed by the event of their trigger node
+            WorkflowRunner.start(wf, company_uuid or wf.company_uuid, context)
+            results.append({"workflow_id": str(wf.id), "status": "started"})
+
         return results
 
     @staticmethod
@@ -264,100 +290,54 @@ class RuleEngine:
 
     @staticmethod
     def _check_condition_logic(field, op, target_value, context):
-        if not field:
-            return True
-            
-        value_to_check = context.get(field)
-        if value_to_check is None:
-            return False
-        
-        # Type conversion
-        try:
-            if isinstance(value_to_check, (int, float)):
-                target_value = float(target_value)
-            elif isinstance(value_to_check, bool):
-                target_value = str(target_value).lower() == 'true'
-        except:
-            pass
-
-        operators = {
-            '==': lambda a, b: a == b,
-            '!=': lambda a, b: a != b,
-            '>': lambda a, b: a > b,
-            '<': lambda a, b: a < b,
-            '>=': lambda a, b: a >= b,
-            '<=': lambda a, b: a <= b,
-        }
-        
-        checker = operators.get(op)
-        if checker:
-            try:
-                return checker(value_to_check, target_value)
-            except:
-                return False
-                
-        return False
+        return compile_condition(field, op, target_value)(context)
 
 class SchedulerRunner:
     """
     Checks and runs scheduled automation rules and workflows.
     Called by a periodic heartbeat task.
+
+    Each scheduled rule carries a precomputed next_run_at, so a beat selects
+    only the due rules through a partial index, dispatches them and advances
+    their schedule with one bulk update.
     """
     @staticmethod
-    def run_heartbeat():
-        now = timezone.now()
+    def run_heartbeat(now=None):
+        now = now or timezone.now()
         logger.info(f"Automation heartbeat at {now}")
-        
-        # Check Rules
-        scheduled_rules = AutomationRule.objects.filter(is_active=True, is_scheduled=True)
-        for rule in scheduled_rules:
-            if SchedulerRunner._should_run(rule, now):
-                # Using 'scheduled' as trigger type
-                RuleEngine.evaluate(rule.trigger_type, {"scheduled_at": str(now)}, company_uuid=rule.company_uuid)
+        batch_size = getattr(settings, 'AUTOMATION_SCHEDULER_BATCH', 1000)
+
+        with transaction.atomic():
+            # skip_locked lets overlapping beats split the due rules instead of double-firing
+            due = list(
+                AutomationRule.objects.select_for_update(skip_locked=True)
+                .filter(is_active=True, is_scheduled=True, next_run_at__lte=now)
+                .order_by('next_run_at')[:batch_size]
+            )
+            context = {"scheduled_at": str(now)}
+            rule_ids = []
+            groups = set()
+            for rule in due:
+                if compile_condition(rule.condition_field, rule.condition_operator, rule.condition_value)(context):
+                    rule_ids.append(str(rule.id))
+                groups.add((rule.trigger_type, rule.company_uuid))
+                rule.last_triggered_at = now
+                rule.next_run_at = rule.compute_next_run(now)
+            AutomationRule.objects.bulk_update(due, ['last_triggered_at', 'next_run_at'], batch_size=batch_size)
+            transaction.on_commit(lambda: SchedulerRunner._dispatch(rule_ids, groups, context))
+
+        # Also drains trigger marks buffered by event-driven evaluations
+        rule_index.flush()
+        return len(due)
 
     @staticmethod
-    def _should_run(rule, now):
-        # Basic check: if never run or last run was more than the interval ago
-        # trigger_config: {"interval_minutes": 60} or {"cron": "0 17 * * 5"}
-        config = rule.trigger_config
-        last_run = rule.last_triggered_at
-        
-        if not last_run:
-            return True # Run first time
-            
-        interval = config.get('interval_minutes')
-        if interval:
-            delta = now - last_run
-            return delta.total_seconds() >= (interval * 60)
-            
-        # Cron parsing using croniter
-        cron_expr = config.get('cron')
-        if cron_expr:
-            try:
-                from croniter import croniter
-                # croniter expects the *previous* run time to calculate the next one
-                # If never run, assume it should run if the current time matches the schedule window
-                # But a safer approach for periodic checks:
-                # Get the *previous* expected run time relative to NOW.
-                # If that previous time is > last_run, then we missed a run (or it's due).
-                
-                # Check if we should have run since the last execution
-                iter = croniter(cron_expr, now)
-                prev_scheduled = iter.get_prev(datetime) # get the previous scheduled time
-                
-                if not last_run:
-                    # If never run, and we are currently IN the minute of the schedule, run it?
-                    # Or simpler: just run immediately if it's a new rule. 
-                    # Let's say: run if create_at is older than prev_scheduled? 
-                    # For safety, let's just return True to initialize the cycle.
-                    return True
-                
-                # If the previous scheduled time is AFTER the last actual run, we are due.
-                # Example: Now is 17:01. Prev sched was 17:00. Last run was 16:00.
-                # 17:00 > 16:00 -> True.
-                return prev_scheduled > last_run
-            except Exception as e:
-                logger.error(f"Invalid cron expression for rule {rule.id}: {e}")
-                return False
+    def _dispatch(rule_ids, groups, context):
+        from .tasks import execute_rule_action
 
-        return False
+        for rule_id in rule_ids:
+            execute_rule_action.delay(rule_id, context)
+        # Workflows listening on a fired schedule's trigger start once per beat
+        for trigger_type, company_uuid in groups:
+            _, workflows = rule_index.lookup(trigger_type, company_uuid)
+            for wf in workflows:
+                WorkflowRunner.start(wf, company_uuid or wf.company_uuid, context)
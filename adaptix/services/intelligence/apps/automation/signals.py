@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .index import rule_index
+from .models import AutomationRule, Workflow
+
+
+@receiver(post_save, sender=AutomationRule)
+@receiver(post_delete, sender=AutomationRule)
+@receiver(post_save, sender=Workflow)
+@receiver(post_delete, sender=Workflow)
+def invalidate_rule_index(sender, instance, **kwargs):
+    # Drop now for this connection and again once other connections can see the change
+    rule_index.invalidate()
+    transaction.on_commit(rule_index.invalidate)
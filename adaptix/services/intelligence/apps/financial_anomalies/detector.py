@@ -0,0 +1,272 @@
+"""
+Chunked financial anomaly detection.
+
+Companies are processed one at a time. Journal rows are streamed through a
+server-side cursor in chunks sized from a memory budget; each company's
+IsolationForest is fitted on a bounded sample, persisted in
+AnomalyModelState and reused until it ages out, and only entries created
+since the company's last run are scored (plus earlier entries they
+duplicate). All three detectors' findings for a chunk are written with a
+single bulk upsert.
+"""
+import pickle
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+import pandas as pd
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from sklearn.ensemble import IsolationForest
+
+from .models import AnomalyModelState, FinancialAnomaly
+import logging
+
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = 30
+MIN_FIT_ROWS = 5  # Need minimum data for IF
+# Rough in-memory footprint of one streamed journal row (DataFrame + row tuple)
+ROW_BYTES = 1024
+
+COLUMNS = ['entry_id', 'date', 'reference', 'amount', 'company_uuid', 'description', 'account_name', 'group_type', 'duplicates', 'is_new']
+
+PENDING_COMPANIES = """
+    SELECT e.company_uuid
+    FROM accounting.ledger_journalentry e
+    LEFT JOIN {state} s ON s.company_uuid = e.company_uuid
+    WHERE e.date > NOW() - INTERVAL '30 days'
+    AND e.created_at > COALESCE(s.scored_until, '-infinity'::timestamptz)
+    AND e.created_at <= %s
+"""
+
+FIT_STATS = """
+    SELECT COUNT(*), AVG(e.total_debit)
+    FROM accounting.ledger_journalentry e
+    JOIN accounting.ledger_journalitem i ON e.id = i.entry_id
+    WHERE e.company_uuid = %s AND e.date > NOW() - INTERVAL '30 days' AND i.debit > 0
+"""
+
+FIT_SAMPLE = """
+    SELECT e.total_debit
+    FROM accounting.ledger_journalentry e
+    JOIN accounting.ledger_journalitem i ON e.id = i.entry_id
+    WHERE e.company_uuid = %s AND e.date > NOW() - INTERVAL '30 days' AND i.debit > 0
+    ORDER BY random()
+    LIMIT %s
+"""
+
+# Duplicates are counted over whole entries in the window, so an entry with
+# several debit lines is not reported as a duplicate of itself. Entries
+# scored in an earlier run are re-read when a new entry duplicates them, so
+# both members of a same-day pair get flagged; `is_new` keeps the other
+# detectors to the entries created in this run.
+NEW_ROWS = """
+    WITH new_entries AS (
+        SELECT id, date, total_debit
+        FROM accounting.ledger_journalentry
+        WHERE company_uuid = %(company)s AND date > NOW() - INTERVAL '30 days'
+        AND created_at > %(since)s AND created_at <= %(until)s
+    ),
+    same_day AS (
+        SELECT date, total_debit, COUNT(*) AS duplicates
+        FROM accounting.ledger_journalentry
+        WHERE company_uuid = %(company)s AND date > NOW() - INTERVAL '30 days'
+        AND created_at <= %(until)s
+        GROUP BY date, total_debit
+        HAVING COUNT(*) > 1
+    )
+    SELECT e.id as entry_id, e.date, e.reference, e.total_debit as amount, e.company_uuid,
+           i.description, a.name as account_name, g.group_type, COALESCE(d.duplicates, 0),
+           n.id IS NOT NULL AS is_new
+    FROM accounting.ledger_journalentry e
+    JOIN accounting.ledger_journalitem i ON e.id = i.entry_id
+    JOIN accounting.ledger_chartofaccount a ON i.account_id = a.id
+    JOIN accounting.ledger_accountgroup g ON a.group_id = g.id
+    LEFT JOIN new_entries n ON n.id = e.id
+    LEFT JOIN same_day d ON d.date = e.date AND d.total_debit = e.total_debit
+    WHERE e.company_uuid = %(company)s
+    AND e.date > NOW() - INTERVAL '30 days'
+    AND e.created_at <= %(until)s
+    AND i.debit > 0
+    AND (
+        n.id IS NOT NULL
+        OR (d.duplicates IS NOT NULL AND EXISTS (
+            SELECT 1 FROM new_entries p WHERE p.date = e.date AND p.total_debit = e.total_debit
+        ))
+    )
+"""
+
+# Re-detected findings refresh their details; triage state is left alone
+UPSERT_FIELDS = ['journal_date', 'journal_reference', 'amount', 'category', 'severity', 'risk_score', 'reasoning', 'updated_at']
+
+
+class AnomalyDetector:
+    def __init__(self, max_memory_mb=None, refit=False):
+        max_memory_mb = max_memory_mb or getattr(settings, 'ANOMALY_MAX_MEMORY_MB', 256)
+        budget = int(max_memory_mb) * 1024 * 1024
+        self.chunk_rows = max(500, budget // ROW_BYTES)
+        self.fit_sample = min(getattr(settings, 'ANOMALY_FIT_SAMPLE', 50000), max(MIN_FIT_ROWS, budget // 64))
+        self.model_max_age = timedelta(days=getattr(settings, 'ANOMALY_MODEL_MAX_AGE_DAYS', 7))
+        self.refit = refit
+        self.timings = defaultdict(float)
+
+    def run(self, company_uuid=None):
+        """Returns the number of findings written (new or already known)."""
+        high = timezone.now()
+        found = 0
+        for company in self.pending_companies(high, company_uuid):
+            found += self.process_company(company, high)
+        logger.info(
+            "Anomaly detection timings: " + ", ".join(f"{phase}={secs:.2f}s" for phase, secs in self.timings.items())
+        )
+        return found
+
+    def pending_companies(self, high, company_uuid=None):
+        query = PENDING_COMPANIES.format(state=AnomalyModelState._meta.db_table)
+        params = [high]
+        if company_uuid:
+            query += " AND e.company_uuid = %s"
+            params.append(str(company_uuid))
+        query += " GROUP BY e.company_uuid"
+        with self.phase('discover'), connection.cursor() as cursor:
+            cursor.execute(query, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def process_company(self, company_uuid, high):
+        state, _ = AnomalyModelState.objects.get_or_create(company_uuid=company_uuid)
+        model = self.get_model(state)
+
+        found = 0
+        since = state.scored_until or (high - timedelta(days=WINDOW_DAYS + 1))
+        for chunk in self.stream_rows(company_uuid, since, high):
+            with self.phase('score'):
+                anomalies = self.detect(chunk, model, state.amount_mean)
+            with self.phase('write'):
+                self.save(anomalies)
+            found += len(anomalies)
+
+        state.scored_until = high
+        state.save(update_fields=['scored_until', 'updated_at'])
+        return found
+
+    @staticmethod
+    def save(anomalies):
+        """Upsert findings on (journal_entry_id, anomaly_type)."""
+        FinancialAnomaly.objects.bulk_create(
+            anomalies, batch_size=1000, update_conflicts=True,
+            unique_fields=['journal_entry_id', 'anomaly_type'], update_fields=UPSERT_FIELDS,
+        )
+
+    def get_model(self, state):
+        fresh = state.fitted_at and timezone.now() - state.fitted_at < self.model_max_age
+        if state.model and fresh and not self.refit:
+            return pickle.loads(bytes(state.model))
+
+        with self.phase('fit'):
+            with connection.cursor() as cursor:
+                cursor.execute(FIT_STATS, [str(state.company_uuid)])
+                count, mean = cursor.fetchone()
+                if count < MIN_FIT_ROWS:
+                    return None
+                cursor.execute(FIT_SAMPLE, [str(state.company_uuid), self.fit_sample])
+                X = [[float(row[0])] for row in cursor.fetchall()]
+
+            clf = IsolationForest(contamination=0.03, random_state=42)  # Expect ~3% outliers
+            clf.fit(X)
+
+        state.model = pickle.dumps(clf)
+        state.amount_mean = float(mean or 0)
+        state.trained_rows = len(X)
+        state.fitted_at = timezone.now()
+        state.save()
+        return clf
+
+    def stream_rows(self, company_uuid, since, until):
+        """Yields DataFrames of at most chunk_rows rows from a server-side cursor."""
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(NEW_ROWS, {'company': str(company_uuid), 'since': since, 'until': until})
+            while True:
+                with self.phase('fetch'):
+                    rows = cursor.fetchmany(self.chunk_rows)
+                if not rows:
+                    break
+                chunk = pd.DataFrame.from_records(rows, columns=COLUMNS)
+                chunk['amount'] = chunk['amount'].astype(float)
+                chunk['is_new'] = chunk['is_new'].astype(bool)
+                yield chunk
+
+    def detect(self, df, model, amount_mean):
+        """Findings of all three detectors for one chunk, one per (entry, type)."""
+        anomalies = []
+        fresh = df[df['is_new']]
+
+        # --- DETECTION 1: Statistical Outliers (Isolation Forest) ---
+        if model is not None and not fresh.empty:
+            X = fresh[['amount']].values
+            outliers = fresh.assign(
+                is_outlier=model.predict(X),
+                anomaly_score=-model.decision_function(X),  # Higher score = more anomalous
+            )
+            outliers = outliers[outliers['is_outlier'] == -1].drop_duplicates('entry_id')
+            for row in outliers.itertuples(index=False):
+                anomalies.append(self._anomaly(
+                    row, 'statistical_outlier',
+                    severity='high' if row.amount > amount_mean * 5 else 'medium',
+                    risk_score=min(1.0, row.anomaly_score + 0.5),
+                    reasoning=f"Transaction amount {row.amount} is statistically significant compared to other {row.account_name} entries.",
+                ))
+
+        # --- DETECTION 2: Round Number Flag (Suspicious High Value) ---
+        # Many fraudulent entries use "clean" round numbers like 5000, 10000, etc.
+        round_numbers = fresh[
+            (fresh['amount'] >= 1000) &
+            (fresh['amount'] % 100 == 0) &
+            (fresh['description'].fillna('').str.len() < 10)  # Short descriptions + round numbers are suspicious
+        ].drop_duplicates('entry_id')
+        for row in round_numbers.itertuples(index=False):
+            anomalies.append(self._anomaly(
+                row, 'round_number', severity='low', risk_score=0.3,
+                reasoning=f"High value round number ({row.amount}) with vague description.",
+            ))
+
+        # --- DETECTION 3: Potential Duplicates (includes earlier partners) ---
+        duplicates = df[df['duplicates'] > 1].drop_duplicates('entry_id')
+        for row in duplicates.itertuples(index=False):
+            anomalies.append(self._anomaly(
+                row, 'duplicate_entry', severity='medium', risk_score=0.6,
+                reasoning=f"Detected another transaction with the same amount {row.amount} on the same day.",
+            ))
+
+        return anomalies
+
+    @staticmethod
+    def _anomaly(row, anomaly_type, **fields):
+        return FinancialAnomaly(
+            journal_entry_id=row.entry_id,
+            anomaly_type=anomaly_type,
+            company_uuid=row.company_uuid,
+            journal_date=row.date,
+            journal_reference=row.reference or '',
+            amount=round(row.amount, 2),
+            category=row.account_name,
+            **fields,
+        )
+
+    def phase(self, name):
+        return _Timer(self.timings, name)
+
+
+class _Timer:
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings[self.name] += time.perf_counter() - self.started
+        return False
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from apps.financial_anomalies.detector import AnomalyDetector
+
+
+class Command(BaseCommand):
+    help = 'Score new journal entries for financial anomalies, one company at a time in bounded memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=str, help='Only analyze this company UUID')
+        parser.add_argument('--max-memory', type=int, help='Memory budget in MB for streamed rows and model fitting (default: ANOMALY_MAX_MEMORY_MB)')
+        parser.add_argument('--refit', action='store_true', help='Refit the outlier models even if the cached ones are still fresh')
+
+    def handle(self, *args, **options):
+        detector = AnomalyDetector(max_memory_mb=options.get('max_memory'), refit=options.get('refit'))
+        self.stdout.write(f"Streaming {detector.chunk_rows} rows per chunk, fitting on up to {detector.fit_sample} rows.")
+
+        found = detector.run(options.get('company'))
+
+        for phase, seconds in detector.timings.items():
+            self.stdout.write(f"  {phase:<10} {seconds:8.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"Detected/Updated {found} anomalies."))
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:47
+
+from django.db import migrations, models
+
+
+def drop_duplicate_anomalies(apps, schema_editor):
+    # Keep the earliest finding per (entry, detector) before adding the constraint
+    FinancialAnomaly = apps.get_model('financial_anomalies', 'FinancialAnomaly')
+    seen = set()
+    stale = []
+    for pk, entry_id, anomaly_type in FinancialAnomaly.objects.order_by('created_at').values_list(
+        'id', 'journal_entry_id', 'anomaly_type'
+    ).iterator():
+        if (entry_id, anomaly_type) in seen:
+            stale.append(pk)
+        else:
+            seen.add((entry_id, anomaly_type))
+    FinancialAnomaly.objects.filter(pk__in=stale).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial_anomalies', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnomalyModelState',
+            fields=[
+                ('company_uuid', models.UUIDField(primary_key=True, serialize=False)),
+                ('model', models.BinaryField(blank=True, null=True)),
+                ('amount_mean', models.FloatField(default=0.0)),
+                ('trained_rows', models.IntegerField(default=0)),
+                ('fitted_at', models.DateTimeField(blank=True, null=True)),
+                ('scored_until', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(drop_duplicate_anomalies, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='financialanomaly',
+            constraint=models.UniqueConstraint(fields=('journal_entry_id', 'anomaly_type'), name='uniq_anomaly_entry_type'),
+        ),
+    ]
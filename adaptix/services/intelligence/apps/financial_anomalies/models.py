@@ -46,6 +46,27 @@ class FinancialAnomaly(models.Model):
     class Meta:
         verbose_name_plural = "Financial Anomalies"
         ordering = ['-risk_score', '-created_at']
+        constraints = [
+            # One finding per detector per entry; lets detection runs upsert in bulk
+            models.UniqueConstraint(fields=['journal_entry_id', 'anomaly_type'], name='uniq_anomaly_entry_type'),
+        ]
 
     def __str__(self):
         return f"{self.anomaly_type} - {self.amount} ({self.severity})"
+
+
+class AnomalyModelState(models.Model):
+    """
+    Fitted outlier model and scoring watermark per company, so runs reuse the
+    model and only score journal entries created since the last run.
+    """
+    company_uuid = models.UUIDField(primary_key=True)
+    model = models.BinaryField(null=True, blank=True)  # pickled IsolationForest
+    amount_mean = models.FloatField(default=0.0)
+    trained_rows = models.IntegerField(default=0)
+    fitted_at = models.DateTimeField(null=True, blank=True)
+    scored_until = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Anomaly model {self.company_uuid} (scored until {self.scored_until})"
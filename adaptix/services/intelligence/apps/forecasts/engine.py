@@ -0,0 +1,130 @@
+"""
+Vectorized demand forecasting.
+
+All SalesHistory rows of a shard are loaded in one query and every product's
+linear trend is solved at once with closed-form least squares over grouped
+sums, instead of fitting one scikit-learn model per product.
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+MIN_HISTORY_DAYS = 7
+HORIZON_DAYS = 7
+BULK_BATCH_SIZE = 5000
+
+
+def load_history(company_uuid=None):
+    from .models import SalesHistory
+
+    qs = SalesHistory.objects.all()
+    if company_uuid:
+        qs = qs.filter(company_uuid=company_uuid)
+    rows = qs.order_by('date').values_list('company_uuid', 'product_uuid', 'product_name', 'date', 'quantity_sold')
+    return pd.DataFrame.from_records(
+        list(rows), columns=['company_uuid', 'product_uuid', 'product_name', 'date', 'quantity_sold']
+    )
+
+
+def fit_trends(history):
+    """
+    One row per (company, product) with at least MIN_HISTORY_DAYS of history:
+    start ordinal, slope, intercept, sample count and latest product name.
+    x is days since the product's first sale, y is quantity sold.
+    """
+    if history.empty:
+        return pd.DataFrame(columns=['company_uuid', 'product_uuid', 'product_name', 'start', 'slope', 'intercept', 'n'])
+
+    keys = list(zip(history['company_uuid'], history['product_uuid']))
+    codes, uniques = pd.factorize(pd.Series(keys))
+    groups = len(uniques)
+
+    ordinals = np.fromiter((d.toordinal() for d in history['date']), dtype=np.int64, count=len(history))
+    start = np.full(groups, np.iinfo(np.int64).max)
+    np.minimum.at(start, codes, ordinals)
+
+    x = (ordinals - start[codes]).astype(np.float64)
+    y = history['quantity_sold'].astype(np.float64).to_numpy()
+
+    n = np.bincount(codes, minlength=groups).astype(np.float64)
+    sx = np.bincount(codes, weights=x, minlength=groups)
+    sy = np.bincount(codes, weights=y, minlength=groups)
+    sxx = np.bincount(codes, weights=x * x, minlength=groups)
+    sxy = np.bincount(codes, weights=x * y, minlength=groups)
+
+    denom = n * sxx - sx * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(denom != 0, (n * sxy - sx * sy) / denom, 0.0)
+    intercept = (sy - slope * sx) / np.maximum(n, 1)
+
+    # Rows are ordered by date, so the last name seen is the current one
+    names = history.groupby(codes, sort=True)['product_name'].last().to_numpy()
+
+    trends = pd.DataFrame({
+        'company_uuid': [k[0] for k in uniques],
+        'product_uuid': [k[1] for k in uniques],
+        'product_name': names,
+        'start': start,
+        'slope': slope,
+        'intercept': intercept,
+        'n': n.astype(np.int64),
+    })
+    return trends[trends['n'] >= MIN_HISTORY_DAYS].reset_index(drop=True)
+
+
+def predict(trends, today):
+    """Forecast rows (one per product per day of the horizon) as a DataFrame."""
+    if trends.empty:
+        return pd.DataFrame(columns=['company_uuid', 'product_uuid', 'product_name', 'forecast_date', 'predicted_quantity', 'confidence_score'])
+
+    offsets = np.arange(1, HORIZON_DAYS + 1)
+    target_ordinals = today.toordinal() + offsets
+
+    x = target_ordinals[None, :] - trends['start'].to_numpy()[:, None]
+    predicted = trends['slope'].to_numpy()[:, None] * x + trends['intercept'].to_numpy()[:, None]
+    # Quality control: non-negative predictions
+    predicted = np.round(np.maximum(predicted, 0.0), 2)
+    confidence = np.where(trends['n'].to_numpy() > 14, 0.8, 0.6)
+
+    count = len(trends)
+    return pd.DataFrame({
+        'company_uuid': np.repeat(trends['company_uuid'].to_numpy(), HORIZON_DAYS),
+        'product_uuid': np.repeat(trends['product_uuid'].to_numpy(), HORIZON_DAYS),
+        'product_name': np.repeat(trends['product_name'].to_numpy(), HORIZON_DAYS),
+        'forecast_date': np.tile([today + timedelta(days=int(i)) for i in offsets], count),
+        'predicted_quantity': predicted.reshape(-1),
+        'confidence_score': np.repeat(confidence, HORIZON_DAYS),
+    })
+
+
+def save_forecasts(forecasts):
+    """Upsert forecasts with one INSERT .. ON CONFLICT per batch."""
+    from .models import Forecast
+
+    objs = [
+        Forecast(
+            company_uuid=row.company_uuid,
+            product_uuid=row.product_uuid,
+            product_name=row.product_name,
+            forecast_date=row.forecast_date,
+            predicted_quantity=float(row.predicted_quantity),
+            confidence_score=float(row.confidence_score),
+            algorithm_used='linear_regression',
+        )
+        for row in forecasts.itertuples(index=False)
+    ]
+    Forecast.objects.bulk_create(
+        objs,
+        batch_size=BULK_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['product_uuid', 'forecast_date', 'company_uuid'],
+        update_fields=['product_name', 'predicted_quantity', 'confidence_score', 'algorithm_used'],
+    )
+    return len(objs)
+
+
+def forecast_shard(company_uuid, today):
+    """Full pipeline for one company (or everything when company_uuid is None)."""
+    trends = fit_trends(load_history(company_uuid))
+    return save_forecasts(predict(trends, today))
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forecasts', '0003_forecast_saleshistory_delete_salesforecast_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesSyncCheckpoint',
+            fields=[
+                ('company_uuid', models.UUIDField(primary_key=True, serialize=False)),
+                ('synced_until', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
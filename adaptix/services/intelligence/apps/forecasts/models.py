@@ -50,3 +50,15 @@ class Forecast(SoftDeleteModel):
 
     def __str__(self):
         return f"Forecast {self.product_name} - {self.forecast_date}: {self.predicted_quantity}"
+
+class SalesSyncCheckpoint(models.Model):
+    """
+    High-water mark of the incremental sales-history sync: POS orders
+    updated after synced_until have not been merged into SalesHistory yet.
+    """
+    company_uuid = models.UUIDField(primary_key=True)
+    synced_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Sales sync {self.company_uuid} @ {self.synced_until}"
@@ -1,137 +1,177 @@
 from celery import shared_task
-from django.db import connection
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils import timezone
 from .models import SalesHistory
 from datetime import date, timedelta
 import logging
+import multiprocessing
+import os
 
 logger = logging.getLogger(__name__)
 
+SYNC_BATCH_SIZE = 5000
+
+# Re-aggregates every (company, day) touched by an order or order line since
+# the company's checkpoint. Lines of orders that are no longer completed still
+# produce a (zero) row so earlier totals for that day are corrected.
+INCREMENTAL_TOUCHED = """
+    SELECT DISTINCT o.company_uuid, o.created_at::date AS sale_date
+    FROM pos.sales_order o
+    JOIN pos.sales_orderitem oi ON o.id = oi.order_id
+    LEFT JOIN {checkpoint} c ON c.company_uuid = o.company_uuid
+    WHERE (o.updated_at > COALESCE(c.synced_until, %s) OR oi.updated_at > COALESCE(c.synced_until, %s))
+    AND o.updated_at <= %s
+"""
+
+FULL_TOUCHED = """
+    SELECT DISTINCT o.company_uuid, o.created_at::date AS sale_date
+    FROM pos.sales_order o
+    WHERE o.created_at >= %s
+"""
+
+AGGREGATE = """
+    WITH touched AS ({touched})
+    SELECT
+        oi.product_uuid,
+        MAX(oi.product_name) as product_name,
+        o.company_uuid,
+        o.created_at::date as sale_date,
+        SUM(CASE WHEN o.status = 'completed' AND NOT o.is_deleted AND NOT oi.is_deleted THEN oi.quantity ELSE 0 END) as total_qty,
+        SUM(CASE WHEN o.status = 'completed' AND NOT o.is_deleted AND NOT oi.is_deleted THEN oi.subtotal ELSE 0 END) as total_revenue
+    FROM pos.sales_order o
+    JOIN touched t ON t.company_uuid = o.company_uuid AND t.sale_date = o.created_at::date
+    JOIN pos.sales_orderitem oi ON o.id = oi.order_id
+    WHERE oi.product_uuid IS NOT NULL
+    GROUP BY oi.product_uuid, o.company_uuid, sale_date
+"""
+
+
 @shared_task(name="forecasts.sync_sales_history")
-def sync_sales_history(company_uuid=None):
+def sync_sales_history(company_uuid=None, full=False, days=None):
     """
     Summarizes POS orders into daily SalesHistory.
+
+    Incremental by default: only days touched by orders updated since each
+    company's SalesSyncCheckpoint are re-aggregated. full=True rebuilds every
+    day since `days` ago (all history when days is None).
     """
-    logger.info(f"Syncing sales history. Company: {company_uuid}")
-    
-    # We sync for the last 30 days to ensure any retroactive updates are captured
-    sync_start_date = date.today() - timedelta(days=30)
-    
-    query = """
-        SELECT 
-            oi.product_uuid, 
-            oi.product_name,
-            o.company_uuid,
-            o.created_at::date as sale_date,
-            SUM(oi.quantity) as total_qty,
-            SUM(oi.subtotal) as total_revenue
-        FROM pos.sales_order o
-        JOIN pos.sales_orderitem oi ON o.id = oi.order_id
-        WHERE o.status = 'completed' 
-        AND o.created_at >= %s
-    """
-    params = [sync_start_date]
-    
+    logger.info(f"Syncing sales history. Company: {company_uuid} Full: {full}")
+
+    from .models import SalesSyncCheckpoint
+
+    now = timezone.now()
+    # Leave room for transactions that stamped updated_at but have not committed yet
+    high = now - timedelta(seconds=getattr(settings, 'SALES_SYNC_LAG_SECONDS', 60))
+
+    if full:
+        start = date.today() - timedelta(days=days) if days else date.min
+        touched = FULL_TOUCHED
+        params = [start]
+    else:
+        # Companies without a checkpoint start from the old 30-day window
+        initial = now - timedelta(days=getattr(settings, 'SALES_SYNC_INITIAL_DAYS', 30))
+        touched = INCREMENTAL_TOUCHED.format(checkpoint=SalesSyncCheckpoint._meta.db_table)
+        params = [initial, initial, high]
+
     if company_uuid:
-        query += " AND o.company_uuid = %s"
+        touched += " AND o.company_uuid = %s"
         params.append(str(company_uuid))
-        
-    query += " GROUP BY oi.product_uuid, oi.product_name, o.company_uuid, sale_date"
-    
+
     try:
         with connection.cursor() as cursor:
-            cursor.execute(query, params)
+            cursor.execute(AGGREGATE.format(touched=touched), params)
             rows = cursor.fetchall()
-            
-            for row in rows:
-                prod_id, prod_name, comp_id, sale_date, qty, revenue = row
-                
-                SalesHistory.objects.update_or_create(
-                    product_uuid=prod_id,
-                    date=sale_date,
-                    company_uuid=comp_id,
-                    defaults={
-                        'product_name': prod_name,
-                        'quantity_sold': qty,
-                        'revenue': revenue
-                    }
-                )
-        
+
+        rows = _drop_new_zero_rows(rows)
+        companies = {row[2] for row in rows}
+
+        with transaction.atomic():
+            SalesHistory.objects.bulk_create(
+                [
+                    SalesHistory(
+                        product_uuid=prod_id,
+                        product_name=prod_name,
+                        company_uuid=comp_id,
+                        date=sale_date,
+                        quantity_sold=qty,
+                        revenue=revenue,
+                    )
+                    for prod_id, prod_name, comp_id, sale_date, qty, revenue in rows
+                ],
+                batch_size=SYNC_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['product_uuid', 'date', 'company_uuid'],
+                update_fields=['product_name', 'quantity_sold', 'revenue'],
+            )
+            _advance_checkpoints(company_uuid, companies, high)
+
+        if companies:
+            # Roll the precomputed trend windows forward for the companies that changed
+            from apps.sales_trends.tasks import refresh_sales_trends
+            transaction.on_commit(lambda: refresh_sales_trends.delay(sorted(str(c) for c in companies)))
+
         logger.info(f"Successfully synced {len(rows)} sales history records.")
         return f"Synced {len(rows)} records"
     except Exception as e:
         logger.error(f"Sync failed: {str(e)}")
         return f"Error: {str(e)}"
+
+
+def _drop_new_zero_rows(rows):
+    """Zero rows only matter when they correct an existing SalesHistory row."""
+    zero = [row for row in rows if not row[4]]
+    if not zero:
+        return rows
+
+    existing = set(
+        (str(p), str(c), d) for p, c, d in SalesHistory.objects.filter(
+            product_uuid__in={row[0] for row in zero},
+            company_uuid__in={row[2] for row in zero},
+            date__in={row[3] for row in zero},
+        ).values_list('product_uuid', 'company_uuid', 'date')
+    )
+    return [row for row in rows if row[4] or (str(row[0]), str(row[2]), row[3]) in existing]
+
+
+def _advance_checkpoints(company_uuid, companies, high):
+    from .models import SalesSyncCheckpoint
+
+    checkpoints = SalesSyncCheckpoint.objects.all()
+    if company_uuid:
+        checkpoints = checkpoints.filter(company_uuid=company_uuid)
+        companies = companies | {company_uuid}
+    checkpoints.update(synced_until=high)
+
+    SalesSyncCheckpoint.objects.bulk_create(
+        [SalesSyncCheckpoint(company_uuid=c, synced_until=high) for c in companies],
+        batch_size=SYNC_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
 @shared_task(name="forecasts.run_forecasts")
-def run_forecasts(company_uuid=None):
+def run_forecasts(company_uuid=None, workers=None):
     """
     Generates 7-day predictions for all products with history.
+
+    History is loaded in one query per shard and every product's trend is
+    solved at once (see engine.py). With workers > 1 and no company_uuid the
+    run is sharded by company across a process pool.
     """
     logger.info(f"Running forecasts. Company: {company_uuid}")
-    
-    from .models import Forecast
-    
-    products_to_forecast = SalesHistory.objects.values('product_uuid', 'company_uuid', 'product_name').distinct()
-    if company_uuid:
-        products_to_forecast = products_to_forecast.filter(company_uuid=company_uuid)
-        
-    forecast_count = 0
+
+    from . import engine
+
     today = date.today()
-    
-    for p in products_to_forecast:
-        prod_id = p['product_uuid']
-        comp_id = p['company_uuid']
-        name = p['product_name']
-        
-        # Advanced Forecasting: Linear Regression
-        # We take available history to train a trend model
-        history_data = SalesHistory.objects.filter(
-            product_uuid=prod_id, 
-            company_uuid=comp_id
-        ).order_by('date')
-        
-        if history_data.count() < 7:
-            continue # Need at least a week of data for a reliable trend
-            
-        import numpy as np
-        from sklearn.linear_model import LinearRegression
-        
-        # Prepare data for Scikit-learn
-        # X is days since the first sale in history, y is quantity
-        start_date = history_data.first().date
-        X = np.array([(item.date - start_date).days for item in history_data]).reshape(-1, 1)
-        y = np.array([float(item.quantity_sold) for item in history_data])
-        
-        # Train model
-        model = LinearRegression()
-        model.fit(X, y)
-        
-        # Calculate daily trend (slope)
-        slope = model.coeff_[0] if hasattr(model, 'coef_') else 0
-        
-        # Generate 7 days of forecast
-        for i in range(1, 8):
-            target_date = today + timedelta(days=i)
-            days_since_start = (target_date - start_date).days
-            
-            # Prediction = model prediction
-            predicted_qty = model.predict([[days_since_start]])[0]
-            
-            # Quality control: non-negative predictions, cap if crazy high
-            predicted_qty = max(0, predicted_qty)
-            
-            Forecast.objects.update_or_create(
-                product_uuid=prod_id,
-                forecast_date=target_date,
-                company_uuid=comp_id,
-                defaults={
-                    'product_name': name,
-                    'predicted_quantity': round(float(predicted_qty), 2),
-                    'confidence_score': 0.8 if history_data.count() > 14 else 0.6,
-                    'algorithm_used': 'linear_regression'
-                }
-            )
-            forecast_count += 1
-            
+    workers = int(workers if workers is not None else os.getenv('FORECAST_WORKERS', 1))
+
+    if company_uuid or workers <= 1:
+        forecast_count = engine.forecast_shard(company_uuid, today)
+    else:
+        forecast_count = _run_sharded(workers, today)
+
     from .utils import publish_event
     publish_event(
         event_name="forecast.completed",
@@ -140,3 +180,27 @@ def run_forecasts(company_uuid=None):
     )
 
     return f"Generated {forecast_count} forecasts"
+
+
+def _forecast_company(company_uuid, today):
+    from . import engine
+    return engine.forecast_shard(company_uuid, today)
+
+
+def _run_sharded(workers, today):
+    companies = [
+        str(c) for c in SalesHistory.objects.values_list('company_uuid', flat=True).distinct()
+    ]
+
+    if multiprocessing.current_process().daemon:
+        # Celery prefork children cannot start their own pool; fan out as tasks
+        for company in companies:
+            run_forecasts.delay(company_uuid=company)
+        logger.info(f"Queued forecasts for {len(companies)} companies.")
+        return 0
+
+    # Forked children must not share the parent's database connection
+    connections.close_all()
+    ctx = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        return sum(pool.map(_forecast_company, companies, [today] * len(companies)))
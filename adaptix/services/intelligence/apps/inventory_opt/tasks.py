@@ -1,22 +1,22 @@
+import numpy as np
 import pandas as pd
 from celery import shared_task
-from django.db import connection
+from django.db import connection, transaction
+from django.utils import timezone
 from apps.inventory_opt.models import InventoryOptimization
 from apps.forecasts.models import Forecast
-from datetime import date, timedelta
+from datetime import date
 import logging
 from adaptix_core.messaging import publish_event
 
 logger = logging.getLogger(__name__)
 
-@shared_task(name="inventory_opt.analyze_stockout_risk")
-def analyze_stockout_risk(company_uuid=None):
-    """
-    Combines SalesForecast with current Stock levels to detect risks.
-    """
-    logger.info(f"Starting stockout risk analysis. Company: {company_uuid}")
-    
-    # 1. Fetch current stock from inventory schema
+KEYS = ['company_uuid', 'product_uuid']
+BULK_BATCH_SIZE = 5000
+NO_STOCKOUT_DAYS = 999
+
+
+def load_stock(company_uuid=None):
     query = """
         SELECT company_uuid, product_uuid, SUM(quantity) as current_stock
         FROM inventory.stocks_stock
@@ -28,87 +28,148 @@ def analyze_stockout_risk(company_uuid=None):
     else:
         query += " GROUP BY company_uuid, product_uuid"
         stock_df = pd.read_sql(query, connection)
+    stock_df = stock_df.dropna(subset=KEYS)
+    for key in KEYS:
+        stock_df[key] = stock_df[key].astype(str)
+    return stock_df
+
+
+def load_forecasts(today, company_uuid=None):
+    """All future forecasts in one query, ordered for per-product cumulative sums."""
+    qs = Forecast.objects.filter(forecast_date__gte=today)
+    if company_uuid:
+        qs = qs.filter(company_uuid=company_uuid)
+    rows = qs.order_by('company_uuid', 'product_uuid', 'forecast_date').values_list(
+        'company_uuid', 'product_uuid', 'forecast_date', 'predicted_quantity'
+    )
+    df = pd.DataFrame.from_records(list(rows), columns=KEYS + ['forecast_date', 'predicted_quantity'])
+    for key in KEYS:
+        df[key] = df[key].astype(str)
+    df['predicted_quantity'] = df['predicted_quantity'].astype(float)
+    return df
+
+
+def compute_risk(stock_df, forecast_df, today):
+    """
+    One row per stocked product with forecasts: current stock, total forecast
+    demand, estimated stockout date (first day cumulative demand covers the
+    stock) and a 0-100 risk score.
+    """
+    df = forecast_df.merge(stock_df, on=KEYS, how='inner')
+    if df.empty:
+        return pd.DataFrame(columns=KEYS + ['current_stock', 'total_demand', 'stockout_date', 'risk_score'])
+
+    df['current_stock'] = df['current_stock'].astype(float)
+    df['cumulative_demand'] = df.groupby(KEYS, sort=False)['predicted_quantity'].cumsum()
+
+    # Rows are sorted by date within each product, so the first depleted row is the stockout day
+    depleted = df[df['current_stock'] - df['cumulative_demand'] <= 0].drop_duplicates(KEYS)
+
+    result = df.groupby(KEYS, sort=False).agg(
+        current_stock=('current_stock', 'first'),
+        total_demand=('predicted_quantity', 'sum'),
+    ).reset_index()
+    # Keep the old behaviour: demand is only summed up to the stockout day
+    result = result.merge(
+        depleted[KEYS + ['forecast_date', 'cumulative_demand']].rename(columns={'forecast_date': 'stockout_date'}),
+        on=KEYS, how='left',
+    )
+    result['total_demand'] = result['cumulative_demand'].fillna(result['total_demand'])
+
+    stockout = pd.to_datetime(result['stockout_date'])
+    days_until = (stockout - pd.Timestamp(today)).dt.days.fillna(NO_STOCKOUT_DAYS).to_numpy()
+    result['risk_score'] = np.select(
+        [days_until <= 3, days_until <= 7, days_until <= 14], [100, 75, 40], default=10
+    )
+    result['stockout_date'] = result['stockout_date'].astype(object).where(result['stockout_date'].notna(), None)
+    return result.drop(columns=['cumulative_demand'])
 
+
+def save_risk(result):
+    """Upsert company-level (branch-less) rows: one lookup, then bulk update + bulk create."""
+    existing = {
+        (str(c), str(p)): pk for pk, c, p in InventoryOptimization.objects.filter(
+            company_uuid__in=result['company_uuid'].unique().tolist(),
+            product_uuid__in=result['product_uuid'].unique().tolist(),
+            branch_id__isnull=True,
+        ).values_list('id', 'company_uuid', 'product_uuid')
+    }
+
+    # bulk_update bypasses auto_now, so stamp last_updated explicitly
+    now = timezone.now()
+    to_update, to_create = [], []
+    for row in result.itertuples(index=False):
+        daily = row.total_demand / 30  # Approx
+        obj = InventoryOptimization(
+            id=existing.get((row.company_uuid, row.product_uuid)),
+            company_uuid=row.company_uuid,
+            product_uuid=row.product_uuid,
+            current_stock=int(row.current_stock),
+            avg_daily_consumption=daily,
+            suggested_reorder_point=int(daily * 10),  # 10 days safety
+            suggested_reorder_qty=int(daily * 30),  # 30 days stock
+            stockout_risk_score=int(row.risk_score),
+            estimated_stockout_date=row.stockout_date,
+            last_updated=now,
+        )
+        (to_update if obj.id else to_create).append(obj)
+
+    with transaction.atomic():
+        InventoryOptimization.objects.bulk_update(
+            to_update,
+            ['current_stock', 'avg_daily_consumption', 'suggested_reorder_point', 'suggested_reorder_qty',
+             'stockout_risk_score', 'estimated_stockout_date', 'last_updated'],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        InventoryOptimization.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+
+
+def publish_alerts(result):
+    """One procurement event per company carrying all of its critical products."""
+    critical = result[result['risk_score'] >= 75]
+    for comp_id, group in critical.groupby('company_uuid', sort=False):
+        items = []
+        for row in group.itertuples(index=False):
+            items.append({
+                "product_uuid": row.product_uuid,
+                "suggested_qty": int(row.total_demand / 30 * 30) if row.total_demand > 0 else 50,
+                "estimated_out_of_stock_date": str(row.stockout_date) if row.stockout_date else None,
+                "confidence_score": float(0.9 if row.risk_score == 100 else 0.75),
+                "reasoning": f"Estimated stockout on {row.stockout_date}. Current stock ({row.current_stock}) depleted by velocity."
+            })
+        event_payload = {
+            "event": "intelligence.inventory.low_stock_predicted.batch",
+            "company_uuid": comp_id,
+            "items": items,
+        }
+        try:
+            publish_event("events", "intelligence.inventory.low_stock_predicted.batch", event_payload)
+        except Exception as e:
+            logger.error(f"Failed to publish procurement alerts for {comp_id}: {e}")
+
+
+@shared_task(name="inventory_opt.analyze_stockout_risk")
+def analyze_stockout_risk(company_uuid=None):
+    """
+    Combines SalesForecast with current Stock levels to detect risks.
+    """
+    logger.info(f"Starting stockout risk analysis. Company: {company_uuid}")
+
+    # 1. Fetch current stock from inventory schema
+    stock_df = load_stock(company_uuid)
     if stock_df.empty:
         logger.warning("No stock data found for risk analysis.")
         return "No stock data"
 
-    # 2. Iterate through each company/product to calculate risk
-    processed_count = 0
+    # 2. Project cumulative demand against stock for every product at once
     today = date.today()
-    
-    for _, row in stock_df.iterrows():
-        comp_id = row['company_uuid']
-        prod_id = row['product_uuid']
-        qty = float(row['current_stock'])
-        
-        # Get future forecasts for this product
-        forecasts = Forecast.objects.filter(
-            company_uuid=comp_id,
-            product_uuid=prod_id,
-            forecast_date__gte=today
-        ).order_by('forecast_date')
-        
-        if not forecasts.exists():
-            continue
-            
-        # Cumulative demand vs current stock
-        cumulative_demand = 0
-        stockout_date = None
-        risk_score = 0
-        
-        # Simple projection: when does qty - cumulative_demand < 0?
-        for f in forecasts:
-            cumulative_demand += float(f.predicted_quantity)
-            if qty - cumulative_demand <= 0:
-                stockout_date = f.forecast_date
-                break
-        
-        # Calculate risk score (0-100)
-        # High risk if stockout in < 7 days
-        days_until_stockout = (stockout_date - today).days if stockout_date else 999
-        
-        if days_until_stockout <= 3:
-            risk_score = 100
-        elif days_until_stockout <= 7:
-            risk_score = 75
-        elif days_until_stockout <= 14:
-            risk_score = 40
-        else:
-            risk_score = 10
-            
-        # Update/Create InventoryOptimization record
-        InventoryOptimization.objects.update_or_create(
-            company_uuid=comp_id,
-            product_uuid=prod_id,
-            defaults={
-                'current_stock': int(qty),
-                'avg_daily_consumption': cumulative_demand / 30, # Approx
-                'suggested_reorder_point': int(cumulative_demand / 30 * 10), # 10 days safety
-                'suggested_reorder_qty': int(cumulative_demand / 30 * 30), # 30 days stock
-                'stockout_risk_score': risk_score,
-                'estimated_stockout_date': stockout_date
-            }
-        )
+    result = compute_risk(stock_df, load_forecasts(today, company_uuid), today)
+    if not result.empty:
+        save_risk(result)
+
+        # 3. Broadcast procurement suggestions for critical risks
+        publish_alerts(result)
 
-        # 3. Broadcast procurement suggestion if risk is critical
-        if risk_score >= 75:
-            suggested_qty = int(cumulative_demand / 30 * 30) if cumulative_demand > 0 else 50
-            event_payload = {
-                "event": "intelligence.inventory.low_stock_predicted",
-                "product_uuid": str(prod_id),
-                "suggested_qty": suggested_qty,
-                "company_uuid": str(comp_id),
-                "estimated_out_of_stock_date": str(stockout_date) if stockout_date else None,
-                "confidence_score": float(0.9 if risk_score == 100 else 0.75),
-                "reasoning": f"Estimated stockout on {stockout_date}. Current stock ({qty}) depleted by velocity."
-            }
-            try:
-                publish_event("events", "intelligence.inventory.low_stock_predicted", event_payload)
-            except Exception as e:
-                logger.error(f"Failed to publish procurement alert: {e}")
-
-        processed_count += 1
-        
+    processed_count = len(result)
     logger.info(f"Finished risk analysis. Processed {processed_count} products.")
     return f"Processed {processed_count} items"
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesTrendSummary',
+            fields=[
+                ('company_uuid', models.UUIDField(primary_key=True, serialize=False)),
+                ('revenue_7d', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('revenue_30d', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('revenue_prev_30d', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('revenue_90d', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('growth_rate', models.FloatField(default=0.0)),
+                ('sparkline', models.JSONField(blank=True, default=list)),
+                ('top_movers', models.JSONField(blank=True, default=list)),
+                ('as_of', models.DateField()),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductTrend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_uuid', models.UUIDField(db_index=True)),
+                ('product_uuid', models.UUIDField()),
+                ('product_name', models.CharField(max_length=255)),
+                ('sales_7d', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('sales_30d', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('sales_prev_30d', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('sales_90d', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('change', models.FloatField(default=0.0)),
+                ('as_of', models.DateField()),
+            ],
+            options={
+                'unique_together': {('company_uuid', 'product_uuid')},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import models
+
+
+class ProductTrend(models.Model):
+    """
+    Rolling-window sales per product, refreshed from SalesHistory whenever
+    new sales are synced for the company.
+    """
+    company_uuid = models.UUIDField(db_index=True)
+    product_uuid = models.UUIDField()
+    product_name = models.CharField(max_length=255)
+
+    sales_7d = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+    sales_30d = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+    sales_prev_30d = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+    sales_90d = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+    change = models.FloatField(default=0.0)  # % change of the last 30 days vs the 30 before
+
+    as_of = models.DateField()
+
+    class Meta:
+        unique_together = ('company_uuid', 'product_uuid')
+
+    def __str__(self):
+        return f"{self.product_name}: {self.change:+.1f}%"
+
+
+class SalesTrendSummary(models.Model):
+    """Precomputed payload of the sales trend widget for one company."""
+    company_uuid = models.UUIDField(primary_key=True)
+
+    revenue_7d = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    revenue_30d = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    revenue_prev_30d = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    revenue_90d = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    growth_rate = models.FloatField(default=0.0)
+
+    sparkline = models.JSONField(default=list, blank=True)  # [{"date": "Mon", "sales": 120}, ...]
+    top_movers = models.JSONField(default=list, blank=True)
+
+    as_of = models.DateField()
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Sales trend {self.company_uuid} @ {self.as_of}"
@@ -0,0 +1,188 @@
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+
+from apps.forecasts.models import SalesHistory
+from .models import ProductTrend, SalesTrendSummary
+
+ZERO = Decimal('0')
+TOP_MOVERS = 3
+BULK_BATCH_SIZE = 2000
+
+# company_uuid -> (expires_at, payload). Per process; the TTL bounds how long
+# another worker's refresh takes to show up here.
+_payloads = {}
+_payloads_lock = threading.Lock()
+
+
+def _windows(today):
+    """Date filters of the rolling windows, all ending today (inclusive)."""
+    return {
+        '7d': Q(date__gt=today - timedelta(days=7)),
+        '30d': Q(date__gt=today - timedelta(days=30)),
+        'prev_30d': Q(date__gt=today - timedelta(days=60), date__lte=today - timedelta(days=30)),
+        '90d': Q(date__gt=today - timedelta(days=90)),
+    }
+
+
+def _pct_change(current, previous):
+    if previous > 0:
+        return float((current - previous) / previous * 100)
+    return 100.0 if current > 0 else 0.0
+
+
+@transaction.atomic
+def refresh_trends(company_uuids=None, today=None):
+    """
+    Recompute the rolling windows of the given companies (every company with
+    recent sales or an existing summary when None) from SalesHistory with
+    two grouped queries, and upsert ProductTrend / SalesTrendSummary.
+    Returns the number of companies refreshed.
+    """
+    today = today or date.today()
+    windows = _windows(today)
+
+    history = SalesHistory.objects.filter(date__gt=today - timedelta(days=90), date__lte=today)
+    if company_uuids is None:
+        companies = set(map(str, history.values_list('company_uuid', flat=True).distinct()))
+        companies |= set(map(str, SalesTrendSummary.objects.values_list('company_uuid', flat=True)))
+    else:
+        companies = {str(c) for c in company_uuids if c}
+    if not companies:
+        return 0
+    history = history.filter(company_uuid__in=companies)
+
+    per_product = history.values('company_uuid', 'product_uuid').annotate(
+        name=Max('product_name'),
+        **{f'qty_{key}': Sum('quantity_sold', filter=window) for key, window in windows.items()},
+        **{f'rev_{key}': Sum('revenue', filter=window) for key, window in windows.items()},
+    )
+    daily = history.filter(windows['7d']).values('company_uuid', 'date').annotate(total=Sum('revenue'))
+
+    products = []
+    totals = {c: {key: ZERO for key in windows} for c in companies}
+    for row in per_product:
+        company = str(row['company_uuid'])
+        for key in windows:
+            totals[company][key] += row[f'rev_{key}'] or ZERO
+        products.append(ProductTrend(
+            company_uuid=row['company_uuid'],
+            product_uuid=row['product_uuid'],
+            product_name=row['name'],
+            sales_7d=row['qty_7d'] or ZERO,
+            sales_30d=row['qty_30d'] or ZERO,
+            sales_prev_30d=row['qty_prev_30d'] or ZERO,
+            sales_90d=row['qty_90d'] or ZERO,
+            change=round(_pct_change(row['qty_30d'] or ZERO, row['qty_prev_30d'] or ZERO), 1),
+            as_of=today,
+        ))
+
+    daily_totals = {(str(row['company_uuid']), row['date']): row['total'] or ZERO for row in daily}
+    last_7_days = [today - timedelta(days=offset) for offset in range(6, -1, -1)]
+
+    movers = {}
+    for trend in sorted(products, key=lambda p: p.change, reverse=True):
+        company_movers = movers.setdefault(str(trend.company_uuid), [])
+        if len(company_movers) < TOP_MOVERS:
+            company_movers.append({
+                'name': trend.product_name,
+                'change': trend.change,
+                'trend': 'up' if trend.change > 0 else 'down',
+            })
+
+    summaries = []
+    for company in companies:
+        window_totals = totals[company]
+        summaries.append(SalesTrendSummary(
+            company_uuid=company,
+            revenue_7d=window_totals['7d'],
+            revenue_30d=window_totals['30d'],
+            revenue_prev_30d=window_totals['prev_30d'],
+            revenue_90d=window_totals['90d'],
+            growth_rate=round(_pct_change(window_totals['30d'], window_totals['prev_30d']), 1)
+            if window_totals['prev_30d'] > 0 else 0.0,
+            sparkline=[
+                {'date': day.strftime('%a'), 'sales': int(daily_totals.get((company, day), ZERO))}
+                for day in last_7_days
+            ],
+            top_movers=movers.get(company, []),
+            as_of=today,
+        ))
+
+    ProductTrend.objects.bulk_create(
+        products,
+        batch_size=BULK_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['company_uuid', 'product_uuid'],
+        update_fields=['product_name', 'sales_7d', 'sales_30d', 'sales_prev_30d', 'sales_90d', 'change', 'as_of'],
+    )
+    # Products without sales in the last 90 days drop out of the table
+    ProductTrend.objects.filter(company_uuid__in=companies).exclude(as_of=today).delete()
+    SalesTrendSummary.objects.bulk_create(
+        summaries,
+        batch_size=BULK_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['company_uuid'],
+        update_fields=['revenue_7d', 'revenue_30d', 'revenue_prev_30d', 'revenue_90d', 'growth_rate',
+                       'sparkline', 'top_movers', 'as_of', 'refreshed_at'],
+    )
+
+    transaction.on_commit(lambda: invalidate_payloads(companies))
+    return len(companies)
+
+
+def build_payload(summary):
+    if summary is None:
+        return {
+            "status": "success",
+            "summary": {"total_sales_30d": 0, "growth_rate": 0, "trend_direction": "down"},
+            "sparkline": [],
+            "top_movers": [],
+            "as_of": None,
+        }
+    return {
+        "status": "success",
+        "summary": {
+            "total_sales_30d": int(summary.revenue_30d),
+            "growth_rate": summary.growth_rate,
+            "trend_direction": "up" if summary.growth_rate > 0 else "down",
+        },
+        "sparkline": summary.sparkline,
+        "top_movers": summary.top_movers,
+        "as_of": str(summary.as_of),
+    }
+
+
+def get_trend_payload(company_uuid):
+    """
+    Widget payload for a company, served from the in-process cache or a
+    single primary-key lookup. Returns (payload, stale) where stale means the
+    precomputed windows end before today.
+    """
+    key = str(company_uuid)
+    now = time.monotonic()
+    with _payloads_lock:
+        entry = _payloads.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1], False
+
+    summary = SalesTrendSummary.objects.filter(company_uuid=key).first()
+    payload = build_payload(summary)
+    stale = summary is None or summary.as_of < date.today()
+
+    with _payloads_lock:
+        _payloads[key] = (now + getattr(settings, 'SALES_TREND_CACHE_TTL', 30), payload)
+        while len(_payloads) > getattr(settings, 'SALES_TREND_CACHE_SIZE', 4096):
+            _payloads.pop(next(iter(_payloads)))
+    return payload, stale
+
+
+def invalidate_payloads(company_uuids):
+    with _payloads_lock:
+        for company in company_uuids:
+            _payloads.pop(str(company), None)
@@ -0,0 +1,16 @@
+from celery import shared_task
+from .services import refresh_trends
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task(name="sales_trends.refresh_trends")
+def refresh_sales_trends(company_uuids=None):
+    """
+    Rebuilds the rolling sales-trend windows. Queued by the sales-history sync
+    for the companies it touched; run with no arguments to roll every
+    company's windows over to a new day.
+    """
+    count = refresh_trends(company_uuids)
+    logger.info(f"Refreshed sales trends for {count} companies.")
+    return f"Refreshed {count} companies"
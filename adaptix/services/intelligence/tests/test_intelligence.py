@@ -64,3 +64,401 @@ class TestIntelligenceLogic:
         results_fail = RuleEngine.evaluate("stock_level", context_no_match)
         
         assert len(results_fail) == 0
+
+
+@pytest.mark.django_db
+class TestVectorizedForecasts:
+    def test_run_forecasts_fits_trend_and_upserts(self, mocker):
+        """Closed-form trends match a perfect line and re-runs update in place"""
+        from datetime import date, timedelta
+        from apps.forecasts.tasks import run_forecasts
+
+        mocker.patch('apps.forecasts.utils.publish_event')
+        company = uuid.uuid4()
+        trending, sparse = uuid.uuid4(), uuid.uuid4()
+        today = date.today()
+        start = today - timedelta(days=10)
+
+        for i in range(10):
+            SalesHistory.objects.create(
+                product_uuid=trending, product_name="Trending", company_uuid=company,
+                date=start + timedelta(days=i), quantity_sold=2 * i + 1, revenue=0,
+            )
+        for i in range(3):
+            SalesHistory.objects.create(
+                product_uuid=sparse, product_name="Sparse", company_uuid=company,
+                date=start + timedelta(days=i), quantity_sold=5, revenue=0,
+            )
+
+        run_forecasts(company_uuid=str(company))
+        run_forecasts(company_uuid=str(company))
+
+        forecasts = Forecast.objects.filter(company_uuid=company).order_by('forecast_date')
+        assert forecasts.count() == 7
+        assert not forecasts.filter(product_uuid=sparse).exists()
+        first = forecasts.first()
+        # y = 2x + 1 with x = days since the first sale (10 days before today)
+        assert first.forecast_date == today + timedelta(days=1)
+        assert first.predicted_quantity == pytest.approx(23.0)
+        assert first.confidence_score == 0.6
+
+
+@pytest.mark.django_db
+class TestIncrementalSalesSync:
+    def test_sync_merges_touched_days_and_advances_checkpoint(self, mocker):
+        """Aggregated rows are upserted, new zero rows skipped, checkpoint recorded"""
+        from datetime import date
+        from decimal import Decimal
+        from apps.forecasts import tasks
+        from apps.forecasts.models import SalesSyncCheckpoint
+
+        company, sold, cancelled, draft = uuid.uuid4(), uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        day = date(2026, 1, 5)
+        SalesHistory.objects.create(
+            product_uuid=cancelled, product_name="Cancelled", company_uuid=company,
+            date=day, quantity_sold=4, revenue=40,
+        )
+
+        cursor = mocker.MagicMock()
+        cursor.fetchall.return_value = [
+            (sold, "Sold", company, day, Decimal('3'), Decimal('30')),
+            (cancelled, "Cancelled", company, day, Decimal('0'), Decimal('0')),
+            (draft, "Draft", company, day, Decimal('0'), Decimal('0')),
+        ]
+        connection = mocker.patch('apps.forecasts.tasks.connection')
+        connection.cursor.return_value.__enter__.return_value = cursor
+
+        assert tasks.sync_sales_history(company_uuid=str(company)) == "Synced 2 records"
+
+        sql, params = cursor.execute.call_args[0]
+        assert SalesSyncCheckpoint._meta.db_table in sql
+        assert params[-1] == str(company)
+        assert SalesHistory.objects.get(product_uuid=sold).quantity_sold == 3
+        assert SalesHistory.objects.get(product_uuid=cancelled).quantity_sold == 0
+        assert not SalesHistory.objects.filter(product_uuid=draft).exists()
+        assert SalesSyncCheckpoint.objects.filter(company_uuid=company).exists()
+
+
+@pytest.mark.django_db
+class TestStockoutRisk:
+    def test_analyze_stockout_risk_bulk_upsert_and_batched_alert(self, mocker):
+        """Risk is computed for all products at once with one alert per company"""
+        import pandas as pd
+        from datetime import date, timedelta
+        from apps.inventory_opt import tasks
+
+        company, low, plenty = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        today = date.today()
+        for product in (low, plenty):
+            for i in range(7):
+                Forecast.objects.create(
+                    product_uuid=product, product_name="P", company_uuid=company,
+                    forecast_date=today + timedelta(days=i), predicted_quantity=5,
+                )
+        stale = InventoryOptimization.objects.create(
+            company_uuid=company, product_uuid=low, current_stock=0,
+            avg_daily_consumption=0, suggested_reorder_point=0, suggested_reorder_qty=0,
+        )
+        mocker.patch.object(tasks, 'load_stock', return_value=pd.DataFrame({
+            'company_uuid': [str(company), str(company)],
+            'product_uuid': [str(low), str(plenty)],
+            'current_stock': [10, 1000],
+        }))
+        publish = mocker.patch.object(tasks, 'publish_event')
+
+        assert tasks.analyze_stockout_risk(company_uuid=str(company)) == "Processed 2 items"
+
+        risky = InventoryOptimization.objects.get(product_uuid=low)
+        assert risky.current_stock == 10
+        assert risky.stockout_risk_score == 100
+        assert risky.estimated_stockout_date == today + timedelta(days=1)
+        assert risky.last_updated > stale.last_updated
+        assert InventoryOptimization.objects.get(product_uuid=plenty).stockout_risk_score == 10
+
+        publish.assert_called_once()
+        payload = publish.call_args[0][2]
+        assert payload['company_uuid'] == str(company)
+        assert [item['product_uuid'] for item in payload['items']] == [str(low)]
+
+
+@pytest.mark.django_db
+class TestFinancialAnomalyDetector:
+    def test_detect_merges_detectors_and_reuses_cached_model(self, mocker):
+        """Findings of all detectors upsert once per entry; fresh models are not refitted"""
+        import pickle
+        import pandas as pd
+        from datetime import date
+        from django.utils import timezone
+        from sklearn.ensemble import IsolationForest
+        from apps.financial_anomalies.detector import AnomalyDetector, COLUMNS
+        from apps.financial_anomalies.models import AnomalyModelState, FinancialAnomaly
+
+        company = uuid.uuid4()
+        clf = IsolationForest(contamination=0.03, random_state=42).fit([[float(a)] for a in range(90, 130)])
+        state = AnomalyModelState.objects.create(
+            company_uuid=company, model=pickle.dumps(clf), amount_mean=100.0, fitted_at=timezone.now(),
+        )
+        connection = mocker.patch('apps.financial_anomalies.detector.connection')
+
+        detector = AnomalyDetector(max_memory_mb=1)
+        model = detector.get_model(state)
+        connection.cursor.assert_not_called()
+
+        big, normal = uuid.uuid4(), uuid.uuid4()
+        chunk = pd.DataFrame.from_records([
+            (big, date(2026, 1, 5), 'INV-1', 50000.0, company, 'x', 'Cash', 'asset', 2, True),
+            (big, date(2026, 1, 5), 'INV-1', 50000.0, company, 'x', 'Bank', 'asset', 2, True),
+            (normal, date(2026, 1, 6), 'INV-2', 101.5, company, 'Office supplies', 'Cash', 'asset', 0, True),
+        ], columns=COLUMNS)
+
+        for _ in range(2):
+            AnomalyDetector.save(detector.detect(chunk, model, state.amount_mean))
+
+        found = FinancialAnomaly.objects.filter(company_uuid=company)
+        assert sorted(found.values_list('anomaly_type', flat=True)) == ['duplicate_entry', 'round_number', 'statistical_outlier']
+        assert set(found.values_list('journal_entry_id', flat=True)) == {big}
+        assert found.get(anomaly_type='statistical_outlier').severity == 'high'
+
+    def test_duplicate_pair_flags_earlier_entry_and_upserts(self):
+        """An entry scored in an earlier run is flagged once a later duplicate arrives"""
+        import pandas as pd
+        from datetime import date
+        from apps.financial_anomalies.detector import AnomalyDetector, COLUMNS
+        from apps.financial_anomalies.models import FinancialAnomaly
+
+        company, earlier, later = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        detector = AnomalyDetector(max_memory_mb=1)
+        FinancialAnomaly.objects.create(
+            journal_entry_id=earlier, anomaly_type='duplicate_entry', company_uuid=company,
+            journal_date=date(2026, 1, 5), amount=5000, severity='low', risk_score=0.1, reasoning='stale',
+        )
+        chunk = pd.DataFrame.from_records([
+            (earlier, date(2026, 1, 5), 'INV-1', 5000.0, company, 'x', 'Cash', 'asset', 2, False),
+            (later, date(2026, 1, 5), 'INV-2', 5000.0, company, 'x', 'Cash', 'asset', 2, True),
+        ], columns=COLUMNS)
+
+        AnomalyDetector.save(detector.detect(chunk, None, 0.0))
+
+        duplicates = FinancialAnomaly.objects.filter(anomaly_type='duplicate_entry')
+        assert set(duplicates.values_list('journal_entry_id', flat=True)) == {earlier, later}
+        assert duplicates.get(journal_entry_id=earlier).risk_score == 0.6
+        # Only the new entry is run through the other detectors
+        assert set(FinancialAnomaly.objects.filter(anomaly_type='round_number').values_list('journal_entry_id', flat=True)) == {later}
+
+
+@pytest.mark.django_db
+class TestSalesTrends:
+    def test_refresh_trends_and_cached_payload(self, django_assert_num_queries):
+        """Rolling windows come from SalesHistory and polls are served from cache"""
+        from datetime import date, timedelta
+        from apps.sales_trends.models import ProductTrend
+        from apps.sales_trends.services import get_trend_payload, invalidate_payloads, refresh_trends
+
+        company, rising, falling = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        today = date.today()
+        for product, name, recent, older in ((rising, "Latte", 20, 10), (falling, "Muffin", 5, 10)):
+            SalesHistory.objects.create(product_uuid=product, product_name=name, company_uuid=company,
+                                        date=today - timedelta(days=1), quantity_sold=recent, revenue=recent * 10)
+            SalesHistory.objects.create(product_uuid=product, product_name=name, company_uuid=company,
+                                        date=today - timedelta(days=40), quantity_sold=older, revenue=older * 10)
+
+        assert refresh_trends([company], today=today) == 1
+        assert ProductTrend.objects.get(product_uuid=rising).change == 100.0
+        assert ProductTrend.objects.get(product_uuid=falling).change == -50.0
+
+        invalidate_payloads([company])
+        payload, stale = get_trend_payload(company)
+        assert not stale
+        assert payload['summary']['total_sales_30d'] == 250
+        assert payload['summary']['growth_rate'] == 25.0
+        assert [m['name'] for m in payload['top_movers']] == ["Latte", "Muffin"]
+        assert payload['sparkline'][-2]['sales'] == 250
+
+        with django_assert_num_queries(0):
+            assert get_trend_payload(company)[0] == payload
+
+
+@pytest.mark.django_db
+class TestAssistantSummaries:
+    def test_answers_come_from_event_maintained_summaries(self, django_assert_num_queries):
+        """Sale/attendance events feed the store; repeated questions hit the answer LRU"""
+        from datetime import date
+        from django.utils import timezone
+        from apps.assistant import nlp_engine
+        from apps.assistant.nlp_engine import NLPEngine
+        from apps.assistant.summaries import record_attendance, record_sale
+
+        nlp_engine._answers.clear()
+        company = str(uuid.uuid4())
+        sale = {
+            "order_id": str(uuid.uuid4()), "company_uuid": company, "grand_total": "150.00", "status": "completed",
+            "created_at": timezone.now().isoformat(),
+            "items": [{"product_name": "Latte", "quantity": "3.000"}, {"product_name": "Muffin", "quantity": "1.000"}],
+        }
+        assert record_sale(sale)
+        assert not record_sale(sale)  # redelivery
+        assert not record_sale({**sale, "order_id": str(uuid.uuid4()), "status": "draft"})
+        record_sale({**sale, "order_id": str(uuid.uuid4()), "items": [{"product_name": "Muffin", "quantity": "5"}]})
+        record_attendance({"company_uuid": company, "records": [
+            {"employee_uuid": str(uuid.uuid4()), "employee_name": "Rafi Khan", "date": str(date.today()),
+             "status": "late", "late_minutes": 20},
+        ]})
+
+        engine = NLPEngine(company_uuid=company)
+        top = engine.process_message("Show top selling products")
+        assert top["reply"].splitlines()[1:] == ["1. Muffin (6 units)", "2. Latte (3 units)"]
+        assert engine.process_message("What are today's sales?")["data"] == {"count": 2, "total": 300.0}
+        assert "Rafi Khan: Late (20 mins late)" in engine.process_message("Is anyone late today?")["reply"]
+
+        with django_assert_num_queries(0):
+            assert engine.process_message("top products please") == top
+
+
+class TestRuleIndexTimer:
+    def test_quiet_process_flushes_on_timer(self, mocker, settings):
+        """Marks buffered below the size limit are flushed without another trigger"""
+        import threading
+        from apps.automation.index import RuleIndex
+
+        settings.AUTOMATION_TRIGGER_FLUSH_SECONDS = 0.05
+        index = RuleIndex()
+        flushed = threading.Event()
+        mocker.patch.object(index, 'flush', side_effect=flushed.set)
+
+        index.mark_triggered([uuid.uuid4()])
+        assert flushed.wait(2)
+
+
+@pytest.mark.django_db
+class TestRuleIndex:
+    def test_evaluate_uses_compiled_index_and_batches_trigger_marks(self, mocker, settings, django_assert_num_queries):
+        """Warm triggers run without queries; saves invalidate; marks land in one UPDATE"""
+        from apps.automation.index import rule_index
+        from apps.automation.models import Workflow
+
+        settings.AUTOMATION_TRIGGER_FLUSH_SECONDS = 3600
+        delay = mocker.patch('apps.automation.tasks.execute_rule_action.delay')
+        start = mocker.patch('apps.automation.services.WorkflowRunner.start')
+        rule_index.invalidate()
+        rule_index.flush()
+
+        company, other = uuid.uuid4(), uuid.uuid4()
+        rule = AutomationRule.objects.create(
+            name="Low stock", trigger_type="stock_level", condition_field="quantity",
+            condition_operator="<=", condition_value="10", action_type="log", company_uuid=company,
+        )
+        AutomationRule.objects.create(
+            name="Other company", trigger_type="stock_level", action_type="log", company_uuid=other,
+        )
+        workflow = Workflow.objects.create(name="Restock", company_uuid=company, flow_data={
+            "nodes": [{"id": "t", "type": "trigger", "data": {"event": "stock_level"}}], "edges": [],
+        })
+
+        assert RuleEngine.evaluate("stock_level", {"quantity": 3}, company_uuid=company) == [
+            {"rule_id": str(rule.id), "status": "queued"},
+            {"workflow_id": str(workflow.id), "status": "started"},
+        ]
+        with django_assert_num_queries(0):
+            assert "rule_id" not in RuleEngine.evaluate("stock_level", {"quantity": 11}, company_uuid=company)[0]
+            # Non-numeric context values keep comparing as strings ("3" > "10")
+            assert "rule_id" not in RuleEngine.evaluate("stock_level", {"quantity": "3"}, company_uuid=str(company))[0]
+            assert RuleEngine.evaluate("new_order", {}, company_uuid=company) == []
+            assert len(RuleEngine.evaluate("stock_level", {"quantity": 10})) == 3
+        assert delay.call_count == 3
+        start.assert_called_with(workflow, workflow.company_uuid, {"quantity": 10})
+
+        rule.refresh_from_db()
+        assert rule.last_triggered_at is None
+        with django_assert_num_queries(1):
+            assert rule_index.flush() == 2
+        rule.refresh_from_db()
+        assert rule.last_triggered_at is not None
+
+        rule.is_active = False
+        rule.save()
+        assert RuleEngine.evaluate("stock_level", {"quantity": 3}, company_uuid=company) == [
+            {"workflow_id": str(workflow.id), "status": "started"},
+        ]
+
+
+@pytest.mark.django_db
+class TestWorkflowRunner:
+    def test_iterative_run_over_compiled_graph(self, mocker):
+        """Deep flows do not recurse; fan-out actions all run; approval is a durable stop"""
+        from apps.automation.models import Workflow
+        from apps.automation.services import WorkflowRunner
+
+        run_action = mocker.patch('apps.automation.services.ActionRunner.run', return_value="ok")
+        company = uuid.uuid4()
+
+        depth = 3000
+        chain = [{"id": "t", "type": "trigger", "data": {"event": "new_order"}}] + [
+            {"id": f"c{i}", "type": "condition", "data": {"field": "total", "operator": ">", "value": "100"}}
+            for i in range(depth)
+        ]
+        edges = [{"source": "t", "target": "c0"}] + [
+            {"source": f"c{i}", "target": f"c{i + 1}", "label": "True"} for i in range(depth - 1)
+        ]
+        deep = Workflow.objects.create(name="Deep", company_uuid=company, flow_data={"nodes": chain, "edges": edges})
+        assert deep.graph["start"] == "t" and len(deep.graph["edges"]) == depth
+        assert WorkflowRunner.start(deep, company, {"total": 150}).status == 'completed'
+
+        fan_out = Workflow.objects.create(name="Fan out", company_uuid=company, flow_data={
+            "nodes": [
+                {"id": "t", "type": "trigger", "data": {"event": "new_order"}},
+                {"id": "big", "type": "condition", "data": {"field": "total", "operator": ">", "value": "100"}},
+                {"id": "mail", "type": "action", "data": {"action_type": "email", "config": {"to": "ops@example.com"}}},
+                {"id": "hook", "type": "action", "data": {"action_type": "log"}},
+                {"id": "ok", "type": "approval"},
+                {"id": "skip", "type": "action", "data": {"action_type": "log"}},
+            ],
+            "edges": [
+                {"source": "t", "target": "big"},
+                {"source": "big", "target": "mail", "label": "True"},
+                {"source": "big", "target": "hook", "label": "True"},
+                {"source": "big", "target": "skip", "label": "False"},
+                {"source": "mail", "target": "ok"},
+            ],
+        })
+        instance = WorkflowRunner.start(fan_out, company, {"total": 500})
+        assert instance.status == 'pending_approval'
+        assert instance.current_node_id == "ok"
+        assert sorted(call.args[0].action_type for call in run_action.call_args_list) == ['email', 'log']
+
+        run_action.side_effect = RuntimeError("smtp down")
+        assert WorkflowRunner.start(fan_out, company, {"total": 500}).status == 'failed'
+
+
+@pytest.mark.django_db
+class TestScheduler:
+    def test_heartbeat_runs_only_due_rules_and_advances_schedule(self, mocker, django_capture_on_commit_callbacks):
+        """next_run_at is precomputed on save and advanced in bulk after dispatch"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.automation.services import SchedulerRunner
+
+        delay = mocker.patch('apps.automation.tasks.execute_rule_action.delay')
+        now = timezone.now()
+        hourly = AutomationRule.objects.create(
+            name="Hourly digest", trigger_type="scheduled", action_type="log", is_scheduled=True,
+            trigger_config={"interval_minutes": 60}, company_uuid=uuid.uuid4(),
+        )
+        weekly = AutomationRule.objects.create(
+            name="Friday report", trigger_type="scheduled", action_type="log", is_scheduled=True,
+            trigger_config={"cron": "0 17 * * 5"}, last_triggered_at=now, company_uuid=uuid.uuid4(),
+        )
+        beat = timezone.now()
+        assert hourly.next_run_at is not None and hourly.next_run_at <= beat
+        assert weekly.next_run_at > now
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert SchedulerRunner.run_heartbeat(beat) == 1
+        delay.assert_called_once_with(str(hourly.id), {"scheduled_at": str(beat)})
+        hourly.refresh_from_db()
+        assert hourly.last_triggered_at == beat
+        assert hourly.next_run_at == beat + timedelta(minutes=60)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert SchedulerRunner.run_heartbeat(beat + timedelta(minutes=30)) == 0
+            assert SchedulerRunner.run_heartbeat(beat + timedelta(minutes=61)) == 1
+        assert delay.call_count == 2
@@ -45,6 +45,22 @@ class StockAdjustmentSerializer(serializers.Serializer):
     type = serializers.ChoiceField(choices=[('add', 'Add'), ('sub', 'Subtract')], required=True)
     notes = serializers.CharField(required=False, allow_blank=True)
 
+class GoodsReceiptLineSerializer(serializers.Serializer):
+    product_uuid = serializers.UUIDField()
+    variant_uuid = serializers.UUIDField(required=False, allow_null=True)
+    quantity = serializers.DecimalField(max_digits=20, decimal_places=3, min_value=0)
+    unit_cost = serializers.DecimalField(max_digits=20, decimal_places=2, required=False, default=0)
+    batch_number = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    manufacturing_date = serializers.DateField(required=False, allow_null=True)
+    expiry_date = serializers.DateField(required=False, allow_null=True)
+    serials = serializers.ListField(child=serializers.CharField(max_length=100), required=False, default=list)
+
+class GoodsReceiptSerializer(serializers.Serializer):
+    reference_no = serializers.CharField(max_length=100)
+    warehouse_id = serializers.UUIDField()
+    notes = serializers.CharField(required=False, allow_blank=True)
+    lines = GoodsReceiptLineSerializer(many=True, allow_empty=False)
+
 class StockTransferItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = StockTransferItem
@@ -0,0 +1,178 @@
+from decimal import Decimal
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Warehouse, Stock, Batch, StockSerial, StockTransaction
+
+BULK_BATCH_SIZE = 1000
+
+
+class GoodsReceiptError(Exception):
+    pass
+
+
+def apply_goods_receipt(company_uuid, receipt, created_by="api"):
+    """
+    Post every line of a goods receipt in one transaction.
+
+    receipt: {reference_no, warehouse_id, lines: [{product_uuid, variant_uuid,
+              quantity, unit_cost, batch_number, manufacturing_date,
+              expiry_date, serials}]}
+
+    Stock rows are created in bulk where missing and locked once, batches
+    and serials are upserted/inserted in bulk, and one StockTransaction per
+    line is written with bulk_create. A receipt whose reference was already
+    posted is reported as a duplicate instead of being applied twice; the
+    check runs under a per-reference advisory lock so two concurrent
+    deliveries of the same receipt can't both pass it. Soft-deleted stock
+    rows and batches that occupy a receipt's unique keys are revived empty.
+    """
+    reference_no = receipt['reference_no']
+    lines = receipt['lines']
+
+    with transaction.atomic():
+        try:
+            warehouse = Warehouse.objects.get(id=receipt['warehouse_id'], company_uuid=company_uuid)
+        except Warehouse.DoesNotExist:
+            raise GoodsReceiptError("Warehouse not found")
+
+        # Serializes receipts with the same reference until this transaction ends
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(hashtext(%s))", [f"goods_receipt:{company_uuid}:{reference_no}"]
+            )
+
+        already = StockTransaction.objects.filter(
+            company_uuid=company_uuid, reference_no=reference_no, type='in',
+        ).count()
+        if already:
+            return {"reference_no": reference_no, "status": "duplicate", "lines": already}
+
+        stocks = _lock_stocks(company_uuid, warehouse, {
+            (str(line['product_uuid']), _key(line.get('variant_uuid'))) for line in lines
+        })
+        batches = _existing_batches(company_uuid, stocks.values(), lines)
+
+        new_batches, new_serials, transactions = [], [], []
+        touched_batches = {}
+        for line in lines:
+            stock = stocks[(str(line['product_uuid']), _key(line.get('variant_uuid')))]
+            quantity = Decimal(str(line['quantity']))
+            unit_cost = Decimal(str(line.get('unit_cost') or 0))
+
+            # Moving weighted average over on-hand stock
+            on_hand = max(stock.quantity, Decimal('0'))
+            if on_hand + quantity > 0:
+                stock.avg_cost = ((on_hand * stock.avg_cost) + (quantity * unit_cost)) / (on_hand + quantity)
+            stock.quantity += quantity
+
+            batch = None
+            if line.get('batch_number'):
+                batch_key = (stock.id, line['batch_number'])
+                batch = batches.get(batch_key)
+                if batch is not None and batch.is_deleted:
+                    # The deleted lot still holds the unique key; reuse it as a fresh one
+                    batch.is_deleted = False
+                    batch.quantity = Decimal('0')
+                    batch.cost_price = unit_cost
+                    batch.manufacturing_date = line.get('manufacturing_date')
+                    batch.expiry_date = line.get('expiry_date')
+                if batch is None:
+                    batch = Batch(
+                        company_uuid=company_uuid, stock=stock, batch_number=line['batch_number'],
+                        manufacturing_date=line.get('manufacturing_date'), expiry_date=line.get('expiry_date'),
+                        quantity=quantity, cost_price=unit_cost,
+                    )
+                    batches[batch_key] = batch
+                    new_batches.append(batch)
+                else:
+                    batch.quantity += quantity
+                    if not batch._state.adding:
+                        touched_batches[batch.pk] = batch
+
+            new_serials.extend(
+                StockSerial(company_uuid=company_uuid, stock=stock, serial_number=serial)
+                for serial in line.get('serials') or []
+            )
+            transactions.append(StockTransaction(
+                company_uuid=company_uuid,
+                stock=stock,
+                batch=batch,
+                type='in',
+                quantity_change=quantity,
+                balance_after=stock.quantity,
+                reference_no=reference_no,
+                notes=receipt.get('notes') or f"Goods receipt {reference_no}",
+                created_by=created_by,
+            ))
+
+        # bulk_update bypasses auto_now, so stamp updated_at ourselves
+        now = timezone.now()
+        for obj in [*stocks.values(), *touched_batches.values()]:
+            obj.updated_at = now
+        Stock.all_objects.bulk_update(
+            list(stocks.values()), ['quantity', 'avg_cost', 'is_deleted', 'updated_at'], batch_size=BULK_BATCH_SIZE,
+        )
+        Batch.objects.bulk_create(new_batches, batch_size=BULK_BATCH_SIZE)
+        Batch.all_objects.bulk_update(
+            list(touched_batches.values()),
+            ['quantity', 'cost_price', 'manufacturing_date', 'expiry_date', 'is_deleted', 'updated_at'],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        StockSerial.objects.bulk_create(new_serials, batch_size=BULK_BATCH_SIZE)
+        StockTransaction.objects.bulk_create(transactions, batch_size=BULK_BATCH_SIZE)
+
+    return {
+        "reference_no": reference_no,
+        "status": "received",
+        "lines": len(transactions),
+        "batches_created": len(new_batches),
+        "serials_created": len(new_serials),
+    }
+
+
+def _key(variant_uuid):
+    return str(variant_uuid) if variant_uuid else None
+
+
+def _lock_stocks(company_uuid, warehouse, keys):
+    """
+    Stock rows for (product, variant) keys, created where missing and locked
+    FOR UPDATE. Soft-deleted rows still own their unique key, so they are
+    revived with zero quantity instead of inserted again.
+    """
+    product_uuids = {product for product, _ in keys}
+    stock_qs = Stock.all_objects.filter(company_uuid=company_uuid, warehouse=warehouse, product_uuid__in=product_uuids)
+
+    existing = {(str(p), _key(v)) for p, v in stock_qs.values_list('product_uuid', 'product_variant_uuid')}
+    missing = [key for key in keys if key not in existing]
+    if missing:
+        Stock.objects.bulk_create(
+            [
+                Stock(company_uuid=company_uuid, warehouse=warehouse, product_uuid=p,
+                      product_variant_uuid=v, quantity=0, avg_cost=0)
+                for p, v in missing
+            ],
+            ignore_conflicts=True,
+        )
+
+    stocks = {}
+    for stock in stock_qs.select_for_update().order_by('id'):
+        key = (str(stock.product_uuid), _key(stock.product_variant_uuid))
+        if key in keys:
+            if stock.is_deleted:
+                stock.is_deleted = False
+                stock.quantity = Decimal('0')
+                stock.avg_cost = Decimal('0')
+            stocks[key] = stock
+    return stocks
+
+
+def _existing_batches(company_uuid, stocks, lines):
+    batch_numbers = {line['batch_number'] for line in lines if line.get('batch_number')}
+    if not batch_numbers:
+        return {}
+    # Includes soft-deleted batches: they keep (company, stock, batch_number) taken
+    rows = Batch.all_objects.select_for_update().filter(
+        company_uuid=company_uuid, stock__in=list(stocks), batch_number__in=batch_numbers,
+    )
+    return {(batch.stock_id, batch.batch_number): batch for batch in rows}
@@ -4,8 +4,10 @@ from .models import Warehouse, Stock, StockTransaction, UOMConversion, StockSeri
 from .serializers import (
     WarehouseSerializer, StockSerializer, StockTransactionSerializer,
     UOMConversionSerializer, StockSerialSerializer, BillOfMaterialSerializer,
-    StockAdjustmentSerializer, StockTransferSerializer, StockTransferItemSerializer
+    StockAdjustmentSerializer, StockTransferSerializer, StockTransferItemSerializer,
+    GoodsReceiptSerializer
 )
+from .services import apply_goods_receipt, GoodsReceiptError
 from adaptix_core.permissions import HasPermission
 from rest_framework.decorators import action
 
@@ -93,6 +95,28 @@ class StockViewSet(viewsets.ReadOnlyModelViewSet):
         
         return Response(StockSerializer(stock).data)
 
+    @action(detail=False, methods=['post'])
+    def receive(self, request):
+        """
+        Post a whole goods receipt (e.g. a purchase order delivery) atomically.
+        Payload: { "reference_no": "PO-1", "warehouse_id": "...", "lines": [
+            { "product_uuid": "...", "quantity": 10, "unit_cost": 5, "batch_number": "B1",
+              "expiry_date": "2027-01-01", "serials": ["SN1"] } ] }
+        """
+        serializer = GoodsReceiptSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        company_uuid = getattr(request, "company_uuid", None)
+        if not company_uuid:
+             return Response({"detail": "Company context missing"}, status=status.HTTP_400_BAD_REQUEST)
+
+        created_by = request.user_claims.get('user_id', 'api') if hasattr(request, 'user_claims') else 'api'
+        try:
+            result = apply_goods_receipt(company_uuid, serializer.validated_data, created_by=created_by)
+        except GoodsReceiptError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
+
     @action(detail=False, methods=['post'])
     def bulk_check(self, request):
         """
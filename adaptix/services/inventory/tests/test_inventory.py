@@ -41,3 +41,135 @@ class TestInventoryLogic:
         # 4. Verify Final Count
         refetched_stock = Stock.objects.get(id=stock.id)
         assert refetched_stock.quantity == Decimal("150.000")
+
+
+@pytest.mark.django_db
+class TestBatchStockUpdate:
+    def test_batch_deduction_applies_all_lines(self, company_uuid, mocker):
+        """A stock.update.batch event updates every line and logs one transaction per product."""
+        from apps.stocks.management.commands.run_inventory_consumer import Command
+        from apps.stocks.models import StockTransaction
+
+        warehouse = Warehouse.objects.create(company_uuid=company_uuid, name="Main Warehouse")
+        existing_product = uuid.uuid4()
+        new_product = uuid.uuid4()
+        Stock.objects.create(
+            company_uuid=company_uuid,
+            warehouse=warehouse,
+            product_uuid=existing_product,
+            quantity=Decimal("20.000")
+        )
+
+        command = Command()
+        command.broker_url = "memory://"
+        command.exchange = None
+        publish = mocker.patch.object(command, "publish_result")
+
+        command.handle_batch_update({
+            "type": "stock.update.batch",
+            "action": "decrease",
+            "reason": "Sale #1",
+            "reference_no": "1",
+            "company_uuid": company_uuid,
+            "items": [
+                {"product_uuid": str(existing_product), "quantity": 2},
+                {"product_uuid": str(existing_product), "quantity": 3},
+                {"product_uuid": str(new_product), "quantity": 1},
+            ]
+        })
+
+        assert Stock.objects.get(product_uuid=existing_product).quantity == Decimal("15.000")
+        assert Stock.objects.get(product_uuid=new_product).quantity == Decimal("-1.000")
+        assert StockTransaction.objects.filter(reference_no="1").count() == 2
+        publish.assert_called_once()
+        assert publish.call_args[0][2] == "stock.update.success"
+        assert publish.call_args[0][3]["reason"] == "Sale #1"
+
+    def test_batch_failure_publishes_saga_compensation(self, company_uuid, mocker):
+        """A failed batch is reported on stock.update.failed with the sale reference POS matches on."""
+        from apps.stocks.management.commands.run_inventory_consumer import Command
+
+        command = Command()
+        command.broker_url = "memory://"
+        command.exchange = None
+        publish = mocker.patch.object(command, "publish_result")
+        mocker.patch("apps.stocks.models.StockTransaction.objects.bulk_create", side_effect=RuntimeError("db down"))
+
+        command.handle_batch_update({
+            "type": "stock.update.batch",
+            "action": "decrease",
+            "reason": "Sale #42",
+            "reference_no": "42",
+            "company_uuid": company_uuid,
+            "items": [{"product_uuid": str(uuid.uuid4()), "quantity": 1}]
+        })
+
+        routing_key, payload = publish.call_args[0][2], publish.call_args[0][3]
+        assert routing_key == "stock.update.failed"
+        assert payload["reason"] == "Sale #42"
+        assert payload["order_reference"] is None
+        assert "db down" in payload["error"]
+
+
+@pytest.mark.django_db
+class TestGoodsReceipt:
+    def test_receipt_posts_all_lines_once(self, company_uuid, django_assert_max_num_queries):
+        """Every line lands in one transaction with batches and serials; replays are no-ops."""
+        from apps.stocks.models import Batch, StockSerial, StockTransaction
+        from apps.stocks.services import apply_goods_receipt
+
+        warehouse = Warehouse.objects.create(company_uuid=company_uuid, name="Main Store")
+        stocked, fresh = uuid.uuid4(), uuid.uuid4()
+        Stock.objects.create(
+            company_uuid=company_uuid, warehouse=warehouse, product_uuid=stocked,
+            quantity=Decimal("10.000"), avg_cost=Decimal("4.00")
+        )
+        lines = [{"product_uuid": uuid.uuid4(), "quantity": Decimal("1"), "unit_cost": Decimal("1")} for _ in range(50)]
+        lines += [
+            {"product_uuid": stocked, "quantity": Decimal("10"), "unit_cost": Decimal("6.00"),
+             "batch_number": "B-1", "expiry_date": "2030-01-01"},
+            {"product_uuid": stocked, "quantity": Decimal("5"), "unit_cost": Decimal("6.00"), "batch_number": "B-1"},
+            {"product_uuid": fresh, "quantity": Decimal("2"), "unit_cost": Decimal("100.00"), "serials": ["SN-1", "SN-2"]},
+        ]
+        receipt = {"reference_no": "PO-42", "warehouse_id": warehouse.id, "lines": lines}
+
+        with django_assert_max_num_queries(15):
+            result = apply_goods_receipt(company_uuid, receipt)
+        assert result["status"] == "received" and result["lines"] == 53
+        assert result["batches_created"] == 1 and result["serials_created"] == 2
+
+        stock = Stock.objects.get(product_uuid=stocked)
+        assert stock.quantity == Decimal("25.000")
+        assert stock.avg_cost == Decimal("5.20")
+        assert Batch.objects.get(stock=stock).quantity == Decimal("15.000")
+        assert StockSerial.objects.filter(stock__product_uuid=fresh).count() == 2
+        assert StockTransaction.objects.filter(reference_no="PO-42").count() == 53
+
+        assert apply_goods_receipt(company_uuid, receipt)["status"] == "duplicate"
+        assert Stock.objects.get(product_uuid=stocked).quantity == Decimal("25.000")
+
+    def test_receipt_revives_soft_deleted_stock_and_batch(self, company_uuid):
+        """Deleted rows still hold the unique keys, so a receipt reuses them instead of failing."""
+        from apps.stocks.models import Batch
+        from apps.stocks.services import apply_goods_receipt
+
+        warehouse = Warehouse.objects.create(company_uuid=company_uuid, name="Main Store")
+        product = uuid.uuid4()
+        stock = Stock.objects.create(
+            company_uuid=company_uuid, warehouse=warehouse, product_uuid=product,
+            quantity=Decimal("7.000"), avg_cost=Decimal("9.00")
+        )
+        batch = Batch.objects.create(company_uuid=company_uuid, stock=stock, batch_number="B-1", quantity=Decimal("7"))
+        batch.delete()
+        stock.delete()
+
+        receipt = {"reference_no": "PO-43", "warehouse_id": warehouse.id, "lines": [
+            {"product_uuid": product, "quantity": Decimal("3"), "unit_cost": Decimal("2.00"), "batch_number": "B-1"},
+        ]}
+        result = apply_goods_receipt(company_uuid, receipt)
+        assert result["status"] == "received" and result["batches_created"] == 0
+
+        revived = Stock.objects.get(pk=stock.pk)
+        assert (revived.quantity, revived.avg_cost) == (Decimal("3.000"), Decimal("2.00"))
+        revived_batch = Batch.objects.get(pk=batch.pk)
+        assert (revived_batch.quantity, revived_batch.cost_price) == (Decimal("3.000"), Decimal("2.00"))
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mrp', '0011_productionorder_product_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerialSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=20)),
+                ('period', models.CharField(help_text='YYYYMM', max_length=6)),
+                ('last_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='serialsequence',
+            constraint=models.UniqueConstraint(fields=('prefix', 'period'), name='uniq_serial_sequence_period'),
+        ),
+    ]
@@ -203,3 +203,20 @@ class ProductUnit(models.Model):
 
     def __str__(self):
         return self.serial_number
+
+class SerialSequence(models.Model):
+    """
+    Counter behind ProductUnit serial numbers, one row per prefix and month.
+    Serials are handed out in blocks, see utils.serial_generator.
+    """
+    prefix = models.CharField(max_length=20)
+    period = models.CharField(max_length=6, help_text="YYYYMM")
+    last_value = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['prefix', 'period'], name='uniq_serial_sequence_period'),
+        ]
+
+    def __str__(self):
+        return f"{self.prefix}-{self.period}: {self.last_value}"
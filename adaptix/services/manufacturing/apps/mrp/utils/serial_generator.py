@@ -1,13 +1,46 @@
-import uuid
-import datetime
+from django.db import connection
+from django.utils import timezone
+from apps.mrp.models import SerialSequence
+
+# Zero-padded so block serials never clash with the old 4-hex-char suffixes
+SEQUENCE_WIDTH = 6
+
+RESERVE_BLOCK = """
+    INSERT INTO {table} (prefix, period, last_value)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (prefix, period)
+    DO UPDATE SET last_value = {table}.last_value + EXCLUDED.last_value
+    RETURNING last_value
+"""
+
+
+def reserve_serial_block(count, product_prefix="FRZ", when=None):
+    """
+    Reserves `count` consecutive serial numbers with one atomic upsert on the
+    prefix/month counter and returns them in order.
+    Format: [PREFIX]-[YEAR][MONTH]-[SEQUENCE]
+    Example: FRZ-202601-000042
+    """
+    if count <= 0:
+        return []
+
+    year_month = (when or timezone.now()).strftime("%Y%m")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            RESERVE_BLOCK.format(table=SerialSequence._meta.db_table),
+            [product_prefix, year_month, count],
+        )
+        last = cursor.fetchone()[0]
+    return [
+        f"{product_prefix}-{year_month}-{value:0{SEQUENCE_WIDTH}d}"
+        for value in range(last - count + 1, last + 1)
+    ]
+
 
 def generate_serial_number(product_prefix="FRZ"):
     """
     Generates a unique serial number for a product unit.
-    Format: [PREFIX]-[YEAR][MONTH]-[RANDOM_HEX]
-    Example: FRZ-202601-A4B2
+    Format: [PREFIX]-[YEAR][MONTH]-[SEQUENCE]
+    Example: FRZ-202601-000042
     """
-    now = datetime.datetime.now()
-    year_month = now.strftime("%Y%m")
-    unique_suffix = uuid.uuid4().hex[:4].upper()
-    return f"{product_prefix}-{year_month}-{unique_suffix}"
+    return reserve_serial_block(1, product_prefix)[0]
@@ -0,0 +1,53 @@
+import json
+from django.db import transaction
+from apps.mrp.models import ProductUnit
+from .serial_generator import reserve_serial_block
+
+BULK_BATCH_SIZE = 1000
+
+
+def generate_order_units(orders):
+    """
+    Creates individual ProductUnit records for the orders that have none.
+
+    Orders already holding units are found with one query, serials for every
+    remaining unit are reserved as a single block and units are inserted with
+    bulk_create in chunks. Returns the number of units created.
+    """
+    orders = list(orders)
+    with_units = set(
+        ProductUnit.objects.filter(production_order__in=orders)
+        .values_list('production_order_id', flat=True).distinct()
+    )
+    pending = [o for o in orders if o.id not in with_units and int(o.quantity_planned) > 0]
+    total = sum(int(o.quantity_planned) for o in pending)
+    if not total:
+        return 0
+
+    # Reserved outside the write transaction so the counter row is not held
+    # locked while units are inserted; a rollback only leaves a gap
+    serials = iter(reserve_serial_block(total))
+
+    with transaction.atomic():
+        batch = []
+        for order in pending:
+            status = 'INVENTORY' if order.status == 'COMPLETED' else 'PRODUCTION'
+            for _ in range(int(order.quantity_planned)):
+                serial = next(serials)
+                batch.append(ProductUnit(
+                    serial_number=serial,
+                    production_order=order,
+                    product_uuid=order.product_uuid,
+                    company_uuid=order.company_uuid,
+                    status=status,
+                    qr_code_data=json.dumps({
+                        "serial": serial,
+                        "product": str(order.product_uuid),
+                        "order": f"PO-{order.id}"
+                    })
+                ))
+                if len(batch) >= BULK_BATCH_SIZE:
+                    ProductUnit.objects.bulk_create(batch)
+                    batch = []
+        ProductUnit.objects.bulk_create(batch)
+    return total
@@ -3,10 +3,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import WorkCenter, BillOfMaterial, ProductionOrder, Operation, ProductionOrderOperation, ProductUnit
 from .serializers import WorkCenterSerializer, BillOfMaterialSerializer, ProductionOrderSerializer, OperationSerializer, ProductionOrderOperationSerializer, ProductUnitSerializer
-from .utils.serial_generator import generate_serial_number
+from .utils.unit_generator import generate_order_units
 from adaptix_core.permissions import HasPermission
 import os
-import json
 from kombu import Connection, Exchange, Producer
 from django.core.serializers.json import DjangoJSONEncoder
 
@@ -132,12 +131,10 @@ class ProductionOrderViewSet(viewsets.ModelViewSet):
 
     def fetch_product_name(self, product_uuid, auth_token):
         """Internal helper to fetch product name from Product Service."""
-        import requests
+        from adaptix_core.service_client import get_client
         try:
-            # Internal URL for Product Service
-            url = f"http://adaptix-product:8000/api/product/products/{product_uuid}/"
-            resp = requests.get(
-                url, 
+            resp = get_client('product').get(
+                f"/products/{product_uuid}/",
                 headers={"Authorization": auth_token},
                 timeout=3
             )
@@ -149,23 +146,7 @@ class ProductionOrderViewSet(viewsets.ModelViewSet):
 
     def generate_order_units(self, order):
         """Helper to create individual unit records for an order."""
-        if order.units.exists():
-            return 
-
-        for _ in range(int(order.quantity_planned)):
-            serial = generate_serial_number()
-            ProductUnit.objects.create(
-                serial_number=serial,
-                production_order=order,
-                product_uuid=order.product_uuid,
-                company_uuid=order.company_uuid,
-                status='PRODUCTION',
-                qr_code_data=json.dumps({
-                    "serial": serial,
-                    "product": str(order.product_uuid),
-                    "order": f"PO-{order.id}"
-                })
-            )
+        return generate_order_units([order])
 
     def perform_update(self, serializer):
         instance = serializer.instance
@@ -344,15 +325,11 @@ class ProductionOrderViewSet(viewsets.ModelViewSet):
         orders = ProductionOrder.objects.filter(
             status__in=['CONFIRMED', 'IN_PROGRESS', 'QUALITY_CHECK', 'COMPLETED']
         )
-        total_created = 0
-        for order in orders:
-            if not order.units.exists():
-                self.generate_order_units(order)
-                total_created += order.quantity_planned
+        total_created = generate_order_units(orders)
         
         return Response({
             "status": "sync completed",
-            "units_generated": int(total_created)
+            "units_generated": total_created
         })
 
     @action(detail=False, methods=['post'], url_path='check-availability')
@@ -361,7 +338,7 @@ class ProductionOrderViewSet(viewsets.ModelViewSet):
         Check if we have enough raw materials for an order (or simulated order).
         Payload: { "order_id": 1 } OR { "bom_id": 1, "quantity": 100 }
         """
-        import requests
+        from adaptix_core.service_client import get_client
         from rest_framework.response import Response
         
         bom_id = request.data.get('bom_id')
@@ -396,21 +373,22 @@ class ProductionOrderViewSet(viewsets.ModelViewSet):
              return Response({"status": "OK", "message": "No components required"})
 
         # 2. Call Inventory Service
-        # We assume Inventory Service is reachable at adaptix-inventory:8000 internally
+        # Inventory Service is resolved through ServiceRegistry (INVENTORY_SERVICE_URL)
         # Authorization? We might need to forward the token or use a service token. 
         # For this MVP, we rely on internal network trust or mock headers.
         # Actually, standard adaptix auth requires a valid JWT.
         # We can forward the user's token from `request.headers`.
         
-        inventory_url = "http://adaptix-inventory:8000/api/inventory/stocks/bulk_check/"
         token = request.headers.get("Authorization")
         
         try:
-            resp = requests.post(
-                inventory_url, 
+            # Read-only lookup, so it is safe to retry
+            resp = get_client('inventory').post(
+                "/stocks/bulk_check/",
                 json={"product_uuids": list(required_items.keys())},
                 headers={"Authorization": token, "Content-Type": "application/json"},
-                timeout=5
+                timeout=5,
+                idempotent=True
             )
             
             if resp.status_code != 200:
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+from apps.payments.overdue import assess_overdue_installments, publish_overdue_summaries
+
+
+class Command(BaseCommand):
+    help = 'Nightly job: mark unpaid EMI installments overdue, accrue late fees and publish per-company summaries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=str, help='Assess as of this day (YYYY-MM-DD). Defaults to today.')
+        parser.add_argument('--no-events', action='store_true', help='Skip publishing the summary events')
+
+    def handle(self, *args, **options):
+        today = parse_date(options['date']) if options.get('date') else None
+
+        summaries = assess_overdue_installments(today)
+        for summary in summaries:
+            self.stdout.write(
+                f"{summary['company_uuid']}: {summary['overdue_installments']} overdue installment(s) "
+                f"across {summary['overdue_schedules']} schedule(s), penalties {summary['penalty_amount']}"
+            )
+
+        if not options['no_events']:
+            publish_overdue_summaries(summaries)
+
+        self.stdout.write(self.style.SUCCESS(f"Assessed overdue installments for {len(summaries)} company(ies)."))
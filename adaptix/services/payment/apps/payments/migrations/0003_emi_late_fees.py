@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_emiplan_payment_payment_type_alter_payment_method_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emiplan',
+            name='grace_days',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='emiplan',
+            name='late_fee_flat',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='emiplan',
+            name='late_fee_rate',
+            field=models.DecimalField(decimal_places=3, default=0, help_text='% of the installment per day late', max_digits=6),
+        ),
+        migrations.AddIndex(
+            model_name='emiinstallment',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('status__in', ['pending', 'overdue'])), fields=['due_date'], name='emi_installment_open_idx'),
+        ),
+    ]
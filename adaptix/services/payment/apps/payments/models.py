@@ -82,6 +82,11 @@ class EMIPlan(SoftDeleteModel):
     min_amount = models.DecimalField(max_digits=12, decimal_places=2, default=1000.0)
     is_active = models.BooleanField(default=True)
 
+    # Late payment terms, applied by the nightly assess_overdue_installments run
+    grace_days = models.PositiveIntegerField(default=0)
+    late_fee_flat = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    late_fee_rate = models.DecimalField(max_digits=6, decimal_places=3, default=0, help_text="% of the installment per day late")
+
     def __str__(self):
         return f"{self.name} ({self.tenure_months}m @ {self.interest_rate}%)"
 
@@ -113,20 +118,20 @@ class EMISchedule(SoftDeleteModel):
         return f"EMI for Order {self.order_id}"
 
     def generate_installments(self):
+        """Replace the schedule's installments with one per month of the plan's tenure."""
         self.installments.all().delete()
-        installment_amount = self.monthly_installment
-        current_date = self.start_date
-        
-        for i in range(1, self.plan.tenure_months + 1):
-            due_date = current_date + relativedelta(months=1)
-            EMIInstallment.objects.create(
+        installments = [
+            EMIInstallment(
                 schedule=self,
+                company_uuid=self.company_uuid,
                 installment_number=i,
-                due_date=due_date,
-                amount=installment_amount,
+                due_date=self.start_date + relativedelta(months=i),
+                amount=self.monthly_installment,
                 status='pending'
             )
-            current_date = due_date
+            for i in range(1, self.plan.tenure_months + 1)
+        ]
+        return EMIInstallment.objects.bulk_create(installments)
 
 class EMIInstallment(SoftDeleteModel):
     STATUS_CHOICES = (
@@ -147,6 +152,14 @@ class EMIInstallment(SoftDeleteModel):
     class Meta:
         ordering = ['due_date']
         unique_together = ('schedule', 'installment_number')
+        indexes = [
+            # Nightly overdue scan across all tenants only reads open installments
+            models.Index(
+                fields=['due_date'],
+                name='emi_installment_open_idx',
+                condition=models.Q(status__in=['pending', 'overdue'], is_deleted=False),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.schedule.order_id} - #{self.installment_number} ({self.amount})"
@@ -0,0 +1,68 @@
+from decimal import Decimal
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import EMIInstallment, EMISchedule, EMIPlan
+
+EVENT_EXCHANGE = 'events'
+EVENT_ROUTING_KEY = 'payment.emi.overdue_summary'
+
+
+def assess_overdue_installments(today=None):
+    """
+    Mark every unpaid installment past its plan's grace period as overdue and
+    recompute its penalty, for all tenants in one statement.
+
+    penalty = late_fee_flat + amount * late_fee_rate% * days late after grace
+
+    Penalties are derived from the due date rather than accumulated, so a
+    missed or repeated nightly run gives the same result. Returns one summary
+    dict per company.
+    """
+    today = today or timezone.localdate()
+    sql = f"""
+        WITH assessed AS (
+            UPDATE {EMIInstallment._meta.db_table} AS i
+            SET status = 'overdue',
+                penalty_amount = ROUND(
+                    p.late_fee_flat
+                    + i.amount * p.late_fee_rate / 100 * (%(today)s::date - i.due_date - p.grace_days),
+                    2),
+                updated_at = %(now)s
+            FROM {EMISchedule._meta.db_table} AS s, {EMIPlan._meta.db_table} AS p
+            WHERE i.schedule_id = s.id
+              AND s.plan_id = p.id
+              AND s.status = 'active'
+              AND NOT s.is_deleted
+              AND NOT i.is_deleted
+              AND i.status IN ('pending', 'overdue')
+              AND i.due_date < %(today)s::date - p.grace_days
+            RETURNING COALESCE(i.company_uuid, s.company_uuid) AS company_uuid,
+                      i.schedule_id, i.amount, i.penalty_amount
+        )
+        SELECT company_uuid, COUNT(*), COUNT(DISTINCT schedule_id), SUM(amount), SUM(penalty_amount)
+        FROM assessed
+        GROUP BY company_uuid
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql, {'today': today, 'now': timezone.now()})
+        rows = cursor.fetchall()
+
+    return [
+        {
+            "company_uuid": str(company_uuid) if company_uuid else None,
+            "as_of": today.isoformat(),
+            "overdue_installments": installments,
+            "overdue_schedules": schedules,
+            "overdue_amount": str(amount or Decimal('0')),
+            "penalty_amount": str(penalty or Decimal('0')),
+        }
+        for company_uuid, installments, schedules, amount, penalty in rows
+    ]
+
+
+def publish_overdue_summaries(summaries):
+    """Emit one summary event per company instead of one per installment."""
+    from adaptix_core.messaging import publish_event
+
+    for summary in summaries:
+        publish_event(EVENT_EXCHANGE, EVENT_ROUTING_KEY, summary)
@@ -1,4 +1,6 @@
 from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import viewsets, status, decorators
 from rest_framework.response import Response
 from .models import EMIPlan, EMISchedule, EMIInstallment
@@ -48,19 +50,19 @@ class EMIScheduleViewSet(viewsets.ReadOnlyModelViewSet):
         total_payable = p + interest
         monthly = total_payable / Decimal(t)
 
-        schedule = EMISchedule.objects.create(
-            order_id=data['order_id'],
-            plan=plan,
-            customer_uuid=data.get('customer_uuid'),
-            principal_amount=p,
-            interest_amount=interest,
-            total_payable=total_payable,
-            monthly_installment=monthly,
-            company_uuid=getattr(request, 'company_uuid', None)
-        )
-        
-        schedule.generate_installments()
-        
+        with transaction.atomic():
+            schedule = EMISchedule.objects.create(
+                order_id=data['order_id'],
+                plan=plan,
+                customer_uuid=data.get('customer_uuid'),
+                principal_amount=p,
+                interest_amount=interest,
+                total_payable=total_payable,
+                monthly_installment=monthly,
+                company_uuid=getattr(request, 'company_uuid', None)
+            )
+            schedule.generate_installments()
+
         return Response(EMIScheduleSerializer(schedule).data, status=status.HTTP_201_CREATED)
 
 class EMIInstallmentViewSet(viewsets.ModelViewSet):
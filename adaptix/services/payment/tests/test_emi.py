@@ -0,0 +1,83 @@
+import pytest
+import uuid
+import datetime
+from decimal import Decimal
+from apps.payments.models import EMIPlan, EMISchedule, EMIInstallment
+from apps.payments.overdue import assess_overdue_installments
+
+
+def make_schedule(plan, company_uuid, start_date):
+    schedule = EMISchedule.objects.create(
+        company_uuid=company_uuid,
+        order_id=uuid.uuid4(),
+        plan=plan,
+        principal_amount=Decimal("600.00"),
+        interest_amount=Decimal("0.00"),
+        total_payable=Decimal("600.00"),
+        monthly_installment=Decimal("100.00"),
+        start_date=start_date,
+    )
+    schedule.generate_installments()
+    return schedule
+
+
+@pytest.mark.django_db
+class TestEMIOverdue:
+    def test_generate_installments_bulk(self, django_assert_max_num_queries):
+        plan = EMIPlan.objects.create(name="6 Months", tenure_months=6)
+        schedule = EMISchedule.objects.create(
+            order_id=uuid.uuid4(), plan=plan,
+            principal_amount=Decimal("600.00"), interest_amount=Decimal("0.00"),
+            total_payable=Decimal("600.00"), monthly_installment=Decimal("100.00"),
+            start_date=datetime.date(2025, 1, 31),
+        )
+
+        # delete + plan lookup + one INSERT, regardless of tenure
+        with django_assert_max_num_queries(3):
+            schedule.generate_installments()
+
+        due_dates = list(schedule.installments.values_list('due_date', flat=True))
+        assert len(due_dates) == 6
+        assert due_dates[0] == datetime.date(2025, 2, 28)
+        assert due_dates[1] == datetime.date(2025, 3, 31)
+
+    def test_assess_overdue_is_set_based_and_idempotent(self):
+        company_a, company_b = uuid.uuid4(), uuid.uuid4()
+        plan = EMIPlan.objects.create(
+            name="Store 6", tenure_months=6, grace_days=5,
+            late_fee_flat=Decimal("10.00"), late_fee_rate=Decimal("0.5"),
+        )
+        schedule_a = make_schedule(plan, company_a, datetime.date(2025, 1, 1))
+        make_schedule(plan, company_b, datetime.date(2025, 1, 1))
+        schedule_a.installments.filter(installment_number=1).update(status='paid')
+
+        # Feb 1 and Mar 1 are past the 5 day grace; Apr 1 is still inside it
+        today = datetime.date(2025, 4, 4)
+        summaries = assess_overdue_installments(today)
+        again = assess_overdue_installments(today)
+        assert sorted(summaries, key=str) == sorted(again, key=str)
+
+        by_company = {s["company_uuid"]: s for s in summaries}
+        assert by_company[str(company_a)]["overdue_installments"] == 1
+        assert by_company[str(company_b)]["overdue_installments"] == 2
+
+        second = schedule_a.installments.get(installment_number=2)
+        assert second.status == 'overdue'
+        # 10 + 100 * 0.5% * (34 days late - 5 grace)
+        assert second.penalty_amount == Decimal("24.50")
+        assert schedule_a.installments.get(installment_number=1).status == 'paid'
+        assert schedule_a.installments.get(installment_number=3).status == 'pending'
+
+    def test_command_publishes_one_event_per_company(self, mocker):
+        from django.core.management import call_command
+
+        plan = EMIPlan.objects.create(name="Store 3", tenure_months=3)
+        for company_uuid in (uuid.uuid4(), uuid.uuid4()):
+            make_schedule(plan, company_uuid, datetime.date(2025, 1, 1))
+
+        mock_publish = mocker.patch("adaptix_core.messaging.publish_event")
+        call_command("assess_overdue_installments", "--date", "2025-06-01")
+
+        assert mock_publish.call_count == 2
+        assert all(c.args[1] == "payment.emi.overdue_summary" for c in mock_publish.call_args_list)
+        assert EMIInstallment.objects.filter(status='overdue').count() == 6
@@ -80,7 +80,6 @@ class OrderSerializer(serializers.ModelSerializer):
         ]
 
     def create(self, validated_data):
-        import requests
         from django.db import transaction
         
         items_data = validated_data.pop('items')
@@ -129,7 +128,8 @@ class OrderSerializer(serializers.ModelSerializer):
         
         # ... logic continues inside transaction ...
 
-        # ... logic continues inside transaction ...
+        # -- TAX (resolved before the transaction so no row locks are held across I/O) --
+        self._apply_taxes(company_uuid, validated_data.get('tax_zone_code'), items_data)
 
         with transaction.atomic():
             order = Order.objects.create(**validated_data)
@@ -140,8 +140,6 @@ class OrderSerializer(serializers.ModelSerializer):
             calculated_tax = Decimal('0')
             calculated_discount = Decimal('0')
             
-            tax_zone_code = validated_data.get('tax_zone_code')
-            
             for item_data in items_data:
                 # Propagate company_uuid
                 item_data['company_uuid'] = company_uuid
@@ -151,30 +149,6 @@ class OrderSerializer(serializers.ModelSerializer):
                 disc = Decimal(str(item_data.get('discount_amount', 0)))
                 tax = Decimal(str(item_data.get('tax_amount', 0)))
                 
-                # Dynamic Tax Calculation if zone provided and no tax sent by client
-                is_exempt = item_data.get('metadata', {}).get('is_tax_exempt', False)
-                
-                if not is_exempt and tax_zone_code and tax == 0:
-                    try:
-                        from adaptix_core.service_registry import ServiceRegistry
-                        url = f"{ServiceRegistry.get_api_url('accounting')}/tax/engine/calculate/"
-                        payload = {
-                            "amount": float(qty * price),
-                            "zone_code": tax_zone_code,
-                            "product_category_uuid": str(item_data.get('metadata', {}).get('category_uuid')) if item_data.get('metadata') else None
-                        }
-                        headers = {'X-Company-Id': str(company_uuid)}
-                        resp = requests.post(url, json=payload, headers=headers)
-                        if resp.status_code == 200:
-                            tax_data = resp.json()
-                            tax = Decimal(str(tax_data.get('total_tax', 0)))
-                            item_data['tax_amount'] = tax
-                    except Exception as e:
-                        print(f"Tax Engine Error: {e}")
-                elif is_exempt:
-                    tax = Decimal('0')
-                    item_data['tax_amount'] = tax
-
                 # Simple server-side calc
                 item_subtotal = (qty * price) - disc + tax
                 item_data['subtotal'] = item_subtotal
@@ -190,9 +164,11 @@ class OrderSerializer(serializers.ModelSerializer):
             if loyalty_action == 'REDEEM' and order.customer_uuid and redeemed_points > 0:
                 try:
                     # 1. Deduct points from Customer Service
-                    from adaptix_core.service_registry import ServiceRegistry
-                    url = f"{ServiceRegistry.get_api_url('customer')}/customers/{order.customer_uuid}/adjust_points/"
-                    resp = requests.post(url, json={'action': 'deduct', 'points': float(redeemed_points)})
+                    from adaptix_core.service_client import get_client
+                    resp = get_client('customer').post(
+                        f"/customers/{order.customer_uuid}/adjust_points/",
+                        json={'action': 'deduct', 'points': float(redeemed_points)}
+                    )
                     
                     if resp.status_code == 200:
                         # 2. Apply Discount (1 Point = 1 Currency Unit for MVP)
@@ -236,6 +212,39 @@ class OrderSerializer(serializers.ModelSerializer):
             
             return order
 
+    def _apply_taxes(self, company_uuid, tax_zone_code, items_data):
+        """
+        Fill in tax_amount for every line in one pass: exempt lines get 0, and
+        lines without a client-sent tax are computed together via the cached
+        company rule set (one batch call to accounting on a cache miss).
+        """
+        from .tax import tax_rule_cache
+
+        pending = []
+        for item_data in items_data:
+            tax = Decimal(str(item_data.get('tax_amount', 0)))
+            metadata = item_data.get('metadata') or {}
+
+            if metadata.get('is_tax_exempt', False):
+                tax = Decimal('0')
+            elif tax_zone_code and tax == 0:
+                pending.append(item_data)
+            item_data['tax_amount'] = tax
+
+        if not pending:
+            return
+
+        lines = [
+            (
+                Decimal(str(item.get('quantity', 1))) * Decimal(str(item.get('unit_price', 0))),
+                (item.get('metadata') or {}).get('category_uuid')
+            )
+            for item in pending
+        ]
+        taxes = tax_rule_cache.calculate(company_uuid, tax_zone_code, lines)
+        for item_data, tax in zip(pending, taxes):
+            item_data['tax_amount'] = tax.quantize(Decimal('0.01'))
+
 class ReturnItemSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='order_item.product_name', read_only=True)
     
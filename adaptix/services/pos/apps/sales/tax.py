@@ -0,0 +1,108 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from adaptix_core.service_client import get_client
+
+
+class TaxRuleCache:
+    """
+    Per-company TTL cache of the accounting service's compiled tax rules.
+
+    Rules are fetched once per company from /tax/engine/rules/ and evaluated
+    in-process, so checkout does not pay an HTTP hop per line item. If the
+    rules cannot be loaded, callers fall back to /tax/engine/calculate_batch/.
+    """
+
+    def __init__(self, ttl=None, timeout=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'TAX_RULE_CACHE_TTL', 300)
+        self.timeout = timeout if timeout is not None else getattr(settings, 'TAX_ENGINE_TIMEOUT', 3)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_rules(self, company_uuid):
+        key = str(company_uuid)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+
+        resp = get_client('accounting').get(
+            "/tax/engine/rules/",
+            headers={'X-Company-Id': key},
+            timeout=self.timeout
+        )
+        resp.raise_for_status()
+        rules = self._compile(resp.json().get('rules', []))
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, rules)
+        return rules
+
+    @staticmethod
+    def _compile(rules):
+        """Index rules by zone code with Decimal rates ready for evaluation."""
+        compiled = {}
+        for rule in rules:
+            compiled.setdefault(rule['zone_code'], []).append(
+                (rule.get('product_category_uuid'), Decimal(str(rule['rate'])))
+            )
+        return compiled
+
+    def invalidate(self, company_uuid=None):
+        with self._lock:
+            if company_uuid is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(company_uuid), None)
+
+    def calculate(self, company_uuid, zone_code, lines):
+        """
+        Returns the tax for each (amount, category_uuid) line, in order.
+        Uses the cached rule set, falling back to one batch call to accounting.
+        """
+        try:
+            zone_rules = self.get_rules(company_uuid).get(zone_code, [])
+        except Exception as e:
+            print(f"Tax rule cache miss for {company_uuid}: {e}")
+            return self._calculate_remote(company_uuid, zone_code, lines)
+
+        results = []
+        for amount, category_uuid in lines:
+            category_uuid = str(category_uuid) if category_uuid else None
+            tax = Decimal('0')
+            for rule_category, rate in zone_rules:
+                # Category-specific rules plus global (category-less) rules
+                if rule_category is None or rule_category == category_uuid:
+                    tax += (amount * rate) / Decimal('100.00')
+            results.append(tax)
+        return results
+
+    def _calculate_remote(self, company_uuid, zone_code, lines):
+        payload = {
+            "zone_code": zone_code,
+            "lines": [
+                {"amount": str(amount), "product_category_uuid": str(category_uuid) if category_uuid else None}
+                for amount, category_uuid in lines
+            ]
+        }
+        try:
+            resp = get_client('accounting').post(
+                "/tax/engine/calculate_batch/",
+                idempotent=True,  # Pure calculation, safe to retry
+                json=payload,
+                headers={'X-Company-Id': str(company_uuid)},
+                timeout=self.timeout
+            )
+            if resp.status_code == 200:
+                taxes = [Decimal(str(line.get('total_tax', 0))) for line in resp.json().get('lines', [])]
+                if len(taxes) == len(lines):
+                    return taxes
+        except Exception as e:
+            print(f"Tax Engine Error: {e}")
+        return [Decimal('0')] * len(lines)
+
+
+tax_rule_cache = TaxRuleCache()
@@ -84,6 +84,7 @@ class OrderViewSet(viewsets.ModelViewSet):
                     "event": "pos.sale.closed",
                     "order_id": str(order.id),
                     "order_number": order.order_number,
+                    "status": order.status,
                     "company_uuid": str(order.company_uuid),
                     "wing_uuid": str(order.branch_id) if order.branch_id else None,
                     "grand_total": str(order.grand_total),
@@ -54,3 +54,33 @@ class TestOrderCreation:
         response = api_client.post("/api/pos/orders/", {}, format='json')
         # Expect 403 Forbidden (or 401 if logic dictates)
         assert response.status_code in [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN]
+
+    def test_create_order_taxes_from_cached_rules(self, auth_client, company_uuid, user, mock_permissions):
+        """Tax for every line is computed in-process from one cached rule fetch."""
+        from unittest.mock import patch, MagicMock
+        from apps.sales.tax import tax_rule_cache
+
+        tax_rule_cache.invalidate()
+        rules_response = MagicMock(status_code=200)
+        rules_response.json.return_value = {"rules": [
+            {"zone_code": "BD", "product_category_uuid": None, "priority": 1, "tax_id": "t1", "name": "VAT", "rate": "10.00"}
+        ]}
+        payload = {
+            "tax_zone_code": "BD",
+            "items": [
+                {"product_uuid": "a1b2c3d4-e5f6-a7b8-c9d0-e1f2a3b4c5d6", "product_name": "A", "quantity": 2, "unit_price": "50.00"},
+                {"product_uuid": "b1b2c3d4-e5f6-a7b8-c9d0-e1f2a3b4c5d6", "product_name": "B", "quantity": 1, "unit_price": "20.00"}
+            ],
+            "payment_data": [{"method": "cash", "amount": "132.00"}]
+        }
+
+        with patch("apps.sales.tax.get_client") as get_client:
+            get_client.return_value.get.return_value = rules_response
+            response = auth_client.post("/api/pos/orders/", payload, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED, f"Response: {response.data}"
+        get_client.assert_called_with('accounting')
+        assert get_client.return_value.get.call_count == 1
+        order = Order.objects.get()
+        assert order.tax_total == Decimal("12.00")
+        assert order.grand_total == Decimal("132.00")
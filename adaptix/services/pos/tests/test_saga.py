@@ -0,0 +1,41 @@
+import pytest
+from unittest.mock import MagicMock
+from apps.sales.models import Order
+from apps.sales.management.commands.run_pos_consumer import Command
+
+
+def _message(routing_key):
+    return MagicMock(delivery_info={"routing_key": routing_key})
+
+
+@pytest.mark.django_db
+class TestStockSaga:
+    def test_batch_failure_marks_order_error(self, company_uuid):
+        """The inventory batch consumer's failure event reaches the POS saga and compensates the sale"""
+        order = Order.objects.create(company_uuid=company_uuid, status='completed')
+
+        # Payload as published by inventory's handle_batch_update on failure
+        payload = {
+            "company_uuid": company_uuid,
+            "reason": f"Sale #{order.id}",
+            "order_reference": None,
+            "reference_no": str(order.id),
+            "status": "failed",
+            "error": "db down",
+        }
+        message = _message("stock.update.failed")
+        Command().process_message(payload, message)
+
+        order.refresh_from_db()
+        assert order.status == 'error'
+        assert "db down" in order.notes
+        message.ack.assert_called_once()
+
+    def test_batch_success_leaves_order(self, company_uuid):
+        order = Order.objects.create(company_uuid=company_uuid, status='completed')
+        Command().process_message(
+            {"reason": f"Sale #{order.id}", "order_reference": None, "status": "success", "lines": 2},
+            _message("stock.update.success"),
+        )
+        order.refresh_from_db()
+        assert order.status == 'completed'
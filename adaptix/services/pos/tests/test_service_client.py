@@ -0,0 +1,60 @@
+import pytest
+import requests
+from unittest.mock import MagicMock, patch
+
+from adaptix_core.service_client import ServiceClient, ServiceUnavailable
+
+
+def _response(status_code):
+    return MagicMock(status_code=status_code)
+
+
+class TestServiceClient:
+    def test_retries_idempotent_calls_and_opens_circuit(self):
+        """GETs retry on 503, POSTs do not, and repeated failures trip the breaker"""
+        client = ServiceClient('accounting', max_retries=2, backoff=0, failure_threshold=3, reset_timeout=60)
+        assert client.url('/tax/engine/rules/').endswith('/api/accounting/tax/engine/rules/')
+
+        with patch.object(client.session, 'request', side_effect=[_response(503), _response(200)]) as send:
+            assert client.get('/tax/engine/rules/').status_code == 200
+        assert send.call_count == 2
+        assert send.call_args.kwargs['timeout'] == 5
+
+        with patch.object(client.session, 'request', side_effect=requests.ConnectionError("refused")) as send:
+            with pytest.raises(requests.ConnectionError):
+                client.post('/tax/engine/calculate_batch/', json={})
+            assert send.call_count == 1
+            # The retry's failure opens the circuit, so the last attempt fails fast
+            with pytest.raises(ServiceUnavailable):
+                client.get('/tax/engine/rules/')
+            assert send.call_count == 3
+            with pytest.raises(ServiceUnavailable):
+                client.get('/tax/engine/rules/')
+            assert send.call_count == 3
+
+    def test_half_open_probe_closes_circuit(self):
+        client = ServiceClient('inventory', route_timeouts={'/stocks/': 2}, failure_threshold=1, reset_timeout=0)
+        with patch.object(client.session, 'request', return_value=_response(500)):
+            assert client.post('/stocks/adjust/').status_code == 500
+        assert client.breaker.state == 'half_open'
+
+        with patch.object(client.session, 'request', return_value=_response(200)) as send:
+            assert client.post('/stocks/adjust/').status_code == 200
+        assert send.call_args.kwargs['timeout'] == 2
+        assert client.breaker.state == 'closed'
+
+    def test_unexpected_error_releases_half_open_probe(self):
+        """A probe failing with a non-connection error must not block later probes"""
+        client = ServiceClient('inventory', max_retries=0, failure_threshold=1, reset_timeout=0)
+        with patch.object(client.session, 'request', return_value=_response(500)):
+            client.get('/stocks/')
+        assert client.breaker.state == 'half_open'
+
+        with patch.object(client.session, 'request', side_effect=requests.TooManyRedirects("loop")):
+            with pytest.raises(requests.TooManyRedirects):
+                client.get('/stocks/')
+        assert not client.breaker.probing
+
+        with patch.object(client.session, 'request', return_value=_response(200)):
+            assert client.get('/stocks/').status_code == 200
+        assert client.breaker.state == 'closed'
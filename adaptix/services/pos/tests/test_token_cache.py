@@ -0,0 +1,75 @@
+import time
+import jwt
+import pytest
+from unittest.mock import patch
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from adaptix_core.middleware import JWTCompanyMiddleware
+from adaptix_core.token_cache import KeyStore, VerifiedTokenCache
+
+
+@pytest.fixture
+def rsa_keys(tmp_path):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    path = tmp_path / "public.pem"
+    path.write_bytes(pem)
+    return private_key, str(path)
+
+
+def _token(private_key, exp_in=300, **claims):
+    payload = {"iss": "auth-service", "company_uuid": "c-1", "exp": int(time.time()) + exp_in, **claims}
+    return jwt.encode(payload, private_key, algorithm="RS256")
+
+
+class TestVerifiedTokenCache:
+    def test_middleware_verifies_each_token_once(self, rf, settings, rsa_keys):
+        """Repeated requests with one token skip RSA verification; expired tokens are still rejected"""
+        settings.JWT_ALGORITHM = "RS256"
+        settings.JWT_ISSUER = "auth-service"
+        private_key, key_path = rsa_keys
+        store = KeyStore(public_key_path=key_path, algorithm="RS256")
+        cache = VerifiedTokenCache(maxsize=2)
+        middleware = JWTCompanyMiddleware(lambda request: request)
+
+        token = _token(private_key)
+        with patch("adaptix_core.middleware.key_store", store), \
+                patch("adaptix_core.middleware.verified_tokens", cache), \
+                patch("adaptix_core.middleware.jwt.decode", wraps=jwt.decode) as decode:
+            for _ in range(10):
+                request = middleware(rf.get("/api/pos/orders/", HTTP_AUTHORIZATION=f"Bearer {token}"))
+                assert request.company_uuid == "c-1"
+            assert decode.call_count == 1
+
+            # LRU bound: the oldest token is evicted
+            for i in range(2):
+                middleware(rf.get("/api/pos/orders/", HTTP_AUTHORIZATION=f"Bearer {_token(private_key, n=i)}"))
+            assert len(cache) == 2
+            assert cache.get(token) is None
+
+            expired = _token(private_key, exp_in=-10)
+            response = middleware(rf.get("/api/pos/orders/", HTTP_AUTHORIZATION=f"Bearer {expired}"))
+            assert response.status_code == 401
+            assert cache.get(expired) is None
+
+    def test_jwks_fetched_only_on_kid_miss(self, rsa_keys):
+        private_key, key_path = rsa_keys
+        jwk = jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+        jwk["kid"] = "k1"
+        store = KeyStore(public_key_path=key_path, algorithm="RS256", refresh_interval=60)
+
+        with patch("adaptix_core.service_client.get_client") as get_client:
+            get_client.return_value.get.return_value.json.return_value = {"keys": [jwk]}
+            token = jwt.encode({"sub": "1"}, private_key, algorithm="RS256", headers={"kid": "k1"})
+            for _ in range(3):
+                key = store.key_for(token)
+            assert jwt.decode(token, key, algorithms=["RS256"])["sub"] == "1"
+            assert get_client.return_value.get.call_count == 1
+
+            # Unknown kids fall back to the PEM key without re-fetching inside the interval
+            unknown = jwt.encode({"sub": "1"}, private_key, algorithm="RS256", headers={"kid": "k2"})
+            assert store.key_for(unknown) is store.public_key
+            assert get_client.return_value.get.call_count == 1
@@ -43,6 +43,11 @@ class Command(BaseCommand):
                 message.ack()
                 return
 
+            if routing_key == "intelligence.inventory.low_stock_predicted.batch":
+                self.handle_ai_suggestion_batch(data)
+                message.ack()
+                return
+
             # 2. Handle Saga Updates
             if routing_key in ["stock.update.success", "stock.update.failed"]:
                 self.handle_saga_update(data, routing_key)
@@ -76,6 +81,30 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Failed to save AI suggestion: {e}"))
 
+    def handle_ai_suggestion_batch(self, data):
+        """One event per company carrying every product predicted to run out."""
+        company_uuid = data.get('company_uuid')
+        if not company_uuid:
+            return
+
+        suggestions = [
+            AIProcurementSuggestion(
+                company_uuid=company_uuid,
+                product_uuid=item['product_uuid'],
+                suggested_quantity=item['suggested_qty'],
+                estimated_out_of_stock_date=item.get('estimated_out_of_stock_date'),
+                confidence_score=item.get('confidence_score', 0.8),
+                reasoning=item.get('reasoning', 'AI Predicted stockout based on sales velocity.')
+            )
+            for item in data.get('items', [])
+            if item.get('product_uuid') and item.get('suggested_qty') and item.get('estimated_out_of_stock_date')
+        ]
+        try:
+            AIProcurementSuggestion.objects.bulk_create(suggestions, batch_size=500)
+            self.stdout.write(self.style.SUCCESS(f"{len(suggestions)} AI Suggestions Created for {company_uuid}"))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Failed to save AI suggestions: {e}"))
+
     def handle_saga_update(self, data, routing_key):
         order_reference = data.get("order_reference")
         if not order_reference:
@@ -1,4 +1,3 @@
-import requests
 from django.conf import settings
 
 class InventoryService:
@@ -7,11 +6,7 @@ class InventoryService:
         """
         Call Inventory Service Synchronously to adjust stock.
         """
-        import requests
-        
-        from adaptix_core.service_registry import ServiceRegistry
-        # Internal URL for Inventory Service (Docker Service Name)
-        url = f"{ServiceRegistry.get_api_url('inventory')}/stocks/adjust/"
+        from adaptix_core.service_client import get_client
         
         payload = {
             "warehouse_id": warehouse_id,
@@ -27,7 +22,7 @@ class InventoryService:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=headers)
+            response = get_client('inventory').post("/stocks/adjust/", json=payload, headers=headers)
             if response.status_code >= 400:
                 print(f"Inventory Error: {response.text}")
                 return False
@@ -36,6 +31,60 @@ class InventoryService:
             print(f"Failed to call inventory service: {e}")
             return False
 
+    @staticmethod
+    def receive_goods(order, warehouse_id, token, received=None):
+        """
+        Post the whole PO delivery to inventory as one goods receipt.
+
+        received: optional per PO line tracking data, {item_id: {batch_number,
+                  manufacturing_date, expiry_date, serials}} or a list of those
+                  dicts carrying an item_id. Quantities always come from the PO:
+                  the receipt is posted under the PO number and the PO is then
+                  marked received and booked in full, so a short delivery could
+                  neither be finished later nor be booked correctly.
+        Returns (ok, result-or-error). Inventory applies the receipt atomically
+        and ignores a reference it already posted, so the call is retry-safe.
+        """
+        from adaptix_core.service_client import get_client
+
+        if isinstance(received, list):
+            received = {str(line.get("item_id")): line for line in received}
+        received = received or {}
+        lines = []
+        for item in order.items.all():
+            extra = received.get(str(item.id), {})
+            line = {
+                "product_uuid": str(item.product_uuid),
+                "variant_uuid": str(item.variant_uuid) if item.variant_uuid else None,
+                "quantity": str(item.quantity),
+                "unit_cost": str(item.unit_cost),
+            }
+            for field in ("batch_number", "manufacturing_date", "expiry_date", "serials"):
+                if extra.get(field):
+                    line[field] = extra[field]
+            lines.append(line)
+
+        payload = {
+            "reference_no": order.reference_number,
+            "warehouse_id": str(warehouse_id),
+            "notes": f"PO #{order.reference_number}",
+            "lines": lines,
+        }
+        headers = {
+            "Authorization": token, # Pass through the JWT
+            "Content-Type": "application/json"
+        }
+
+        try:
+            response = get_client('inventory').post("/stocks/receive/", json=payload, headers=headers, idempotent=True)
+            if response.status_code >= 400:
+                print(f"Inventory Error: {response.text}")
+                return False, response.text
+            return True, response.json()
+        except Exception as e:
+            print(f"Failed to call inventory service: {e}")
+            return False, str(e)
+
 class RFQService:
     @staticmethod
     def auto_select_winner(rfq_id):
@@ -10,6 +10,8 @@ from adaptix_core.permissions import HasPermission
 from adaptix_core.messaging import publish_event
 import json
 
+RECEIVABLE_STATUSES = ('approved', 'ordered')
+
 class PurchaseOrderViewSet(viewsets.ModelViewSet):
     queryset = PurchaseOrder.objects.all()
     serializer_class = PurchaseOrderSerializer
@@ -54,30 +56,22 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
         if order.status == 'received':
             return Response({"detail": "Order already received"}, status=status.HTTP_400_BAD_REQUEST)
         
-        order.status = 'received'
-        order.save()
-        
-        if order.status != 'ordered': 
-             return Response({"detail": "Order must be in 'ordered' state to receive"}, status=status.HTTP_400_BAD_REQUEST)
+        if order.status not in RECEIVABLE_STATUSES:
+             return Response({"detail": "Order must be approved or ordered to receive"}, status=status.HTTP_400_BAD_REQUEST)
         
         warehouse_id = request.data.get('warehouse_id')
         if not warehouse_id:
              return Response({"detail": "Warehouse ID is required to receive stock"}, status=status.HTTP_400_BAD_REQUEST)
 
         # Trigger Inventory Update (Sync)
-        # We process all items. If one fails, we should technically rollback, but for V1 we log errors.
+        # The whole delivery is posted as one goods receipt that inventory applies
+        # atomically, so a failure leaves nothing half-received.
         from .services import InventoryService
         
-        errors = []
         token = request.headers.get('Authorization')
-        
-        for item in order.items.all():
-            success = InventoryService.increase_stock(item, order.company_uuid, warehouse_id, token)
-            if not success:
-                errors.append(f"Failed to update stock for {item.product_uuid}")
-        
-        if errors:
-             return Response({"detail": "Partial failure", "errors": errors}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        ok, result = InventoryService.receive_goods(order, warehouse_id, token, request.data.get('lines'))
+        if not ok:
+             return Response({"detail": "Inventory rejected the goods receipt", "errors": [result]}, status=status.HTTP_502_BAD_GATEWAY)
 
         order.status = 'received'
         order.save()
@@ -104,7 +98,7 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
         except Exception as e:
             print(f"Failed to publish purchase receipt event: {e}")
         
-        return Response({"status": "received", "id": order.id, "detail": "Stock updated successfully"})
+        return Response({"status": "received", "id": order.id, "detail": "Stock updated successfully", "receipt": result})
 
     @action(detail=True, methods=['post'], url_path='approve')
     def approve_order(self, request, pk=None):
@@ -73,3 +73,25 @@ class TestPurchaseFlow:
             unit_cost=5.00
         )
         assert item.pk is not None
+
+    def test_receive_goods_posts_ordered_quantities(self, company_uuid, vendor, mocker):
+        """Per-line overrides carry tracking data only; quantities always match the PO."""
+        from apps.procurement.services import InventoryService
+
+        po = PurchaseOrder.objects.create(
+            company_uuid=company_uuid, vendor=vendor, reference_number="PO-RECV", status="ordered", total_amount=50
+        )
+        item = PurchaseOrderItem.objects.create(
+            company_uuid=company_uuid, order=po, product_uuid=uuid.uuid4(), quantity=5, unit_cost=Decimal("10.00")
+        )
+        client = mocker.patch("adaptix_core.service_client.get_client").return_value
+        client.post.return_value.status_code = 201
+
+        ok, _ = InventoryService.receive_goods(
+            po, uuid.uuid4(), "Bearer x", [{"item_id": str(item.id), "quantity": "2", "batch_number": "B-7"}]
+        )
+
+        assert ok
+        line = client.post.call_args.kwargs["json"]["lines"][0]
+        assert Decimal(line["quantity"]) == Decimal("5")
+        assert line["batch_number"] == "B-7"
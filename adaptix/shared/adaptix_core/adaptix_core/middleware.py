@@ -3,6 +3,7 @@ import os
 from django.http import JsonResponse
 from django.conf import settings
 from .messaging import publish_event
+from .token_cache import verified_tokens, key_store
 
 class JWTCompanyMiddleware:
     """
@@ -25,20 +26,11 @@ class JWTCompanyMiddleware:
     
     def __init__(self, get_response):
         self.get_response = get_response
-        self._public_key = None
     
     @property
     def public_key(self):
-        """Lazy-load the public key."""
-        if self._public_key is None:
-            key_path = getattr(settings, 'PUBLIC_KEY_PATH', '/keys/public.pem')
-            try:
-                with open(key_path, 'r') as f:
-                    self._public_key = f.read()
-            except FileNotFoundError:
-                print(f"Warning: Public key not found at {key_path}")
-                self._public_key = ''
-        return self._public_key
+        """Public key, loaded and parsed once per process."""
+        return key_store.public_key
     
     def __call__(self, request):
         # Allow header override for testing if configured
@@ -64,15 +56,18 @@ class JWTCompanyMiddleware:
         token = auth_header.split(' ')[1]
         
         try:
-            # Decode and validate token
-            payload = jwt.decode(
-                token,
-                self.public_key,
-                algorithms=[getattr(settings, 'JWT_ALGORITHM', 'RS256')],
-                issuer=getattr(settings, 'JWT_ISSUER', 'auth-service'),
-                audience=getattr(settings, 'JWT_AUDIENCE', 'pos-system'),
-                options={"verify_aud": False} # Loose verify for now to support diverse services
-            )
+            # Fan-out calls carry the same token; only verify its signature once
+            payload = verified_tokens.get(token)
+            if payload is None:
+                payload = jwt.decode(
+                    token,
+                    key_store.key_for(token),
+                    algorithms=[getattr(settings, 'JWT_ALGORITHM', 'RS256')],
+                    issuer=getattr(settings, 'JWT_ISSUER', 'auth-service'),
+                    audience=getattr(settings, 'JWT_AUDIENCE', 'pos-system'),
+                    options={"verify_aud": False} # Loose verify for now to support diverse services
+                )
+                verified_tokens.set(token, payload)
             
             # Inject into request
             token_company = payload.get('company_uuid') or payload.get('company')
@@ -81,7 +76,7 @@ class JWTCompanyMiddleware:
             header_company = request.headers.get("X-Company-Id") or request.headers.get("X-Company-UUID")
             
             request.company_uuid = token_company or header_company
-            request.user_claims = payload
+            request.user_claims = dict(payload)  # Cached claims are shared between requests
             
         except jwt.ExpiredSignatureError:
             print(f"JWT Middleware: Token Expired. Headers: {auth_header[:20]}...")
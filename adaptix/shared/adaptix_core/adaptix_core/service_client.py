@@ -0,0 +1,227 @@
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from .service_registry import ServiceRegistry
+
+try:
+    from prometheus_client import Histogram
+except ImportError:  # Metrics are optional outside the Django services
+    Histogram = None
+
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+if Histogram is not None:
+    REQUEST_LATENCY = Histogram(
+        'adaptix_service_request_seconds',
+        'Latency of inter-service HTTP calls by target service.',
+        ['target', 'method', 'outcome'],
+    )
+else:
+    REQUEST_LATENCY = None
+
+
+class ServiceUnavailable(requests.RequestException):
+    """Raised without a network call while a target's circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures; after
+    `reset_timeout` seconds one probe request is let through (half-open).
+    The probe's outcome closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+class ServiceClient:
+    """
+    HTTP client for one target service.
+
+    Paths are relative to ServiceRegistry.get_api_url(service). Connections
+    are kept alive in a pooled requests.Session, every call gets a timeout
+    (per-route from SERVICE_CLIENT_TIMEOUTS, else the default), idempotent
+    calls are retried with jittered backoff on connection errors and
+    502/503/504, and a circuit breaker fails fast while the target is down.
+    """
+
+    def __init__(self, service, default_timeout=5, route_timeouts=None, max_retries=2,
+                 backoff=0.1, pool_size=20, failure_threshold=5, reset_timeout=30):
+        self.service = service
+        self.base_url = ServiceRegistry.get_api_url(service)
+        self.default_timeout = default_timeout
+        # Longest prefix wins
+        self.route_timeouts = sorted((route_timeouts or {}).items(), key=lambda item: -len(item[0]))
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def timeout_for(self, path):
+        for prefix, timeout in self.route_timeouts:
+            if path.startswith(prefix):
+                return timeout
+        return self.default_timeout
+
+    def request(self, method, path, timeout=None, idempotent=None, **kwargs):
+        """
+        Returns the requests.Response. Raises ServiceUnavailable while the
+        circuit is open and the underlying RequestException once retries are
+        exhausted. POSTs are only retried when idempotent=True is passed.
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        attempts = 1 + (self.max_retries if idempotent else 0)
+        timeout = timeout if timeout is not None else self.timeout_for(path)
+        url = self.url(path)
+
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                self._observe(method, 'circuit_open', 0.0)
+                raise ServiceUnavailable(f"Circuit open for service '{self.service}'")
+
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._observe(method, 'error', time.perf_counter() - started)
+                self.breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+            except Exception:
+                # Not retried, but still recorded so a failed half-open probe
+                # re-opens the circuit instead of leaving it claimed forever
+                self._observe(method, 'error', time.perf_counter() - started)
+                self.breaker.record_failure()
+                raise
+            else:
+                elapsed = time.perf_counter() - started
+                if response.status_code >= 500:
+                    self._observe(method, 'server_error', elapsed)
+                    self.breaker.record_failure()
+                    if response.status_code not in RETRY_STATUSES or attempt + 1 >= attempts:
+                        return response
+                else:
+                    self._observe(method, 'ok', elapsed)
+                    self.breaker.record_success()
+                    return response
+
+            # Full jitter keeps retries from many workers from synchronizing
+            time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request('PATCH', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def _observe(self, method, outcome, seconds):
+        if REQUEST_LATENCY is not None:
+            REQUEST_LATENCY.labels(self.service, method, outcome).observe(seconds)
+
+
+_clients = {}
+_clients_pid = None
+_clients_lock = threading.Lock()
+
+
+def get_client(service):
+    """
+    Return the process-wide ServiceClient for a service, creating it on first
+    use. Clients are rebuilt after fork (gunicorn/celery workers) so pooled
+    sockets are never shared between processes.
+
+    Settings: SERVICE_CLIENT_TIMEOUT (default seconds), SERVICE_CLIENT_TIMEOUTS
+    ({service: {path_prefix: seconds}}), SERVICE_CLIENT_RETRIES,
+    SERVICE_CLIENT_POOL_SIZE, SERVICE_CLIENT_FAILURE_THRESHOLD and
+    SERVICE_CLIENT_RESET_TIMEOUT.
+    """
+    global _clients_pid
+    pid = os.getpid()
+    key = service.lower()
+    client = _clients.get(key) if _clients_pid == pid else None
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        if _clients_pid != pid:
+            _clients.clear()
+            _clients_pid = pid
+        client = _clients.get(key)
+        if client is None:
+            client = ServiceClient(
+                key,
+                default_timeout=getattr(settings, 'SERVICE_CLIENT_TIMEOUT', 5),
+                route_timeouts=getattr(settings, 'SERVICE_CLIENT_TIMEOUTS', {}).get(key),
+                max_retries=getattr(settings, 'SERVICE_CLIENT_RETRIES', 2),
+                pool_size=getattr(settings, 'SERVICE_CLIENT_POOL_SIZE', 20),
+                failure_threshold=getattr(settings, 'SERVICE_CLIENT_FAILURE_THRESHOLD', 5),
+                reset_timeout=getattr(settings, 'SERVICE_CLIENT_RESET_TIMEOUT', 30),
+            )
+            _clients[key] = client
+        return client
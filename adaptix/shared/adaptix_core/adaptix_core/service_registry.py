@@ -27,6 +27,9 @@ class ServiceRegistry:
         "logistics": "http://logistics-service:8000",
     }
 
+    # Resolved URLs; environment overrides are read once per process
+    _resolved = {}
+
     @classmethod
     def get_url(cls, service_name: str) -> str:
         """
@@ -42,16 +45,21 @@ class ServiceRegistry:
             ValueError: If the service is not known and no env var is provided.
         """
         service_key = service_name.lower()
+        cached = cls._resolved.get(service_key)
+        if cached:
+            return cached
         
         # 1. Check for specific Environment Variable (e.g. INVENTORY_SERVICE_URL)
         env_var_name = f"{service_key.upper()}_SERVICE_URL"
         env_url = os.environ.get(env_var_name)
         if env_url:
-            return env_url.rstrip("/")
+            cls._resolved[service_key] = env_url.rstrip("/")
+            return cls._resolved[service_key]
             
         # 2. Return Default from Registry
         default_url = cls._DEFAULTS.get(service_key)
         if default_url:
+            cls._resolved[service_key] = default_url
             return default_url
             
         # 3. Fallback/Error
@@ -64,3 +72,8 @@ class ServiceRegistry:
         base = cls.get_url(service_key)
         # Standard convention: /api/{service_name}
         return f"{base}/api/{service_key}"
+
+    @classmethod
+    def clear_cache(cls):
+        """Forget resolved URLs so environment changes are picked up again."""
+        cls._resolved.clear()
@@ -0,0 +1,160 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from django.conf import settings
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of tokens whose signature has already been verified.
+
+    Entries are keyed by the SHA-256 of the whole token, never by a claim like
+    `jti`, so a forged token can't hit another token's entry. Claims are kept
+    until the token's `exp` (or `default_ttl` seconds for tokens without one);
+    an expired entry is dropped on lookup so the caller re-decodes and gets
+    the usual ExpiredSignatureError.
+    """
+
+    def __init__(self, maxsize=None, default_ttl=None):
+        self._maxsize = maxsize
+        self._default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self):
+        return self._maxsize or getattr(settings, 'JWT_CLAIMS_CACHE_SIZE', 10000)
+
+    @property
+    def default_ttl(self):
+        return self._default_ttl or getattr(settings, 'JWT_CLAIMS_CACHE_TTL', 300)
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, claims = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def set(self, token, claims):
+        exp = claims.get('exp')
+        expires_at = exp if isinstance(exp, (int, float)) else time.time() + self.default_ttl
+        key = self.key(token)
+        maxsize = self.maxsize
+        with self._lock:
+            self._entries[key] = (expires_at, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class KeyStore:
+    """
+    Verification keys, parsed once per process.
+
+    Tokens without a `kid` header are checked against PUBLIC_KEY_PATH. Tokens
+    carrying a `kid` are looked up in the auth service's JWKS, which is only
+    re-fetched when an unknown kid shows up (at most every
+    `refresh_interval` seconds, so junk kids can't hammer auth).
+    """
+
+    def __init__(self, public_key_path=None, algorithm=None, jwks_path=None, refresh_interval=30):
+        self.public_key_path = public_key_path
+        self.algorithm = algorithm
+        self.jwks_path = jwks_path
+        self.refresh_interval = refresh_interval
+        self._public_key = None
+        self._jwks = {}
+        self._jwks_fetched_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def public_key(self):
+        """PEM from PUBLIC_KEY_PATH, prepared into a key object on first use."""
+        if self._public_key is None:
+            with self._lock:
+                if self._public_key is None:
+                    self._public_key = self._load_public_key()
+        return self._public_key
+
+    def _load_public_key(self):
+        key_path = self.public_key_path or getattr(settings, 'PUBLIC_KEY_PATH', '/keys/public.pem')
+        try:
+            with open(key_path, 'r') as f:
+                pem = f.read()
+        except FileNotFoundError:
+            print(f"Warning: Public key not found at {key_path}")
+            return ''
+
+        algorithm = self.algorithm or getattr(settings, 'JWT_ALGORITHM', 'RS256')
+        try:
+            # Parse the PEM once instead of on every jwt.decode call
+            return jwt.algorithms.get_default_algorithms()[algorithm].prepare_key(pem)
+        except Exception as e:
+            print(f"Warning: Could not parse public key at {key_path}: {e}")
+            return pem
+
+    def key_for(self, token):
+        kid = jwt.get_unverified_header(token).get('kid')
+        if not kid:
+            return self.public_key
+
+        key = self._jwks.get(kid)
+        if key is None and self._refresh_jwks():
+            key = self._jwks.get(kid)
+        return key if key is not None else self.public_key
+
+    def _refresh_jwks(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._jwks_fetched_at is not None and now - self._jwks_fetched_at < self.refresh_interval:
+                return False
+            self._jwks_fetched_at = now
+
+        from .service_client import get_client
+
+        jwks_path = self.jwks_path or getattr(settings, 'JWT_JWKS_PATH', '/.well-known/jwks.json')
+        try:
+            resp = get_client('auth').get(jwks_path)
+            resp.raise_for_status()
+            keys = {}
+            for jwk in resp.json().get('keys', []):
+                if jwk.get('kid'):
+                    keys[jwk['kid']] = jwt.PyJWK(jwk).key
+        except Exception as e:
+            print(f"JWKS refresh failed: {e}")
+            return False
+
+        with self._lock:
+            self._jwks = keys
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._public_key = None
+            self._jwks = {}
+            self._jwks_fetched_at = None
+
+
+verified_tokens = VerifiedTokenCache()
+key_store = KeyStore()